@@ -0,0 +1,87 @@
+"""Micro-benchmarks for the remote execution message codecs.
+
+Run from the directory containing the package::
+
+    python -m package.benchmarks.bench_remote_execution
+"""
+import timeit
+from typing import Callable, Dict
+
+from ..ue4 import remote_execution
+
+
+def make_command_result(output_lines: int) -> remote_execution._RemoteExecutionMessage:
+    """Build a "command_result" message with the given number of output lines.
+
+    :param output_lines: number of log lines in the result output
+    """
+    return remote_execution._RemoteExecutionMessage(
+        remote_execution._TYPE_COMMAND_RESULT,
+        "remote",
+        "local",
+        {
+            "success": True,
+            "command": "print('hello')",
+            "result": "None",
+            "output": [{"type": "Info", "output": f"LogPython: line {i}"} for i in range(output_lines)],
+        },
+    )
+
+
+def bench(name: str, func: Callable, number: int) -> None:
+    """Time a function and print the mean time per call.
+
+    :param name: label for the benchmark
+    :param func: function to time
+    :param number: number of calls to make
+    """
+    seconds = timeit.timeit(func, number=number)
+    print(f"{name:<48} {seconds / number * 1e6:>12.2f} us")
+
+
+def run_codec(codec: remote_execution.RemoteExecutionJsonCodec) -> None:
+    """Run every benchmark with the given codec.
+
+    :param codec: codec to install for the duration of the benchmarks
+    """
+    remote_execution.set_codec(codec)
+    print(f"codec: {codec.name}")
+    ping = remote_execution._RemoteExecutionMessage(remote_execution._TYPE_PING, "local")
+    constant_messages = remote_execution._RemoteExecutionConstantMessages("local")
+    pong_bytes = remote_execution._RemoteExecutionMessage(
+        remote_execution._TYPE_PONG, "remote", "local", {"user": "user", "machine": "machine", "engine_version": "4.26"}
+    ).to_json_bytes()
+    foreign_bytes = b'{"service": "other", "payload": "' + b"x" * 512 + b'"}'
+    results: Dict[int, bytes] = {}
+    for lines in (10, 10000):
+        results[lines] = make_command_result(lines).to_json_bytes()
+
+    bench("ping encode", ping.to_json_bytes, 100000)
+    bench("ping pre-encoded", lambda: constant_messages.get(remote_execution._TYPE_PING), 100000)
+    bench("pong decode", lambda: remote_execution._RemoteExecutionMessage(None, None).from_json_bytes(pong_bytes), 100000)
+    bench("foreign datagram reject", lambda: remote_execution._RemoteExecutionMessage(None, None).from_json_bytes(foreign_bytes), 100000)
+    for lines, data in results.items():
+        message = make_command_result(lines)
+        number = 100000 // lines
+        bench(f"command_result encode ({len(data)} bytes)", message.to_json_bytes, number)
+        bench(
+            f"command_result decode ({len(data)} bytes)",
+            lambda: remote_execution._RemoteExecutionMessage(None, None).from_json_bytes(data),
+            number,
+        )
+    print()
+
+
+def main() -> None:
+    codecs = [remote_execution.RemoteExecutionJsonCodec()]
+    if remote_execution._orjson:
+        codecs.append(remote_execution.RemoteExecutionOrjsonCodec())
+    try:
+        for codec in codecs:
+            run_codec(codec)
+    finally:
+        remote_execution.set_codec(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import runpy
+import sys
+import types
+from contextlib import contextmanager
+from pathlib import Path
+from subprocess import CompletedProcess
+from typing import Iterator, Optional
+import pytest
+from ..ue4 import fake_remote_node, remote_execution
+from ..ue4.import_manifest import ImportManifest
+from ..ue4.unreal_global import AssetImportData, AssetImportProperties, Unreal4, Unreal4Config
+
+
+class FakeAssetRegistry:
+    def __init__(self, assets, loading=False):
+        self.assets = set(assets)
+        self.loading = loading
+        self.lookups = []
+        self.error = None
+
+    def is_loading_assets(self):
+        return self.loading
+
+    def search_all_assets(self, synchronous_search):
+        assert synchronous_search
+        self.loading = False
+
+    def get_asset_by_object_path(self, object_path):
+        if self.error:
+            raise self.error
+        self.lookups.append(object_path)
+        # like the editor, an asset the scan hasn't reached yet isn't found
+        valid = not self.loading and object_path in self.assets
+        return types.SimpleNamespace(is_valid=lambda: valid)
+
+
+@pytest.fixture()
+def remote_exec():
+    remote_exec = remote_execution.RemoteExecution()
+    remote_exec.start()
+    yield remote_exec
+    remote_exec.stop()
+
+
+@contextmanager
+def start_node(remote_exec, registry: Optional[FakeAssetRegistry] = None) -> Iterator[fake_remote_node.FakeRemoteNode]:
+    unreal = types.SimpleNamespace(
+        AssetRegistryHelpers=types.SimpleNamespace(get_asset_registry=lambda: registry)
+    )
+    with fake_remote_node.FakeRemoteNode(namespace={"unreal": unreal}) as node:
+        remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+        yield node
+
+
+class TestAssetsExist:
+    def test_chunks_duplicates_and_order(self, remote_exec):
+        registry = FakeAssetRegistry({"/Game/B.B", "/Game/A.A", "/Game/C/D.D"})
+        with start_node(remote_exec, registry) as node:
+            paths = ["/Game/B", "/Game/Missing", "/Game/A.A", "/Game/B", "/Game/C/D/"]
+            exists = Unreal4.assets_exist(paths, remote_exec=remote_exec, chunk_size=2)
+            assert list(exists.items()) == [
+                ("/Game/B", True),
+                ("/Game/Missing", False),
+                ("/Game/A.A", True),
+                ("/Game/C/D/", True),
+            ]
+            assert node.commands_run == 2, "4 unique paths in chunks of 2"
+            assert registry.lookups == ["/Game/B.B", "/Game/Missing.Missing", "/Game/A.A", "/Game/C/D.D"]
+
+            assert Unreal4.assets_exist(paths[:2], remote_exec=remote_exec, chunk_size=2) == {
+                "/Game/B": True,
+                "/Game/Missing": False,
+            }
+            assert node.commands_run == 2, "The same chunk is answered from the cache"
+
+    def test_waits_for_asset_scan(self, remote_exec):
+        registry = FakeAssetRegistry({"/Game/A.A"}, loading=True)
+        with start_node(remote_exec, registry):
+            assert Unreal4.assets_exist(["/Game/A"], remote_exec=remote_exec) == {"/Game/A": True}
+            assert not registry.loading
+
+    def test_failure(self, remote_exec):
+        registry = FakeAssetRegistry({"/Game/A.A"})
+        registry.error = RuntimeError("registry is gone")
+        with start_node(remote_exec, registry):
+            with pytest.raises(RuntimeError, match="registry is gone"):
+                Unreal4.assets_exist(["/Game/A"], remote_exec=remote_exec)
+            registry.error = None
+            assert Unreal4.assets_exist(["/Game/A"], remote_exec=remote_exec) == {"/Game/A": True}, "Failures aren't cached"
+
+
+class FakeEditorProperties:
+    def set_editor_property(self, name, value):
+        setattr(self, name, value)
+
+
+class FakeFbxImportUI(FakeEditorProperties):
+    def __init__(self):
+        self.static_mesh_import_data = FakeEditorProperties()
+        self.skeletal_mesh_import_data = FakeEditorProperties()
+        self.anim_sequence_import_data = FakeEditorProperties()
+
+
+class FakeAssetImportTask(FakeEditorProperties):
+    def __init__(self):
+        self.imported_object_paths = []
+
+    def get_editor_property(self, name):
+        return getattr(self, name)
+
+
+class FakeAssetTools:
+    def __init__(self, fail_files=()):
+        self.fail_files = set(fail_files)
+        self.batches = []
+        self.error = None
+
+    def import_asset_tasks(self, tasks):
+        if self.error:
+            raise self.error
+        self.batches.append([task.filename for task in tasks])
+        for task in tasks:
+            if task.filename not in self.fail_files:
+                name = Path(task.filename).stem
+                task.imported_object_paths = [f"{task.destination_path}/{name}.{name}"]
+
+
+@pytest.fixture()
+def asset_tools(monkeypatch):
+    """Install a fake ``unreal`` module, for the import script run in-process by FakeRemoteNode (or runpy)"""
+    asset_tools = FakeAssetTools()
+    unreal = types.SimpleNamespace(
+        FbxImportUI=FakeFbxImportUI,
+        AssetImportTask=FakeAssetImportTask,
+        AssetToolsHelpers=types.SimpleNamespace(get_asset_tools=lambda: asset_tools),
+        FBXImportType=types.SimpleNamespace(FBXIT_STATIC_MESH=0, FBXIT_SKELETAL_MESH=1, FBXIT_ANIMATION=2),
+        load_asset=lambda path: None,
+    )
+    monkeypatch.setitem(sys.modules, "unreal", unreal)
+    return asset_tools
+
+
+@pytest.fixture()
+def unreal4(tmp_path):
+    editor_path = tmp_path / "UE4Editor.exe"
+    editor_path.write_text("")
+    project_path = tmp_path / "FakeProject.uproject"
+    project_path.write_text("{}")
+    return Unreal4(Unreal4Config(str(editor_path), str(project_path)))
+
+
+class TestImportAssets:
+    def test_remote_report_and_chunks(self, unreal4, remote_exec, asset_tools):
+        asset_tools.fail_files = {"/src/broken.fbx"}
+        assets = [
+            (AssetImportData("/src/a.fbx", "/Game/Props"), AssetImportProperties()),
+            (AssetImportData("/src/b.fbx", "/Game/Props", skeletal_mesh=True), AssetImportProperties()),
+            (AssetImportData("/src/broken.fbx", "/Game/Props"), AssetImportProperties()),
+            (
+                AssetImportData("/src/walk.fbx", "/Game/Anims", "/Game/Missing/Skeleton", animation=True),
+                AssetImportProperties(),
+            ),
+            (AssetImportData("/src/c.fbx", "/Game/Props"), AssetImportProperties(replace_existing=False)),
+        ]
+        with start_node(remote_exec) as node:
+            results = unreal4.import_assets(assets, chunk_size=2, as_remote=True, remote_exec=remote_exec)
+            assert node.commands_run == 3
+        assert asset_tools.batches == [["/src/a.fbx", "/src/b.fbx"], ["/src/broken.fbx"], ["/src/c.fbx"]]
+        assert [(r.fbx_file_path, r.game_path) for r in results] == [(a.fbx_file_path, a.game_path) for a, _ in assets]
+        assert [r.success for r in results] == [True, True, False, False, True]
+        assert results[0].imported_object_paths == ["/Game/Props/a.a"]
+        assert results[2].error == "Nothing was imported from /src/broken.fbx"
+        assert "could not find a skeleton" in results[3].error and not results[3].imported_object_paths
+
+    def test_remote_failure(self, unreal4, remote_exec, asset_tools):
+        asset_tools.error = RuntimeError("import crashed")
+        assets = [(AssetImportData(f"/src/{i}.fbx", "/Game/Props"), AssetImportProperties()) for i in range(3)]
+        with start_node(remote_exec):
+            results = unreal4.import_assets(assets, chunk_size=2, as_remote=True, remote_exec=remote_exec)
+        assert [r.success for r in results] == [False] * 3
+        assert all("import crashed" in r.error for r in results), "Every asset of a failed chunk reports its error"
+
+    def test_manifest_matches_by_index(self, unreal4, remote_exec, asset_tools, tmp_path):
+        sources = []
+        for name in ("a", "b"):
+            source = tmp_path / f"{name}.fbx"
+            source.write_bytes(name.encode() * 100)
+            sources.append(str(source))
+        shared = AssetImportData(sources[0], "/Game/Props")
+        assets = [
+            (shared, AssetImportProperties(import_materials=True)),
+            (AssetImportData(sources[1], "/Game/Props"), AssetImportProperties()),
+            (shared, AssetImportProperties()),
+        ]
+        manifest = ImportManifest(str(tmp_path / "manifest.json"))
+        with start_node(remote_exec):
+            first = unreal4.import_assets(assets, as_remote=True, remote_exec=remote_exec, manifest=manifest)
+            assert [r.success for r in first] == [True] * 3 and not any(r.skipped for r in first)
+            # the shared source was last recorded with the default properties, so only the first entry changed
+            second = unreal4.import_assets(assets, as_remote=True, remote_exec=remote_exec, manifest=manifest)
+        assert [r.skipped for r in second] == [False, True, True]
+        assert asset_tools.batches[-1] == [sources[0]]
+        assert second[0].imported_object_paths == ["/Game/Props/a.a"]
+
+    def test_cmdlet_report_file(self, unreal4, asset_tools, monkeypatch):
+        def run_python_cmdlet(python_file):
+            runpy.run_path(python_file)
+            return CompletedProcess([python_file], 0)
+
+        monkeypatch.setattr(unreal4, "run_python_cmdlet", run_python_cmdlet)
+        asset_tools.fail_files = {"/src/broken.fbx"}
+        assets = [
+            (AssetImportData(f"/src/{name}.fbx", "/Game/Props"), AssetImportProperties())
+            for name in ("a", "broken", "c")
+        ]
+        results = unreal4.import_assets(assets, chunk_size=2)
+        assert asset_tools.batches == [["/src/a.fbx", "/src/broken.fbx"], ["/src/c.fbx"]], "One cmdlet imports every chunk"
+        assert [r.success for r in results] == [True, False, True]
+
+        monkeypatch.setattr(unreal4, "run_python_cmdlet", lambda python_file: CompletedProcess([python_file], 1))
+        results = unreal4.import_assets(assets)
+        assert [r.error for r in results] == ["The import cmdlet did not write a report (exit code 1)"] * 3
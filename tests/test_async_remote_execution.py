@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from ..ue4 import fake_remote_node
+from ..ue4.remote_execution import MODE_EVAL_STATEMENT
+from ..ue4.async_remote_execution import AsyncRemoteExecution
+
+
+class TestAsyncRemoteExecution:
+    @staticmethod
+    def run(coroutine_function, **node_kwargs):
+        async def main():
+            with fake_remote_node.FakeRemoteNode(**node_kwargs) as node:
+                async with AsyncRemoteExecution() as remote_exec:
+                    await remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+                    return await coroutine_function(remote_exec, node)
+
+        return asyncio.run(main())
+
+    def test_run_command(self):
+        async def run_commands(remote_exec, node):
+            results = [await remote_exec.run_command(node.node_id, f"print({i})") for i in range(3)]
+            with pytest.raises(RuntimeError):
+                await remote_exec.run_command(node.node_id, "1 / 0", raise_on_failure=True)
+            async with await remote_exec.open_command_connection(node.node_id) as command_connection:
+                assert command_connection.is_alive()
+            return results, node.connections_opened
+
+        results, connections_opened = self.run(run_commands)
+        assert [r["output"][0]["output"] for r in results] == ["0\n", "1\n", "2\n"]
+        assert connections_opened == 1, "One connection is reused for every command"
+
+    def test_concurrent_commands_share_connection(self):
+        async def run_commands(remote_exec, node):
+            results = await asyncio.gather(
+                *(remote_exec.run_command(node.node_id, str(i), exec_mode=MODE_EVAL_STATEMENT) for i in range(4))
+            )
+            return results, node.connections_opened
+
+        results, connections_opened = self.run(run_commands)
+        assert [r["result"] for r in results] == ["0", "1", "2", "3"]
+        assert connections_opened == 1, "Concurrent callers wait on the same handshake"
+
+    def test_cancelled_command_drops_connection(self):
+        async def cancel_then_run(remote_exec, node):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(remote_exec.run_command(node.node_id, "'first'", exec_mode=MODE_EVAL_STATEMENT), 0.2)
+            assert node.node_id not in remote_exec._command_connections
+            return await remote_exec.run_command(node.node_id, "'second'", exec_mode=MODE_EVAL_STATEMENT)
+
+        result = self.run(cancel_then_run, latency=0.5)
+        assert result["result"] == "'second'", "The cancelled command's reply isn't read as the next command's"
+
+    def test_adopt_late_connection(self):
+        # a busy editor handles every re-sent "open_connection" at its next tick, connecting (and replacing the connection) for each
+        async def run_commands(remote_exec, node):
+            await asyncio.sleep(0.1)  # the node was found at the start of a tick, so ask for a connection in the middle of one
+            first = await remote_exec.run_command(node.node_id, "print(1)")
+            await asyncio.sleep(0.6)
+            connections_opened = node.connections_opened
+            second = await remote_exec.run_command(node.node_id, "print(2)")
+            return first, second, connections_opened
+
+        first, second, connections_opened = self.run(run_commands, tick_delay=0.5)
+        assert connections_opened > 1
+        assert [first["output"][0]["output"], second["output"][0]["output"]] == ["1\n", "2\n"]
@@ -0,0 +1,56 @@
+import os
+import sys
+import stat
+from ..ue4.cmdlet_runner import CmdletStatus, run_python_cmdlets
+from ..ue4.unreal_global import Unreal4, Unreal4Config
+
+# runs the -script= argument with python, like the pythonscript commandlet
+FAKE_CMDLET = f"""#!{sys.executable}
+import runpy, sys
+script = next(arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("-script="))
+runpy.run_path(script, run_name="__main__")
+"""
+
+
+class TestRunPythonCmdlets:
+    def test_limits_and_output(self, tmp_path):
+        for name in ("UE4Editor.exe", "UE4Editor-Cmd.exe"):
+            editor_path = tmp_path / name
+            editor_path.write_text(FAKE_CMDLET)
+            editor_path.chmod(editor_path.stat().st_mode | stat.S_IEXEC)
+        project_path = tmp_path / "FakeProject.uproject"
+        project_path.write_text("{}")
+        unreal4 = Unreal4(Unreal4Config(str(tmp_path / "UE4Editor.exe"), str(project_path)))
+
+        scripts = {
+            "ok": "import sys\nprint('hello')\nprint('oops', file=sys.stderr)",
+            "fails": "raise SystemExit(3)",
+            "hangs": "import time\ntime.sleep(60)",
+            "leaks": "import time\nleak = bytearray(512 * 1024 * 1024)\ntime.sleep(60)",
+        }
+        script_files = []
+        for name, source in scripts.items():
+            script_file = tmp_path / f"{name}.py"
+            script_file.write_text(source)
+            script_files.append(str(script_file))
+
+        results = run_python_cmdlets(
+            unreal4,
+            script_files,
+            max_workers=4,
+            timeout=5,
+            max_rss_bytes=256 * 1024 * 1024,
+            log_dir=str(tmp_path / "logs"),
+            poll_interval=0.05,
+        )
+        ok, fails, hangs, leaks = results
+        assert [result.script for result in results] == script_files
+        assert ok.success and ok.returncode == 0
+        with open(ok.stdout_path) as f:
+            assert f.read().strip() == "hello"
+        with open(ok.stderr_path) as f:
+            assert f.read().strip() == "oops"
+        assert fails.status == CmdletStatus.FAILED and fails.returncode == 3
+        assert hangs.status == CmdletStatus.TIMED_OUT and hangs.duration < 30
+        assert leaks.status == CmdletStatus.MEMORY_EXCEEDED and leaks.peak_rss > 256 * 1024 * 1024
+        assert os.path.dirname(ok.stdout_path) == str(tmp_path / "logs")
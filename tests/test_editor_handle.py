@@ -0,0 +1,112 @@
+import sys
+import time
+from concurrent.futures import TimeoutError
+import pytest
+from ..ue4 import fake_remote_node, remote_execution
+from ..ue4.unreal_global import (
+    EDITOR_READY_LOG_MARKER,
+    EditorHandle,
+    EditorStartupError,
+    Unreal4,
+    Unreal4Config,
+    _EditorDiscovery,
+)
+
+
+class TestEditorHandle:
+    @pytest.fixture()
+    def project_path(self, tmp_path):
+        project_path = tmp_path / "FakeProject.uproject"
+        project_path.write_text("{}")
+        return project_path
+
+    @pytest.fixture()
+    def remote_exec(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        yield remote_exec
+        remote_exec.stop()
+
+    def test_ready_when_node_discovered(self, tmp_path, project_path, remote_exec, monkeypatch):
+        monkeypatch.setattr(remote_execution, "_NODE_TIMEOUT_SECONDS", 1.5)
+        editor_path = fake_remote_node.write_fake_editor(str(tmp_path), startup_delay=0.5)
+        cmdlet_path = tmp_path / "UE4Editor-Cmd.exe"
+        cmdlet_path.write_text(f"#!{sys.executable}\nimport time\ntime.sleep(60)\n")
+        cmdlet_path.chmod(0o755)
+        unreal4 = Unreal4(Unreal4Config(editor_path, str(project_path)))
+        other_project = fake_remote_node.start_fake_nodes(1)
+        try:
+            # a commandlet launched first never appears in discovery, so it mustn't wait for (and take) the editor's node
+            cmdlet = unreal4.run_editor(["-run=pythonscript"], as_cmd=True, remote_exec=remote_exec)
+            assert not isinstance(cmdlet, EditorHandle)
+            editor = unreal4.run_editor([], remote_exec=remote_exec)
+            node = editor.wait_until_ready(timeout=30)
+            assert node.project_name == "FakeProject"
+            assert node.node_id in remote_exec.node_snapshot
+            assert 0 < editor.timings["process_started"] < editor.timings["node_discovered"]
+            assert editor.startup_seconds == editor.timings["node_discovered"]
+            assert editor.poll() is None
+            discovery = _EditorDiscovery.get(remote_exec)
+            assert discovery._claimed_node_ids == {node.node_id}
+            assert _EditorDiscovery.get(remote_execution.RemoteExecution()) is not discovery
+            # a lost node is forgotten
+            editor.kill()
+            deadline = time.perf_counter() + 10
+            while discovery._claimed_node_ids and time.perf_counter() < deadline:
+                time.sleep(0.1)
+            assert not discovery._claimed_node_ids
+        finally:
+            unreal4.close_all_editor()
+            for node in other_project:
+                node.stop()
+
+    def test_ready_from_log_marker(self, tmp_path, project_path):
+        log_path = tmp_path / "Saved" / "Logs" / "FakeProject.log"
+        log_path.parent.mkdir(parents=True)
+        log_path.write_text(f"{EDITOR_READY_LOG_MARKER} (last run)\n")
+        editor_path = tmp_path / "UE4Editor.exe"
+        editor_path.write_text(
+            f"#!{sys.executable}\nimport os, time\ntime.sleep(0.5)\n"
+            f"os.replace({str(log_path)!r}, {str(log_path.with_suffix('.backup.log'))!r})\n"
+            f"open({str(log_path)!r}, 'w').write('LogInit: Display: {EDITOR_READY_LOG_MARKER}.\\n')\n"
+            "time.sleep(60)\n"
+        )
+        editor_path.chmod(0o755)
+        unreal4 = Unreal4(Unreal4Config(str(editor_path), str(project_path)))
+        try:
+            editor = unreal4.run_editor([], remote_exec=remote_execution.RemoteExecution())
+            assert editor.wait_until_ready(timeout=30) is None
+            assert editor.timings["engine_initialized"] >= 0.5
+        finally:
+            unreal4.close_all_editor()
+
+    def test_log_marker_skipped_for_overlapping_editors(self, tmp_path, project_path):
+        log_path = tmp_path / "Saved" / "Logs" / "FakeProject.log"
+        log_path.parent.mkdir(parents=True)
+        editor_path = tmp_path / "UE4Editor.exe"
+        editor_path.write_text(
+            f"#!{sys.executable}\nimport time\ntime.sleep(0.2)\n"
+            f"open({str(log_path)!r}, 'a').write('LogInit: Display: {EDITOR_READY_LOG_MARKER}.\\n')\n"
+            "time.sleep(60)\n"
+        )
+        editor_path.chmod(0o755)
+        unreal4 = Unreal4(Unreal4Config(str(editor_path), str(project_path)))
+        try:
+            # both editors are told to use the same log, but whichever starts second writes another one
+            editors = [unreal4.run_editor([], remote_exec=remote_execution.RemoteExecution()) for _ in range(2)]
+            for editor in editors:
+                with pytest.raises(TimeoutError):
+                    editor.wait_until_ready(timeout=1)
+                assert "engine_initialized" in editor.timings
+        finally:
+            unreal4.close_all_editor()
+
+    def test_exit_before_ready(self, tmp_path, project_path, remote_exec):
+        editor_path = tmp_path / "UE4Editor.exe"
+        editor_path.write_text(f"#!{sys.executable}\nraise SystemExit(2)\n")
+        editor_path.chmod(0o755)
+        unreal4 = Unreal4(Unreal4Config(str(editor_path), str(project_path)))
+        editor = unreal4.run_editor([], remote_exec=remote_exec)
+        with pytest.raises(EditorStartupError):
+            editor.wait_until_ready(timeout=30)
+        assert editor.returncode == 2
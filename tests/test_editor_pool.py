@@ -0,0 +1,56 @@
+import os
+import time
+import pytest
+from ..ue4 import editor_pool, fake_remote_node, remote_execution
+from ..ue4.editor_pool import EditorPool, EditorPoolError
+from ..ue4.unreal_global import Unreal4, Unreal4Config
+
+
+class TestEditorPool:
+    @pytest.fixture()
+    def unreal4(self, tmp_path):
+        editor_path = fake_remote_node.write_fake_editor(str(tmp_path), startup_delay=0.1)
+        project_path = tmp_path / "FakeProject.uproject"
+        project_path.write_text("{}")
+        return Unreal4(Unreal4Config(editor_path, str(project_path)))
+
+    @pytest.fixture()
+    def remote_exec(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        yield remote_exec
+        remote_exec.stop()
+
+    def test_lease_and_recycle(self, unreal4, remote_exec):
+        with EditorPool(unreal4, size=2, max_jobs=3, startup_timeout=30, remote_exec=remote_exec) as pool:
+            for i in range(7):
+                response = pool.run_python(f"print({i})")
+                assert response.success and response.output[0].output == f"{i}\n"
+            with pool.lease() as editor:
+                editor.process.kill()
+                editor.process.wait()
+            response = pool.run_python("print('after crash')", timeout=30)
+            assert response.success
+            stats = pool.stats()
+        assert stats["recycles"]["jobs"] >= 2
+        assert stats["recycles"]["crashed"] == 1
+        assert stats["launches"] + stats["starting"] >= 5 and stats["launch_failures"] == 0
+        assert stats["startup_seconds"]["count"] >= 4
+        with pytest.raises(EditorPoolError):
+            with pool.lease():
+                pass
+
+    def test_node_pid_retried_after_failure(self, unreal4, remote_exec, monkeypatch):
+        monkeypatch.setattr(editor_pool, "NODE_PID_RETRY_SECONDS", 0.2)
+        pool = EditorPool(unreal4, remote_exec=remote_exec)
+        # an editor that is still starting fails commands
+        with fake_remote_node.FakeRemoteNode(failure_rate=1.0) as node:
+            remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+            assert pool._get_node_pid(node.node_id) is None
+            node.failure_rate = 0.0
+            assert pool._get_node_pid(node.node_id) is None, "A failed node isn't asked again right away"
+            assert node.commands_run == 1
+            time.sleep(0.2)
+            assert pool._get_node_pid(node.node_id) == os.getpid()
+            assert pool._get_node_pid(node.node_id) == os.getpid()
+            assert node.commands_run == 2, "A node's process ID is only asked for once"
@@ -0,0 +1,28 @@
+from ..ue4.import_manifest import ImportManifest
+from ..ue4.unreal_global import AssetImportData, AssetImportProperties
+
+
+class TestImportManifest:
+    def test_skips_unchanged_sources(self, tmp_path):
+        sources = []
+        for i in range(4):
+            source = tmp_path / f"asset{i}.fbx"
+            source.write_bytes(bytes([i]) * 1000)
+            sources.append(source)
+        assets = [(AssetImportData(str(source), "/Game/Library"), AssetImportProperties()) for source in sources]
+        manifest = ImportManifest(str(tmp_path / "manifest.json"))
+        assert manifest.filter_changed(assets) == assets
+        for asset_data, properties in assets[:3]:
+            manifest.record(asset_data, properties, ["/Game/Library/x"])
+        manifest.save()
+
+        manifest = ImportManifest(str(tmp_path / "manifest.json"))
+        assert manifest.filter_changed(assets) == assets[3:]
+        sources[0].write_bytes(b"changed")
+        assets[1] = (assets[1][0], AssetImportProperties(import_materials=True))
+        assert [asset_data.fbx_file_path for asset_data, _ in manifest.filter_changed(assets, max_workers=2)] == [
+            str(sources[0]),
+            str(sources[1]),
+            str(sources[3]),
+        ]
+        assert manifest.imported_object_paths(str(sources[2])) == ["/Game/Library/x"]
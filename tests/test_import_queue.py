@@ -0,0 +1,80 @@
+import socket
+from ..ue4.import_queue import ImportJobQueue, ImportJobStatus, run_import_workers
+from ..ue4.unreal_global import AssetImportData, AssetImportProperties, AssetImportResult
+
+
+def make_assets(count):
+    return [
+        (AssetImportData(f"/src/asset{i}.fbx", "/Game/Library"), AssetImportProperties())
+        for i in range(count)
+    ]
+
+
+class FakeUnreal4:
+    def __init__(self, fail_paths=(), crash_batches=0):
+        self.fail_paths = set(fail_paths)
+        self.crash_batches = crash_batches
+        self.imported = []
+
+    def import_assets(self, assets, chunk_size, as_remote, remote_exec, manifest):
+        if self.crash_batches:
+            self.crash_batches -= 1
+            raise RuntimeError("Editor crashed")
+        results = []
+        for asset_data, _ in assets:
+            success = asset_data.fbx_file_path not in self.fail_paths
+            if success:
+                self.imported.append(asset_data.fbx_file_path)
+            results.append(
+                AssetImportResult(
+                    asset_data.fbx_file_path,
+                    asset_data.game_path,
+                    success,
+                    [asset_data.game_path + "/x"] if success else [],
+                    "" if success else "Nothing was imported",
+                )
+            )
+        return results
+
+
+class TestImportJobQueue:
+    def test_claim_and_complete(self, tmp_path):
+        queue = ImportJobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+        assert queue.enqueue(make_assets(5)) == 5
+        assert queue.enqueue(make_assets(6)) == 1, "Queued assets should not be queued again"
+        jobs = queue.claim("w1", 4)
+        assert [job.asset_data.fbx_file_path for job in jobs] == [f"/src/asset{i}.fbx" for i in range(4)]
+        assert [job.asset_data.fbx_file_path for job in queue.claim("w2", 4)] == ["/src/asset4.fbx", "/src/asset5.fbx"]
+        assert queue.claim("w3", 4) == []
+        queue.complete(jobs[0], AssetImportResult("a", "b", True, ["/Game/Library/asset0"]))
+        queue.complete(jobs[1], AssetImportResult("a", "b", False, error="boom"))
+        queue.fail(jobs[2:], "Editor crashed")
+        assert queue.counts() == {"pending": 3, "running": 2, "succeeded": 1, "failed": 0}
+        done = queue.jobs(ImportJobStatus.SUCCEEDED)[0]
+        assert done.imported_object_paths == ["/Game/Library/asset0"] and done.duration >= 0
+        retried = queue.claim("w1", 10)
+        assert [job.attempts for job in retried] == [2, 2, 2]
+        queue.fail(retried, "Editor crashed")
+        assert queue.counts()["failed"] == 3
+        assert queue.retry_failed() == 3 and queue.counts()["pending"] == 3
+
+    def test_recover_interrupted_workers(self, tmp_path):
+        queue = ImportJobQueue(str(tmp_path / "jobs.db"))
+        queue.enqueue(make_assets(3))
+        # a pid above the kernel's maximum, so it can't be running
+        queue.claim(f"{socket.gethostname()}:4194305:import-worker-0", 2)
+        queue.claim(f"other-host:1:import-worker-0", 1)
+        assert queue.recover() == 2
+        assert [job.attempts for job in queue.jobs(ImportJobStatus.PENDING)] == [0, 0]
+
+    def test_run_import_workers(self, tmp_path):
+        queue = ImportJobQueue(str(tmp_path / "jobs.db"), max_attempts=3)
+        queue.enqueue(make_assets(20))
+        unreal4 = FakeUnreal4(fail_paths=["/src/asset7.fbx"], crash_batches=1)
+        counts = run_import_workers(queue, unreal4, workers=3, batch_size=4, poll_interval=0.01)
+        assert counts == {"pending": 0, "running": 0, "succeeded": 19, "failed": 1}
+        assert sorted(unreal4.imported) == sorted(f"/src/asset{i}.fbx" for i in range(20) if i != 7)
+        assert queue.jobs(ImportJobStatus.FAILED)[0].attempts == 3
+        queue.enqueue(make_assets(21))
+        assert run_import_workers(queue, unreal4, workers=1, poll_interval=0.01)["succeeded"] == 20
+        assert len(unreal4.imported) == 20, "A resumed run should only import the new asset"
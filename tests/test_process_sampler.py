@@ -0,0 +1,55 @@
+import sys
+import subprocess
+from ..ue4.process_sampler import MetricSummary, ProcessSampler, SampleRing
+
+
+class TestProcessSampler:
+    def test_ring_overwrites_oldest(self):
+        ring = SampleRing(capacity=3, metrics=("rss",))
+        ring.append(0.0, {"rss": 0})
+        assert len(ring) == 1 and ring.column("rss") == [0.0]
+        assert len(ring._columns["rss"]) == 1, "The arrays grow as samples are added"
+        for i in range(1, 5):
+            ring.append(float(i), {"rss": i * 10})
+        assert len(ring) == 3
+        assert ring.column("timestamp") == [2.0, 3.0, 4.0]
+        assert ring.column("rss") == [20.0, 30.0, 40.0]
+
+    def test_metric_summary(self):
+        summary = MetricSummary.from_values([float(i) for i in range(1, 101)])
+        assert (summary.peak, summary.mean, summary.p95) == (100.0, 50.5, 95.0)
+
+    def test_samples_process_and_children(self, tmp_path):
+        # a parent whose child holds 64MB
+        child = "import time; leak = bytearray(64 * 1024 * 1024); time.sleep(1)"
+        parent = f"import subprocess, sys; subprocess.run([sys.executable, '-c', {child!r}])"
+        process = subprocess.Popen([sys.executable, "-c", parent])
+        with ProcessSampler(interval=0.05) as sampler:
+            job = sampler.track(process.pid, "import")
+            process.wait()
+            sampler.sample()
+        summary = sampler.summary(job)
+        assert summary.ended_at is not None
+        assert summary.samples > 5
+        assert summary.metrics["rss"].peak > 64 * 1024 * 1024
+        assert summary.metrics["threads"].peak >= 2
+        sampler.export(str(tmp_path / "summary.json"))
+        assert (tmp_path / "summary.json").exists()
+
+    def test_ended_jobs_are_bounded(self):
+        processes = [subprocess.Popen([sys.executable, "-c", "pass"]) for _ in range(4)]
+        sampler = ProcessSampler(max_ended_jobs=2)
+        jobs = [sampler.track(process.pid, f"job{i}") for i, process in enumerate(processes)]
+        running = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            sampler.track(running.pid, "running")
+            for process in processes:
+                process.wait()
+            sampler.sample()
+            assert sorted(sampler.summaries()) == ["job2", "job3", "running"], "The jobs that ended first are dropped"
+            assert sampler.summary("running").ended_at is None
+        finally:
+            running.kill()
+            running.wait()
+        sampler.untrack(jobs[3])
+        assert sorted(sampler.summaries()) == ["job2", "running"]
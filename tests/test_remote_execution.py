@@ -0,0 +1,714 @@
+import json
+import socket
+import sys
+import threading
+import time
+import types
+import pytest
+from ..ue4 import fake_remote_node, remote_execution
+
+
+class TestRemoteExecutionMessageReader:
+    @pytest.fixture()
+    def socket_pair(self):
+        sender, receiver = socket.socketpair()
+        yield sender, receiver
+        sender.close()
+        receiver.close()
+
+    @staticmethod
+    def make_message(output_lines: int) -> dict:
+        return {
+            "version": remote_execution._PROTOCOL_VERSION,
+            "magic": remote_execution._PROTOCOL_MAGIC,
+            "type": remote_execution._TYPE_COMMAND_RESULT,
+            "source": "remote",
+            "dest": "local",
+            "data": {
+                "success": True,
+                "result": 'None } { \\" "',
+                "output": [
+                    {"type": "Info", "output": f'LogPython: {{line}} "{i}" \\'}
+                    for i in range(output_lines)
+                ],
+            },
+        }
+
+    def test_read_multi_chunk_message(self, socket_pair):
+        sender, receiver = socket_pair
+        message = self.make_message(50000)
+        raw = json.dumps(message).encode("utf-8")
+        # dribble the message out in small chunks so it spans many reads
+        send_thread = threading.Thread(
+            target=lambda: [sender.sendall(raw[i : i + 1000]) for i in range(0, len(raw), 1000)]
+        )
+        send_thread.start()
+        reader = remote_execution._RemoteExecutionMessageReader(4096)
+        data = reader.read_message(receiver)
+        send_thread.join()
+        assert json.loads(data) == message, "Failed to decode multi chunk message"
+        assert reader.last_message_bytes == len(raw)
+        assert reader.last_message_chunks > 1
+
+    def test_read_back_to_back_messages(self, socket_pair):
+        sender, receiver = socket_pair
+        messages = [self.make_message(i) for i in range(3)]
+        sender.sendall(b"".join(json.dumps(m).encode("utf-8") for m in messages))
+        reader = remote_execution._RemoteExecutionMessageReader(1 << 16)
+        for message in messages:
+            assert json.loads(reader.read_message(receiver)) == message
+
+    def test_read_closed_socket(self, socket_pair):
+        sender, receiver = socket_pair
+        sender.sendall(b'{"version": 1, "magic": "ue_')
+        sender.close()
+        reader = remote_execution._RemoteExecutionMessageReader(1024)
+        assert reader.read_message(receiver) is None
+
+    def test_max_message_size(self):
+        reader = remote_execution._RemoteExecutionMessageReader(1024, max_message_size=100)
+        with pytest.raises(RuntimeError, match="maximum message size"):
+            reader.feed(json.dumps(self.make_message(1)).encode("utf-8"))
+        assert reader.feed(b'{"data": "' + b"x" * 60) is None
+        with pytest.raises(RuntimeError, match="maximum message size"):
+            reader.feed(b"x" * 60)
+        # the oversized message was discarded, so the reader is usable again
+        assert json.loads(reader.feed(b'{"a": 1}')) == {"a": 1}
+
+
+class TestRemoteExecutionCodec:
+    @pytest.fixture()
+    def codec_calls(self):
+        """Use a json codec that records the data it decodes"""
+
+        class RecordingCodec(remote_execution.RemoteExecutionJsonCodec):
+            def loads(self, json_bytes):
+                calls.append(bytes(json_bytes))
+                return super().loads(json_bytes)
+
+        calls = []
+        remote_execution.set_codec(RecordingCodec())
+        yield calls
+        remote_execution.set_codec(None)
+
+    def test_default_codec(self):
+        remote_execution.set_codec(None)
+        codec = remote_execution.get_codec()
+        expected = remote_execution.RemoteExecutionOrjsonCodec if remote_execution._orjson else remote_execution.RemoteExecutionJsonCodec
+        assert type(codec) is expected
+
+    @pytest.mark.skipif(remote_execution._orjson is None, reason="orjson isn't installed")
+    def test_orjson_fallback(self):
+        codec = remote_execution.RemoteExecutionOrjsonCodec()
+        assert json.loads(codec.dumps({"text": "caf\u00e9", "n": 1})) == {"text": "caf\u00e9", "n": 1}
+        # orjson can't encode integers larger than 64-bits, so the json module encodes them
+        big = 2**70
+        assert codec.dumps({"n": big}) == remote_execution.RemoteExecutionJsonCodec().dumps({"n": big})
+        assert json.loads(codec.dumps({"n": big}))["n"] == big
+
+    def test_magic_precheck(self, codec_calls):
+        message = remote_execution._RemoteExecutionMessage(None, None)
+        # other traffic on the multicast group is rejected without being decoded
+        assert not message.from_json_bytes(b'{"version": 1, "type": "ping"}')
+        assert not message.from_json_bytes(b"\x00\xff not json")
+        assert codec_calls == []
+
+        data = remote_execution._RemoteExecutionMessage(remote_execution._TYPE_PING, "source").to_json_bytes()
+        assert message.from_json_bytes(bytearray(data))
+        assert message.type_ == remote_execution._TYPE_PING and message.source == "source"
+        assert codec_calls == [data]
+
+        # the magic alone doesn't make a valid message
+        assert not message.from_json_bytes(b'{"magic": "ue_py", ')
+        assert len(codec_calls) == 2
+
+
+class TestFakeRemoteNode:
+    @pytest.fixture()
+    def remote_exec(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        yield remote_exec
+        remote_exec.stop()
+
+    @staticmethod
+    def wait_for(remote_exec, node: fake_remote_node.FakeRemoteNode) -> dict:
+        return remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+
+    def test_run_command(self, remote_exec):
+        with fake_remote_node.FakeRemoteNode(node_info={"project_name": "Fake"}) as node:
+            assert self.wait_for(remote_exec, node)["project_name"] == "Fake"
+            result = remote_exec.session.run_command(node.node_id, "print(6 * 7)")
+            assert result["success"]
+            assert result["output"] == [{"type": "Info", "output": "42\n"}]
+            result = remote_exec.session.run_command(
+                node.node_id, "6 * 7", exec_mode=remote_execution.MODE_EVAL_STATEMENT
+            )
+            assert result["result"] == "42"
+            assert node.commands_run == 2
+            assert node.connections_opened == 1
+
+    def test_run_batch(self, remote_exec):
+        with fake_remote_node.FakeRemoteNode() as node:
+            self.wait_for(remote_exec, node)
+            results = remote_exec.session.run_batch(node.node_id, ["x = 2", "print(x)", "x + 1", "1 / 0"])
+            assert [r["success"] for r in results] == [True, True, True, False]
+            assert results[1]["output"][0]["output"].strip() == "2"
+            assert results[2]["result"] == "3"
+            assert "ZeroDivisionError" in results[3]["result"]
+
+    def test_fan_out(self, remote_exec):
+        nodes = fake_remote_node.start_fake_nodes(3, latency=0.2, payload_size=100000)
+        try:
+            for node in nodes:
+                self.wait_for(remote_exec, node)
+            results = remote_exec.session.run_command_on_nodes(
+                "print(1)", remote_node_ids=[node.node_id for node in nodes]
+            )
+        finally:
+            for node in nodes:
+                node.stop()
+        assert sorted(results) == sorted(node.node_id for node in nodes)
+        assert all(result.success for result in results.values())
+        assert all(len(result.data["output"][-1]["output"]) == 100000 for result in results.values())
+
+    def test_failure_rate(self, remote_exec):
+        with fake_remote_node.FakeRemoteNode(failure_rate=1.0, execute=False) as node:
+            self.wait_for(remote_exec, node)
+            result = remote_exec.session.run_command(node.node_id, "print(1)")
+            assert not result["success"]
+            assert result["result"] == fake_remote_node.SIMULATED_FAILURE_RESULT
+
+
+class TestRemoteExecutionSession:
+    @pytest.fixture()
+    def remote_exec(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        yield remote_exec
+        remote_exec.stop()
+
+    def test_reuse_and_reconnect(self, remote_exec):
+        with fake_remote_node.FakeRemoteNode() as node:
+            remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+            session = remote_exec.session
+            for i in range(3):
+                assert session.run_command(node.node_id, f"print({i})")["success"]
+            stats = session.stats
+            assert (stats["connections_opened"], stats["connections_reused"], stats["reconnects"]) == (1, 2, 0)
+            assert stats["commands_run"] == 3 and stats["open_connections"] == 1
+            assert stats["handshake_latencies"][node.node_id] > 0
+            assert node.connections_opened == 1
+
+            # the editor drops the connection (eg, when its python plugin restarts), so the next command reconnects
+            node._close_command_connection()
+            time.sleep(0.1)
+            assert session.run_command(node.node_id, "print(3)")["output"][0]["output"] == "3\n"
+            stats = session.stats
+            assert (stats["connections_opened"], stats["connections_reused"], stats["reconnects"]) == (2, 2, 1)
+            assert node.connections_opened == 2
+
+            session.close_command_connection(node.node_id)
+            assert not session.has_command_connection(node.node_id)
+            assert session.stats["open_connections"] == 0
+
+    def test_connection_dropped_during_command(self, remote_exec):
+        with fake_remote_node.FakeRemoteNode(latency=0.5) as node:
+            remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+            session = remote_exec.session
+            threading.Timer(0.2, node._close_command_connection).start()
+            with pytest.raises((RuntimeError, OSError)):
+                session.run_command(node.node_id, "print(1)")
+            assert not session.has_command_connection(node.node_id), "A failed connection is dropped"
+            assert session.run_command(node.node_id, "print(2)")["success"]
+
+
+class TestRemoteExecutionHandshake:
+    @pytest.fixture()
+    def remote_exec(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        yield remote_exec
+        remote_exec.stop()
+
+    @pytest.fixture()
+    def sent(self, monkeypatch):
+        """Record the time of each "open_connection" sent, dropping the first ``sent.drop`` of them"""
+
+        class Sent(list):
+            drop = 0
+
+        sent = Sent()
+        send = remote_execution._RemoteExecutionBroadcastConnection.broadcast_open_connection
+
+        def broadcast_open_connection(connection, *args, **kwargs):
+            sent.append(time.perf_counter())
+            if len(sent) > sent.drop:
+                send(connection, *args, **kwargs)
+
+        monkeypatch.setattr(
+            remote_execution._RemoteExecutionBroadcastConnection, "broadcast_open_connection", broadcast_open_connection
+        )
+        return sent
+
+    def test_retransmit_schedule(self, remote_exec, sent):
+        sent.drop = 3
+        with fake_remote_node.FakeRemoteNode() as node:
+            remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+            assert remote_exec.session.run_command(node.node_id, "print(1)")["success"]
+            assert len(sent) == 4
+            gaps = [b - a for a, b in zip(sent, sent[1:])]
+            for gap, expected in zip(gaps, (0.05, 0.1, 0.2)):
+                assert expected <= gap < expected + 0.1, f"Re-sent with a doubling wait: {gaps}"
+            assert node.connections_opened == 1
+
+    def test_give_up_on_lost_node(self, remote_exec, sent, monkeypatch):
+        monkeypatch.setattr(remote_execution, "_NODE_TIMEOUT_SECONDS", 1)
+        sent.drop = 1000
+        with fake_remote_node.FakeRemoteNode() as node:
+            remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+        start = time.perf_counter()
+        with pytest.raises(RuntimeError, match="not available"):
+            remote_exec.session.run_command(node.node_id, "print(1)")
+        assert time.perf_counter() - start < 5, "Gives up once the node is lost, rather than at command_connect_timeout"
+        assert max(b - a for a, b in zip(sent, sent[1:])) <= remote_execution._HANDSHAKE_MAX_RETRANSMIT_SECONDS + 0.1
+
+    def test_adopt_late_connection(self, remote_exec, sent):
+        # a busy editor handles every re-sent "open_connection" at its next tick, connecting (and replacing the connection) for each
+        with fake_remote_node.FakeRemoteNode(tick_delay=0.5) as node:
+            remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+            time.sleep(0.1)  # the node was found at the start of a tick, so ask for a connection in the middle of one
+            session = remote_exec.session
+            assert session.run_command(node.node_id, "print(1)")["output"][0]["output"] == "1\n"
+            assert len(sent) > 1 and node.connections_opened == len(sent)
+            time.sleep(0.6)
+            assert node.connections_opened == len(sent), "No connection is made after the one that was kept"
+            assert session.run_command(node.node_id, "print(2)")["output"][0]["output"] == "2\n"
+            assert session.stats["connections_opened"] == 1
+
+    def test_confirm_latest(self):
+        """A connection that the remote party closes is dropped for the next one that it made"""
+        node_id = "node"
+        listen_socket = socket.socket()
+        listen_socket.bind(("127.0.0.1", 0))
+        listen_socket.listen(remote_execution._HANDSHAKE_LISTEN_BACKLOG)
+        connection = remote_execution._RemoteExecutionCommandConnection(
+            remote_execution.RemoteExecutionConfig(), "client", node_id
+        )
+        connection._command_listen_socket = listen_socket
+        replaced = socket.create_connection(listen_socket.getsockname())
+        accepted = listen_socket.accept()[0]
+        kept = socket.socket()
+
+        def reply():
+            # the remote party handles a late "open_connection" after the connection was accepted
+            time.sleep(0.1)
+            kept.connect(listen_socket.getsockname())
+            replaced.close()
+            reader = remote_execution._RemoteExecutionMessageReader(4096)
+            message = remote_execution._RemoteExecutionMessage(None, None)
+            assert message.from_json_bytes(reader.read_message(kept))
+            assert message.data["exec_mode"] == remote_execution.MODE_EVAL_STATEMENT
+            kept.sendall(
+                remote_execution._RemoteExecutionMessage(
+                    remote_execution._TYPE_COMMAND_RESULT, node_id, "client", {"success": True, "result": "None", "output": []}
+                ).to_json_bytes()
+            )
+
+        thread = threading.Thread(target=reply)
+        thread.start()
+        try:
+            confirmed = connection._confirm_latest(accepted, time.perf_counter() + 5)
+            thread.join()
+            assert confirmed.getpeername() == kept.getsockname()
+            confirmed.close()
+        finally:
+            listen_socket.close()
+            kept.close()
+
+
+class TestRemoteExecutionCommandPorts:
+    @staticmethod
+    def run_on_nodes(config: remote_execution.RemoteExecutionConfig, count: int, **node_kwargs):
+        """Run a command on count fake nodes at once, returning the session, nodes and seconds taken"""
+        remote_exec = remote_execution.RemoteExecution(config)
+        remote_exec.start()
+        nodes = fake_remote_node.start_fake_nodes(count, **node_kwargs)
+        try:
+            for node in nodes:
+                remote_exec.wait_for_node(lambda n, node_id=node.node_id: n["node_id"] == node_id, timeout=5)
+            start = time.perf_counter()
+            results = remote_exec.session.run_command_on_nodes(
+                "print(1)", remote_node_ids=[node.node_id for node in nodes]
+            )
+            seconds = time.perf_counter() - start
+            assert all(result.success for result in results.values())
+            endpoints = [remote_exec.session._command_connections[node.node_id].command_endpoint for node in nodes]
+            return remote_exec.session, endpoints, seconds
+        finally:
+            for node in nodes:
+                node.stop()
+            remote_exec.stop()
+
+    def test_ephemeral_ports(self):
+        config = remote_execution.RemoteExecutionConfig()
+        assert config.command_endpoint[1] == 0
+        assert remote_execution._get_max_concurrent_handshakes(config) is None
+        # the nodes handle messages every 0.3s, so handshakes one at a time would take a tick each
+        session, endpoints, seconds = self.run_on_nodes(config, 4, tick_delay=0.3)
+        assert session._handshake_semaphore is None
+        assert all(port for _, port in endpoints) and len(set(endpoints)) == 4, "Each connection listens on its own port"
+        assert seconds < 1.0, "Handshakes run at the same time"
+
+    def test_command_port_pool(self):
+        ports, sockets = [], []
+        for _ in range(3):
+            s = socket.socket()
+            s.bind(("127.0.0.1", 0))
+            ports.append(s.getsockname()[1])
+            sockets.append(s)
+        busy_socket = sockets.pop(0)
+        busy_socket.listen(1)
+        for s in sockets:
+            s.close()
+        config = remote_execution.RemoteExecutionConfig()
+        config.command_port_pool = ports
+        assert remote_execution._get_max_concurrent_handshakes(config) == 3
+        try:
+            # the handshakes overlap (the nodes handle messages every 0.3s), so each needs a port to itself
+            session, endpoints, _ = self.run_on_nodes(config, 2, tick_delay=0.3)
+        finally:
+            busy_socket.close()
+        assert session._handshake_semaphore._initial_value == 3
+        assert sorted(port for _, port in endpoints) == sorted(ports[1:]), "A port that is in use is skipped"
+
+        config = remote_execution.RemoteExecutionConfig()
+        config.command_endpoint = ("127.0.0.1", ports[1])
+        assert remote_execution._get_max_concurrent_handshakes(config) == 1
+
+
+class TestRemoteExecutionDiscovery:
+    def test_wait_for_node_and_callbacks(self, monkeypatch):
+        # time out lost nodes quickly (but not between two pings of a live node)
+        monkeypatch.setattr(remote_execution, "_NODE_TIMEOUT_SECONDS", 1.5)
+        remote_exec = remote_execution.RemoteExecution()
+        assert remote_exec.wait_for_node(timeout=0.1) is None, "A session that isn't started finds nothing"
+        added, lost = [], []
+        remote_exec.add_node_added_callback(added.append)
+        remote_exec.add_node_lost_callback(lost.append)
+        remote_exec.start()
+        node = fake_remote_node.FakeRemoteNode(node_info={"project_name": "Discovered"})
+        try:
+            assert remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=0.2) is None
+            threading.Timer(0.2, node.start).start()
+            start = time.perf_counter()
+            found = remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+            assert found["project_name"] == "Discovered"
+            assert time.perf_counter() - start < 1, "Waiting pings quickly, and returns as soon as the pong arrives"
+            node.stop()
+            deadline = time.perf_counter() + 5
+            while not any(n["node_id"] == node.node_id for n in lost) and time.perf_counter() < deadline:
+                time.sleep(0.05)
+            assert node.node_id not in remote_exec.node_snapshot
+            assert [n["node_id"] for n in added if n["node_id"] == node.node_id] == [node.node_id]
+            assert [n["project_name"] for n in lost if n["node_id"] == node.node_id] == ["Discovered"]
+            remote_exec.remove_node_callback(added.append)
+            remote_exec.remove_node_callback(lost.append)
+            with fake_remote_node.FakeRemoteNode() as other_node:
+                assert remote_exec.wait_for_node(lambda n: n["node_id"] == other_node.node_id, timeout=5)
+            assert other_node.node_id not in [n["node_id"] for n in added], "Removed callbacks aren't called"
+        finally:
+            node.stop()
+            remote_exec.stop()
+
+    def test_stop_wakes_waiters(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        found = []
+        waiter = threading.Thread(target=lambda: found.append(remote_exec.wait_for_node(lambda n: False)), daemon=True)
+        waiter.start()
+        time.sleep(0.2)
+        remote_exec.stop()
+        waiter.join(timeout=5)
+        assert not waiter.is_alive(), "Waiting without a timeout returns once the session is stopped"
+        assert found == [None]
+
+
+class TestRemoteExecutionMetrics:
+    def test_histogram_quantiles(self):
+        histogram = remote_execution.RemoteExecutionHistogram()
+        for i in range(1, 10001):
+            histogram.record(i / 1000)
+        assert histogram.count == 10000
+        assert histogram.min == 0.001 and histogram.max == 10.0
+        for q in (0.5, 0.9, 0.99):
+            assert histogram.quantile(q) == pytest.approx(q * 10, rel=0.04)
+
+    def test_command_metrics(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        try:
+            with fake_remote_node.FakeRemoteNode(latency=0.05) as node:
+                remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+                for command in ("print(1)", "1 / 0"):
+                    remote_exec.session.run_command(node.node_id, command)
+        finally:
+            remote_exec.stop()
+        stats = remote_exec.stats()[node.node_id]
+        assert stats["counts"]["messages_out"] == 2
+        assert stats["counts"]["failures"] == 1
+        assert stats["counts"]["bytes_in"] > stats["counts"]["bytes_out"] > 0
+        assert stats["timings"]["handshake_seconds"]["count"] == 1
+        assert stats["timings"]["first_byte_seconds"]["min"] >= 0.05
+        assert stats["timings"]["total_seconds"]["max"] >= stats["timings"]["first_byte_seconds"]["max"]
+        prometheus = remote_exec.metrics.to_prometheus()
+        assert f'ue_remote_execution_failures_total{{node_id="{node.node_id}"}} 1' in prometheus
+        lines = [json.loads(line) for line in remote_exec.metrics.to_json_lines().splitlines()]
+        assert {line["node_id"] for line in lines} == {node.node_id, "*"}
+
+
+class TestRemoteExecutionTracing:
+    @pytest.fixture()
+    def recorder(self):
+        recorder = remote_execution.RemoteExecutionTraceRecorder()
+        remote_execution.add_trace_hook(recorder)
+        yield recorder
+        remote_execution.remove_trace_hook(recorder)
+
+    def test_spans(self, recorder):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        try:
+            with fake_remote_node.FakeRemoteNode() as node:
+                remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+                with remote_execution.trace_span("pipeline") as root, remote_execution.trace_tags(source="test"):
+                    remote_exec.session.run_command_on_nodes("print(1)", remote_node_ids=[node.node_id])
+                remote_exec.session.close_command_connection(node.node_id)
+        finally:
+            remote_exec.stop()
+        spans = {span["name"]: span for span in recorder.spans}
+        assert spans["run_command"]["parent_id"] == root.span_id
+        assert spans["open_command_connection"]["parent_id"] == spans["run_command"]["span_id"]
+        assert spans["run_command"]["tags"]["source"] == "test"
+        assert spans["run_command"]["tags"]["success"]
+        assert spans["close_command_connection"]["parent_id"] is None
+        trace = json.loads(json.dumps(recorder.to_chrome_trace()))
+        phases = {(event["name"], event["ph"]) for event in trace["traceEvents"]}
+        assert {("pipeline", "X"), ("run_command", "X"), ("node_added", "i")} <= phases
+
+    def test_no_hooks(self):
+        with remote_execution.trace_span("ignored") as span:
+            span.set_tag("key", "value")
+            assert remote_execution.get_current_span() is None
+
+
+class TestRemoteExecutionNodeSnapshot:
+    def test_versioned_snapshot(self):
+        nodes = remote_execution._RemoteExecutionBroadcastNodes()
+        data = {"project_name": "A", "machine": "m1", "engine_version": "4.26", "user": "u"}
+        nodes.update_remote_node("1", data, now=0)
+        snapshot = nodes.snapshot
+        nodes.update_remote_node("1", dict(data), now=0)
+        assert nodes.snapshot is snapshot, "An unchanged node should not rebuild the snapshot"
+        nodes.update_remote_node("2", dict(data, project_name="B"), now=1)
+        assert nodes.snapshot.version == snapshot.version + 1
+        assert nodes.snapshot.get("1") is snapshot.get("1"), "Unchanged nodes should be shared between snapshots"
+        nodes.timeout_remote_nodes(now=remote_execution._NODE_TIMEOUT_SECONDS + 0.5)
+        assert "1" in snapshot and "1" not in nodes.snapshot
+        assert nodes.remote_nodes == [dict(data, project_name="B", node_id="2")]
+
+    def test_find(self):
+        snapshot = remote_execution.RemoteExecutionNodeSnapshot(
+            1,
+            {
+                str(i): {"node_id": str(i), "project_name": f"P{i % 2}", "machine": f"m{i % 3}", "pid": i}
+                for i in range(12)
+            },
+        )
+        assert [n["node_id"] for n in snapshot.find(project_name="P0", machine="m0")] == ["0", "6"]
+        assert [n["node_id"] for n in snapshot.find(machine="m1", pid=4)] == ["4"]
+        assert snapshot.find(project_name="missing") == ()
+        assert len(snapshot.find()) == 12
+        assert sorted(snapshot.values("project_name")) == ["P0", "P1"]
+
+
+class TestRemoteExecutionNodePolicies:
+    @pytest.fixture()
+    def cluster(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        nodes = fake_remote_node.start_fake_nodes(3, latency=0.05)
+        node_ids = {node.node_id for node in nodes}
+        remote_exec.wait_for_node(lambda _: all(n in remote_exec.node_snapshot for n in node_ids), timeout=5)
+        yield remote_exec, node_ids
+        for node in nodes:
+            node.stop()
+        remote_exec.stop()
+
+    @staticmethod
+    def select(remote_exec, node_ids, policy, key=None):
+        return remote_exec.session.select_node(policy, key, predicate=lambda n: n["node_id"] in node_ids)
+
+    def test_least_in_flight(self, cluster):
+        remote_exec, node_ids = cluster
+        used = []
+
+        def run():
+            node_id = self.select(remote_exec, node_ids, remote_execution.NODE_POLICY_LEAST_IN_FLIGHT)
+            used.append(node_id)
+            remote_exec.session.run_command(node_id, "print(1)")
+
+        # hold a command on every node but one, so the idle node must be picked next
+        busy = sorted(node_ids)[:2]
+        threads = [threading.Thread(target=remote_exec.session.run_command, args=(n, "print(1)")) for n in busy]
+        for thread in threads:
+            thread.start()
+        while sum(remote_exec.session.node_load(n)["in_flight"] for n in busy) < 2:
+            time.sleep(0.001)
+        run()
+        for thread in threads:
+            thread.join()
+        assert used == [sorted(node_ids)[2]]
+        assert remote_exec.session.node_load(used[0])["ewma_latency"] >= 0.05
+
+    def test_round_robin_and_sticky(self, cluster):
+        remote_exec, node_ids = cluster
+        picks = [self.select(remote_exec, node_ids, remote_execution.NODE_POLICY_ROUND_ROBIN) for _ in range(6)]
+        assert picks == sorted(node_ids) * 2
+        sticky = {self.select(remote_exec, node_ids, remote_execution.NODE_POLICY_STICKY, "asset") for _ in range(5)}
+        assert len(sticky) == 1
+        remaining = node_ids - sticky
+        assert self.select(remote_exec, remaining, remote_execution.NODE_POLICY_STICKY, "asset") in remaining
+        with pytest.raises(ValueError):
+            self.select(remote_exec, node_ids, "bogus")
+
+    def test_custom_policy(self, cluster):
+        remote_exec, node_ids = cluster
+        with pytest.raises(TypeError):
+            remote_execution.RemoteExecutionNodePolicy()
+
+        class LastNodePolicy(remote_execution.RemoteExecutionNodePolicy):
+            def select(self, candidates, session, key=None):
+                return candidates[-1]
+
+        picked = self.select(remote_exec, node_ids, LastNodePolicy())
+        assert picked == [n["node_id"] for n in remote_exec.node_snapshot if n["node_id"] in node_ids][-1]
+
+
+class TestRemoteExecutionCommandStream:
+    def test_stream_output(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        try:
+            with fake_remote_node.FakeRemoteNode() as node:
+                remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+                command = "import sys\nfor i in range(1000):\n    print('line', i)\nsys.stderr.write('oops\\n')\n1 / 0"
+                with remote_exec.session.stream_command(node.node_id, command, max_buffered_lines=2) as stream:
+                    entries = list(stream)
+                    result = stream.result()
+                streamed = []
+                stream = remote_exec.session.stream_command(node.node_id, "print('a')", callback=streamed.append)
+                assert stream.result()["success"]
+        finally:
+            remote_exec.stop()
+        assert entries[:2] == [{"type": "Info", "output": "line 0"}, {"type": "Info", "output": "line 1"}]
+        assert len(entries) == 1001
+        assert entries[-1] == {"type": "Error", "output": "oops"}
+        assert not result["success"]
+        assert "ZeroDivisionError" in result["result"]
+        assert streamed == [{"type": "Info", "output": "a"}]
+        assert len(result["output"]) == 1001, "Printed output still reaches the command result"
+
+    def test_stream_keeps_original_output(self, monkeypatch):
+        logged = []
+        unreal = types.SimpleNamespace(log=logged.append, log_warning=logged.append, log_error=logged.append)
+        monkeypatch.setitem(sys.modules, "unreal", unreal)
+        original_logs = (unreal.log, unreal.log_warning, unreal.log_error)
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        try:
+            with fake_remote_node.FakeRemoteNode() as node:
+                remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+                command = "import unreal\nprint('a', 1, sep='-')\nunreal.log_warning('careful')"
+                with remote_exec.session.stream_command(node.node_id, command) as stream:
+                    entries = list(stream)
+                    result = stream.result()
+                stdout = sys.stdout
+                # the stream can't connect back, but the command still runs, and the editor is left as it was
+                command_stream = remote_execution.RemoteExecutionCommandStream(remote_exec._config)
+                command_stream._listen_socket.close()
+                unstreamed = remote_exec.session.run_command(node.node_id, command_stream.wrap_command("print('b')"))
+                assert unstreamed["success"] and unstreamed["output"] == [{"type": "Info", "output": "b\n"}]
+                assert sys.stdout is stdout and node.namespace["print"].__name__ == "_print"
+                assert (unreal.log, unreal.log_warning, unreal.log_error) == original_logs
+        finally:
+            remote_exec.stop()
+        assert entries == [{"type": "Info", "output": "a-1"}, {"type": "Warning", "output": "careful"}]
+        assert result["output"] == [{"type": "Info", "output": "a-1\n"}]
+        assert logged == ["careful"]
+        assert (unreal.log, unreal.log_warning, unreal.log_error) == original_logs
+
+
+    def test_close_mid_command(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        try:
+            with fake_remote_node.FakeRemoteNode() as node:
+                remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+                command = "import time\nfor i in range(40):\n    print('line', i)\n    time.sleep(0.01)\nprint('DONE')"
+                stream = remote_exec.session.stream_command(node.node_id, command, max_buffered_lines=2)
+                assert next(iter(stream)) == {"type": "Info", "output": "line 0"}
+                stream.close()
+                result = stream.result(timeout=10)
+        finally:
+            remote_exec.stop()
+        assert result["success"], "The remote command keeps running after the stream is closed"
+        assert result["output"][-1] == {"type": "Info", "output": "DONE\n"}
+        assert len(result["output"]) == 41
+
+
+class TestRemoteExecutionResultCache:
+    def test_lru_ttl_and_invalidation(self):
+        cache = remote_execution.RemoteExecutionResultCache(max_entries=2, ttl=10)
+        cache.put("n", "P", "a()\r\n", {"success": True, "output": []}, paths=["/Game/A/"], now=0)
+        cache.put("n", "P", "b()", {"success": True, "output": []}, paths=["/Game/B/Chair.Chair"], now=0)
+        assert cache.get("n", "P", "a()  ", now=1)["success"]
+        assert cache.get("n", "Q", "a()", now=1) is None
+        normalize = remote_execution.RemoteExecutionResultCache.normalize_command
+        assert normalize("x = '''a  \r\nb'''\r\n") == "x = '''a  \nb'''"
+        assert normalize("x = '''a  \nb'''") != normalize("x = '''a\nb'''"), "Whitespace inside a literal is kept"
+        cache.put("n", "P", "c()", {"success": True, "output": []}, now=1)
+        assert cache.get("n", "P", "b()", now=1) is None, "b() was the least recently used"
+        assert cache.get("n", "P", "a()", now=10) is None, "a() has expired"
+        cache.put("n", "P", "a()", {"success": True, "output": []}, paths=["/Game/A"], now=10)
+        cache.put("n", "P", "b()", {"success": True, "output": []}, paths=["/Game/B/Chair"], now=10)
+        assert cache.invalidate(["/Game/B/Chair.Chair"], project="Q") == 0
+        assert cache.invalidate(["/Game/B"], project="P") == 1
+        assert cache.invalidate(["/Game/A/Table"]) == 1
+        assert cache.stats() == {
+            "hits": 1,
+            "misses": 3,
+            "hit_rate": 0.25,
+            "expirations": 1,
+            "evictions": 2,
+            "invalidations": 2,
+            "entries": 0,
+        }
+
+    def test_run_cached_command(self):
+        remote_exec = remote_execution.RemoteExecution()
+        remote_exec.start()
+        try:
+            with fake_remote_node.FakeRemoteNode(execute=False) as node:
+                remote_exec.wait_for_node(lambda n: n["node_id"] == node.node_id, timeout=5)
+                session = remote_exec.session
+                for _ in range(3):
+                    data = session.run_cached_command(node.node_id, "query()", paths=["/Game/A"])
+                    assert data["result"] == "query()"
+                assert node.commands_run == 1
+                session.invalidate_cache(["/Game/A/Chair"], node.node_id)
+                session.run_cached_command(node.node_id, "query()", paths=["/Game/A"])
+                assert node.commands_run == 2
+        finally:
+            remote_exec.stop()
+        assert remote_exec.result_cache.stats()["hits"] == 2
@@ -50,19 +50,7 @@ class TestUnreal4:
         assert temp_file.exists(), f"Failed to exec python command {command}"
 
     def test_run_python_remote(self, unreal_instance: ue4.Unreal4, datadir: Path):
-        with unreal_instance.open():
-            max_retry = 100
-            retry = 0
-            unreal_instance.run_editor()
-            unreal_remotes = unreal_instance.get_running_unreal_remote()
-            while not unreal_remotes:
-                unreal_remotes = unreal_instance.get_running_unreal_remote()
-                if retry > max_retry:
-                    raise Exception("Failed to Start editor")
-                print("Wait for unreal to start...")
-                retry +=1
-                time.sleep(1)
-
+        with unreal_instance.open(ready_timeout=100):
             command = 'unreal.log(unreal.EditorLevelLibrary.spawn_actor_from_class(unreal.StaticMeshActor, unreal.Vector(0,0,0), unreal.Rotator(0,0,0)))'
             p = cast(
                 UnrealRemoteResponse,
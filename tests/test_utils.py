@@ -0,0 +1,58 @@
+import sys
+import time
+import subprocess
+import psutil
+from ..ue4 import utils
+from ..ue4.unreal_global import Unreal4, Unreal4Config
+
+
+class TestProcessRegistry:
+    def test_wait_and_terminate(self):
+        registry = utils.ProcessRegistry()
+        quick = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.2)"])
+        slow = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        registry.register(quick.pid)
+        registry.register(slow.pid)
+        assert registry.wait_for_exit([quick.pid], timeout=10)
+        assert not registry.wait_for_exit([slow.pid], timeout=0.1)
+        assert [p.pid for p in registry.processes()] == [slow.pid]
+        assert registry.terminate(timeout=5)
+        assert slow.wait(timeout=5) is not None
+        assert not registry.is_any_running()
+
+    def test_process_exits_while_checked(self, monkeypatch):
+        registry = utils.ProcessRegistry()
+        slow = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        try:
+            process = registry.register(slow.pid)
+
+            def status():
+                raise psutil.NoSuchProcess(slow.pid)
+
+            monkeypatch.setattr(process, "status", status)
+            assert registry.processes() == []
+            assert registry.wait_for_exit(timeout=1)
+        finally:
+            slow.kill()
+            slow.wait()
+
+    def test_close_all_editor_only_closes_launched_editors(self, tmp_path):
+        editor_path = tmp_path / "UE4Editor.exe"
+        editor_path.write_text(f"#!{sys.executable}\nimport time\ntime.sleep(60)\n")
+        editor_path.chmod(0o755)
+        project_path = tmp_path / "FakeProject.uproject"
+        project_path.write_text("{}")
+        unreal4 = Unreal4(Unreal4Config(str(editor_path), str(project_path)))
+        other = subprocess.Popen([str(editor_path), str(project_path)])
+        try:
+            start = time.perf_counter()
+            with unreal4.open(wait_before_close=0.5):
+                launched = utils.process_registry.processes()
+                assert len(launched) == 1 and launched[0].pid != other.pid
+            assert time.perf_counter() - start < 10
+            assert not launched[0].is_running() or launched[0].status() == "zombie"
+            assert other.poll() is None
+            assert utils.is_any_running("UE4Editor")
+        finally:
+            other.kill()
+            other.wait()
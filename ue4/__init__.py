@@ -1,2 +1,3 @@
 from .unreal_global import Unreal4, Unreal4Config, RemoteExecution
-from . import unreal_utils, unreal_wrapper
\ No newline at end of file
+from .async_remote_execution import AsyncRemoteExecution
+from . import unreal_utils, unreal_wrapper
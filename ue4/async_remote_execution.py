@@ -0,0 +1,491 @@
+import uuid as _uuid
+import socket as _socket
+import asyncio as _asyncio
+
+from .remote_execution import (
+    RemoteExecutionConfig,
+    MODE_EXEC_FILE,
+    MODE_EVAL_STATEMENT,
+    _NODE_PING_SECONDS,
+    _HANDSHAKE_RETRANSMIT_SECONDS,
+    _HANDSHAKE_MAX_RETRANSMIT_SECONDS,
+    _HANDSHAKE_CONFIRM_COMMAND,
+    _TYPE_PING,
+    _TYPE_PONG,
+    _TYPE_OPEN_CONNECTION,
+    _TYPE_CLOSE_CONNECTION,
+    _TYPE_COMMAND,
+    _TYPE_COMMAND_RESULT,
+    _RemoteExecutionBroadcastNodes,
+    _RemoteExecutionConstantMessages,
+    _EMPTY_NODE_SNAPSHOT,
+    _RemoteExecutionMessage,
+    _RemoteExecutionMessageReader,
+    _create_broadcast_socket,
+    _get_max_concurrent_handshakes,
+    _logger,
+)
+
+class AsyncRemoteExecution(object):
+    '''
+    An asyncio remote execution session, the counterpart of `RemoteExecution` for code that already runs on an event loop.
+    Discovery runs as a datagram protocol on the loop and commands are sent over asyncio streams, so waiting on a remote "node" (UE4 instance running Python) never parks a thread.
+
+    Usage:
+        async with AsyncRemoteExecution() as remote_exec:
+            node = await remote_exec.wait_for_node(timeout=10)
+            async with await remote_exec.open_command_connection(node['node_id']) as command_connection:
+                result = await command_connection.run_command('print(42)')
+
+    Args:
+        config (RemoteExecutionConfig): Configuration controlling the connection settings for this session.
+    '''
+    def __init__(self, config=RemoteExecutionConfig()):
+        self._config = config
+        self._node_id = str(_uuid.uuid4())
+        self._nodes = None
+        self._nodes_changed = None
+        self._broadcast_transport = None
+        self._ping_task = None
+        self._accept_semaphore = None
+        self._command_connections = {}
+        self._command_connection_locks = {}
+        self._constant_messages = _RemoteExecutionConstantMessages(self._node_id)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+    @property
+    def remote_nodes(self):
+        '''
+        Get the current set of discovered remote "nodes" (UE4 instances running Python).
+
+        Returns:
+            list: A list of dicts containg the node ID and the other data.
+        '''
+        return self._nodes.remote_nodes if self._nodes else []
+
+    @property
+    def node_snapshot(self):
+        '''
+        Get an immutable, indexed snapshot of the discovered remote "nodes" (UE4 instances running Python), without copying any node data.
+
+        Returns:
+            RemoteExecutionNodeSnapshot: The current snapshot (its version increases whenever the set of nodes changes).
+        '''
+        return self._nodes.snapshot if self._nodes else _EMPTY_NODE_SNAPSHOT
+
+    async def start(self):
+        '''
+        Start the remote execution session on the running event loop. This will begin the discovey process for remote "nodes" (UE4 instances running Python).
+        '''
+        loop = _asyncio.get_running_loop()
+        self._nodes = _RemoteExecutionBroadcastNodes()
+        self._nodes_changed = _asyncio.Event()
+        max_handshakes = _get_max_concurrent_handshakes(self._config)
+        self._accept_semaphore = _asyncio.Semaphore(max_handshakes) if max_handshakes else None
+        broadcast_socket = _create_broadcast_socket(self._config)
+        broadcast_socket.setblocking(False)
+        self._broadcast_transport, _protocol = await loop.create_datagram_endpoint(lambda: _AsyncBroadcastProtocol(self), sock=broadcast_socket)
+        self._ping_task = loop.create_task(self._run_ping())
+
+    async def stop(self):
+        '''
+        Stop the remote execution session. This will end the discovey process for remote "nodes" (UE4 instances running Python), and close any open command connections.
+        '''
+        for command_connection in list(self._command_connections.values()):
+            await command_connection.close()
+        if self._ping_task:
+            self._ping_task.cancel()
+            try:
+                await self._ping_task
+            except _asyncio.CancelledError:
+                pass
+            self._ping_task = None
+        if self._broadcast_transport:
+            self._broadcast_transport.close()
+            self._broadcast_transport = None
+        self._nodes = None
+
+    async def wait_for_node(self, predicate=None, timeout=None):
+        '''
+        Wait until a remote node matching the given predicate has been discovered.
+
+        Args:
+            predicate (callable): Called with each node dict (as returned by `remote_nodes`), returning True for a matching node. None matches any node.
+            timeout (float): The number of seconds to wait, or None to wait forever.
+
+        Returns:
+            dict: The first matching node (containing the node ID and the other data).
+
+        Raises:
+            asyncio.TimeoutError: If no matching node was discovered within the timeout.
+        '''
+        return await _asyncio.wait_for(self._wait_for_node(predicate), timeout)
+
+    async def open_command_connection(self, remote_node_id):
+        '''
+        Open a command connection to the given remote "node" (a UE4 instance running Python), or return the one that is already open.
+        Concurrent callers for the same remote node share a single connection, as the remote node only keeps the last one it was asked to open.
+        The returned connection can be used as an async context manager to close it once done.
+
+        Args:
+            remote_node_id (string): The ID of the remote node (this can be obtained by querying `remote_nodes`).
+
+        Returns:
+            AsyncRemoteExecutionCommandConnection: The open command connection.
+        '''
+        async with self._command_connection_locks.setdefault(remote_node_id, _asyncio.Lock()):
+            command_connection = self._command_connections.get(remote_node_id)
+            if command_connection and command_connection.is_alive():
+                return command_connection
+            if command_connection:
+                await command_connection.close()
+            reader, writer = await self._try_accept(remote_node_id)
+            command_connection = AsyncRemoteExecutionCommandConnection(self, remote_node_id, reader, writer)
+            self._command_connections[remote_node_id] = command_connection
+            return command_connection
+
+    async def close_command_connection(self, remote_node_id):
+        '''
+        Close the command connection to the given remote node, if one is open.
+
+        Args:
+            remote_node_id (string): The ID of the remote node.
+        '''
+        command_connection = self._command_connections.get(remote_node_id)
+        if command_connection:
+            await command_connection.close()
+
+    async def run_command(self, remote_node_id, command, unattended=True, exec_mode=MODE_EXEC_FILE, raise_on_failure=False):
+        '''
+        Run a command remotely on the given remote node, re-using its command connection (or opening one if needed).
+
+        Args:
+            remote_node_id (string): The ID of the remote node to run the command on.
+            command (string): The Python command to run remotely.
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+            raise_on_failure (bool): True to raise a RuntimeError if the command fails on the remote target.
+
+        Returns:
+            dict: The result from running the remote command (see `command_result` from the protocol definition).
+        '''
+        command_connection = await self.open_command_connection(remote_node_id)
+        return await command_connection.run_command(command, unattended, exec_mode, raise_on_failure)
+
+    async def _wait_for_node(self, predicate):
+        '''
+        Wait (without a timeout) for a remote node matching the given predicate to be discovered.
+        '''
+        while True:
+            for node in self.node_snapshot:
+                if predicate is None or predicate(node):
+                    return node
+            await self._nodes_changed.wait()
+
+    async def _try_accept(self, remote_node_id):
+        '''
+        Ask the remote node to connect to us, and wait to accept its connection.
+        The "open_connection" message is re-sent on an exponential schedule (`_HANDSHAKE_RETRANSMIT_SECONDS`, doubling up to `_HANDSHAKE_MAX_RETRANSMIT_SECONDS`),
+        so a lost datagram only costs a short wait, until `command_connect_timeout` has elapsed or the remote node is no longer discovered.
+        Each handshake listens on its own command port (see `RemoteExecutionConfig.command_port_pool`), so the incoming connection can only have come from the remote node it was advertised to.
+
+        Args:
+            remote_node_id (string): The ID of the remote node that we want to open a command connection with.
+
+        Returns:
+            tuple: The (StreamReader, StreamWriter) pair for the accepted connection.
+        '''
+        if self._accept_semaphore:
+            await self._accept_semaphore.acquire()
+        try:
+            accepted = _asyncio.Queue()
+            def _handle_command_connection(reader, writer):
+                writer.get_extra_info('socket').setsockopt(_socket.SOL_SOCKET, _socket.SO_RCVBUF, self._config.receive_buffer_size)
+                accepted.put_nowait((reader, writer))
+            command_server = await self._start_command_server(_handle_command_connection)
+            command_port = command_server.sockets[0].getsockname()[1]
+            loop = _asyncio.get_running_loop()
+            deadline = loop.time() + self._config.command_connect_timeout
+            retransmit_seconds = _HANDSHAKE_RETRANSMIT_SECONDS
+            attempts = 0
+            try:
+                while True:
+                    if remote_node_id not in self.node_snapshot:
+                        raise RuntimeError('Remote party "{0}" is not available to attempt the command socket connection!'.format(remote_node_id))
+                    wait_seconds = min(retransmit_seconds, deadline - loop.time())
+                    if wait_seconds <= 0:
+                        break
+                    self._broadcast_message(_RemoteExecutionMessage(_TYPE_OPEN_CONNECTION, self._node_id, remote_node_id, {
+                        'command_ip': self._config.command_endpoint[0],
+                        'command_port': command_port,
+                        }))
+                    attempts += 1
+                    try:
+                        connection = await _asyncio.wait_for(accepted.get(), wait_seconds)
+                    except _asyncio.TimeoutError:
+                        retransmit_seconds = min(retransmit_seconds * 2, _HANDSHAKE_MAX_RETRANSMIT_SECONDS)
+                        continue
+                    if attempts > 1:
+                        # The remote party replaces its connection for every "open_connection" it handles, so find the one it kept
+                        connection = await self._confirm_latest(remote_node_id, connection, accepted, deadline)
+                    return connection
+                raise RuntimeError('Remote party failed to attempt the command socket connection!')
+            finally:
+                command_server.close()
+                while not accepted.empty():
+                    accepted.get_nowait()[1].close()
+        finally:
+            if self._accept_semaphore:
+                self._accept_semaphore.release()
+
+    async def _confirm_latest(self, remote_node_id, connection, accepted, deadline):
+        '''
+        Find the command connection that the remote node kept, after "open_connection" was sent more than once (see `_RemoteExecutionCommandConnection._confirm_latest`).
+
+        Args:
+            remote_node_id (string): The ID of the remote node.
+            connection (tuple): The (StreamReader, StreamWriter) pair for the connection that has already been accepted.
+            accepted (asyncio.Queue): The (StreamReader, StreamWriter) pairs for the connections waiting to be accepted.
+            deadline (float): The event loop time to give up at.
+
+        Returns:
+            tuple: The (StreamReader, StreamWriter) pair for the connection that the remote node kept.
+        '''
+        loop = _asyncio.get_running_loop()
+        confirm_bytes = _RemoteExecutionMessage(_TYPE_COMMAND, self._node_id, remote_node_id, {
+            'command': _HANDSHAKE_CONFIRM_COMMAND,
+            'unattended': True,
+            'exec_mode': MODE_EVAL_STATEMENT,
+            }).to_json_bytes()
+        while True:
+            # The newest of the connections already waiting is tried first
+            while not accepted.empty():
+                connection[1].close()
+                connection = accepted.get_nowait()
+            reader, writer = connection
+            wait_seconds = max(deadline - loop.time(), _HANDSHAKE_MAX_RETRANSMIT_SECONDS)
+            message_reader = _RemoteExecutionMessageReader(self._config.receive_buffer_size, self._config.max_message_size)
+            data = None
+            try:
+                writer.write(confirm_bytes)
+                await writer.drain()
+                data = await _asyncio.wait_for(_read_message(reader, message_reader, self._config.receive_buffer_size), wait_seconds)
+            except (_asyncio.TimeoutError, _socket.error):
+                pass
+            message = _RemoteExecutionMessage(None, None)
+            if data is not None and message.from_json_bytes(data) and message.type_ == _TYPE_COMMAND_RESULT:
+                return connection
+            writer.close()
+            try:
+                connection = await _asyncio.wait_for(accepted.get(), wait_seconds)
+            except _asyncio.TimeoutError:
+                raise RuntimeError('Remote party failed to attempt the command socket connection!')
+
+    async def _start_command_server(self, client_connected_cb):
+        '''
+        Start a TCP server for a single command connection, listening on the first free port from `command_port_pool` (if set), otherwise on the port from `command_endpoint` (where 0 picks a new ephemeral port).
+        '''
+        command_ip = self._config.command_endpoint[0]
+        command_ports = list(self._config.command_port_pool or [self._config.command_endpoint[1]])
+        for command_port in command_ports:
+            try:
+                return await _asyncio.start_server(client_connected_cb, command_ip, command_port, reuse_address=True)
+            except _socket.error:
+                if command_port == command_ports[-1]:
+                    raise
+
+    async def _run_ping(self):
+        '''
+        Main loop for the task that sends discovery "ping" messages and times out remote nodes that have stopped responding.
+        '''
+        while True:
+            self._broadcast_bytes(self._constant_messages.get(_TYPE_PING))
+            self._nodes.timeout_remote_nodes()
+            await _asyncio.sleep(_NODE_PING_SECONDS)
+
+    def _broadcast_message(self, message):
+        '''
+        Broadcast the given message over the UDP transport to anything that might be listening.
+
+        Args:
+            message (_RemoteExecutionMessage): The message to broadcast.
+        '''
+        self._broadcast_bytes(message.to_json_bytes())
+
+    def _broadcast_bytes(self, message_bytes):
+        '''
+        Broadcast the given encoded message over the UDP transport to anything that might be listening.
+
+        Args:
+            message_bytes (bytes): The JSON representation of the message as UTF-8 bytes.
+        '''
+        if self._broadcast_transport:
+            self._broadcast_transport.sendto(message_bytes, self._config.multicast_group_endpoint)
+
+    def _handle_data(self, data):
+        '''
+        Handle data received from the UDP broadcast transport.
+
+        Args:
+            data (bytes): The raw bytes received from the transport.
+        '''
+        if data == self._constant_messages.get(_TYPE_PING):
+            return # Our own "ping", looped back by the multicast group
+        message = _RemoteExecutionMessage(None, None)
+        if not message.from_json_bytes(data) or not message.passes_receive_filter(self._node_id):
+            return
+        if message.type_ == _TYPE_PONG:
+            version = self._nodes.snapshot.version
+            self._nodes.update_remote_node(message.source, message.data)
+            if self._nodes.snapshot.version != version:
+                # Wake anything waiting on the node set, and arm a new event for the next change
+                self._nodes_changed.set()
+                self._nodes_changed = _asyncio.Event()
+            return
+        _logger.debug('Unhandled remote execution message type "{0}"'.format(message.type_))
+
+class AsyncRemoteExecutionCommandConnection(object):
+    '''
+    An asyncio remote execution command connection (for TCP based command processing), opened by `AsyncRemoteExecution.open_command_connection`.
+
+    Args:
+        remote_exec (AsyncRemoteExecution): The session that opened this connection.
+        remote_node_id (string): The ID of the remote "node" (the UE4 instance running Python).
+        reader (asyncio.StreamReader): The stream to receive messages from the remote node.
+        writer (asyncio.StreamWriter): The stream to send messages to the remote node.
+    '''
+    def __init__(self, remote_exec, remote_node_id, reader, writer):
+        self._remote_exec = remote_exec
+        self._remote_node_id = remote_node_id
+        self._reader = reader
+        self._writer = writer
+        self._lock = _asyncio.Lock()
+        self._message_reader = _RemoteExecutionMessageReader(remote_exec._config.receive_buffer_size, remote_exec._config.max_message_size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def remote_node_id(self):
+        return self._remote_node_id
+
+    def is_alive(self):
+        '''
+        Check whether the command connection is still open.
+
+        Returns:
+            bool: True if the connection has not been closed by either party, False otherwise.
+        '''
+        return not (self._writer.is_closing() or self._reader.at_eof())
+
+    async def run_command(self, command, unattended=True, exec_mode=MODE_EXEC_FILE, raise_on_failure=False):
+        '''
+        Run a command on the remote party. Commands sent concurrently over the same connection are run one at a time.
+
+        Args:
+            command (string): The Python command to run remotely.
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+            raise_on_failure (bool): True to raise a RuntimeError if the command fails on the remote target.
+
+        Returns:
+            dict: The result from running the remote command (see `command_result` from the protocol definition).
+        '''
+        async with self._lock:
+            try:
+                self._writer.write(_RemoteExecutionMessage(_TYPE_COMMAND, self._remote_exec._node_id, self._remote_node_id, {
+                    'command': command,
+                    'unattended': unattended,
+                    'exec_mode': exec_mode,
+                    }).to_json_bytes())
+                await self._writer.drain()
+                data = (await self._receive_message(_TYPE_COMMAND_RESULT)).data
+            except BaseException:
+                # The command was interrupted (eg, cancelled) or failed, so its reply may still arrive: drop the connection rather than let the next command read it
+                self._abort()
+                raise
+        if raise_on_failure and not data['success']:
+            raise RuntimeError('Remote Python Command failed! {0}'.format(data['result']))
+        return data
+
+    async def close(self):
+        '''
+        Close the command connection, attempting to notify the remote party.
+        '''
+        self._abort()
+        try:
+            await self._writer.wait_closed()
+        except _socket.error:
+            pass
+
+    def _abort(self):
+        '''
+        Close the command connection without waiting, attempting to notify the remote party, so the session opens a new one for the next command.
+        '''
+        if self._remote_exec._command_connections.get(self._remote_node_id) is self:
+            del self._remote_exec._command_connections[self._remote_node_id]
+        if not self._writer.is_closing():
+            self._remote_exec._broadcast_bytes(self._remote_exec._constant_messages.get(_TYPE_CLOSE_CONNECTION, self._remote_node_id))
+            self._writer.close()
+
+    async def _receive_message(self, expected_type):
+        '''
+        Receive a message over the TCP stream from the remote party.
+
+        Args:
+            expected_type (string): The type of message we expect to receive.
+
+        Returns:
+            The message that was received.
+        '''
+        data = await _read_message(self._reader, self._message_reader, self._remote_exec._config.receive_buffer_size)
+        if data:
+            message = _RemoteExecutionMessage(None, None)
+            if message.from_json_bytes(data) and message.passes_receive_filter(self._remote_exec._node_id) and message.type_ == expected_type:
+                return message
+        raise RuntimeError('Remote party failed to send a valid response!')
+
+async def _read_message(reader, message_reader, read_size):
+    '''
+    Read a single complete JSON document from an asyncio stream.
+
+    Args:
+        reader (asyncio.StreamReader): The stream to read from.
+        message_reader (_RemoteExecutionMessageReader): The reader holding any data already received from the stream.
+        read_size (int): The maximum number of bytes to read at a time.
+
+    Returns:
+        bytearray: The raw bytes of the JSON document, or None if the stream was closed before a complete document was received.
+    '''
+    data = message_reader.next_message()
+    while data is None:
+        chunk = await reader.read(read_size)
+        if not chunk:
+            break
+        data = message_reader.feed(chunk)
+    return data
+
+class _AsyncBroadcastProtocol(_asyncio.DatagramProtocol):
+    '''
+    The datagram protocol for the UDP based discovery messages of an `AsyncRemoteExecution` session.
+
+    Args:
+        remote_exec (AsyncRemoteExecution): The session to hand received datagrams to.
+    '''
+    def __init__(self, remote_exec):
+        self._remote_exec = remote_exec
+
+    def datagram_received(self, data, addr):
+        self._remote_exec._handle_data(data)
+
+    def error_received(self, exc):
+        _logger.debug('Remote execution broadcast error: {0}'.format(exc))
@@ -0,0 +1,173 @@
+# utf-8
+# python 3.9
+from __future__ import annotations
+
+import os
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from subprocess import Popen, TimeoutExpired
+from typing import Optional, Sequence
+
+import psutil
+
+from .remote_execution import trace_span
+from .unreal_global import Unreal4
+from .utils import logging, kill_process_tree
+
+DEFAULT_POLL_INTERVAL = 0.25
+
+
+class CmdletStatus(str, Enum):
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    TIMED_OUT = "timed_out"
+    MEMORY_EXCEEDED = "memory_exceeded"
+    ERROR = "error"
+
+
+@dataclass
+class CmdletResult:
+    """The outcome of one python script run as an editor commandlet"""
+
+    script: str
+    status: CmdletStatus
+    returncode: Optional[int] = None
+    pid: int = 0
+    started_at: float = 0.0
+    duration: float = 0.0
+    peak_rss: int = 0
+    stdout_path: str = field(default_factory=str)
+    stderr_path: str = field(default_factory=str)
+    error: str = field(default_factory=str)
+
+    @property
+    def success(self) -> bool:
+        return self.status == CmdletStatus.SUCCEEDED
+
+
+def process_tree_rss(pid: int) -> int:
+    """
+    :param int pid: The ID of the root process.
+    :return int: The resident memory of the process and all its children, in bytes (0 if it has exited).
+    """
+    try:
+        root = psutil.Process(pid)
+        processes = [root, *root.children(recursive=True)]
+    except psutil.Error:
+        return 0
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss
+
+
+def run_python_cmdlets(
+    unreal4: Unreal4,
+    script_files: Sequence[str],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    max_rss_bytes: Optional[int] = None,
+    log_dir: Optional[str] = None,
+    fully_initialize: bool = False,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> list[CmdletResult]:
+    """
+    Run many python scripts as Unreal4.run_python_cmdlet does, with up to max_workers editor processes at once.
+
+    Each process's stdout and stderr are written straight to files in log_dir as it runs (rather than buffered in
+    memory), and a process (with its children) is killed once it runs longer than timeout or its memory grows past
+    max_rss_bytes, so one stuck or leaking script can't hold up the rest.
+
+    :param object unreal4: The Unreal4 whose editor runs the scripts.
+    :param list script_files: The python scripts to run.
+    :param int max_workers: The maximum number of editor processes at once, or None for one per core.
+    :param float timeout: The wall-clock seconds each script may run, or None for no limit.
+    :param int max_rss_bytes: The resident memory each script's process tree may use, or None for no limit.
+    :param str log_dir: The folder for the output files, or None for a new temporary folder.
+    :param bool fully_initialize: True to run the scripts in a fully initialized editor, rather than the pythonscript commandlet.
+    :param float poll_interval: The seconds between checks of each process's limits.
+    :return list: The CmdletResult of each script, in order.
+    """
+    log_dir = log_dir or tempfile.mkdtemp(prefix="ue4_cmdlets_")
+    os.makedirs(log_dir, exist_ok=True)
+
+    def run(index_script: tuple[int, str]) -> CmdletResult:
+        index, script = index_script
+        log_name = f"{index:04d}_{Path(script).stem}"
+        return _run_python_cmdlet(
+            unreal4,
+            script,
+            os.path.join(log_dir, f"{log_name}.stdout.log"),
+            os.path.join(log_dir, f"{log_name}.stderr.log"),
+            timeout,
+            max_rss_bytes,
+            fully_initialize,
+            poll_interval,
+        )
+
+    with ThreadPoolExecutor(max_workers or os.cpu_count() or 1) as executor:
+        return list(executor.map(run, enumerate(script_files)))
+
+
+def _run_python_cmdlet(
+    unreal4: Unreal4,
+    script: str,
+    stdout_path: str,
+    stderr_path: str,
+    timeout: Optional[float],
+    max_rss_bytes: Optional[int],
+    fully_initialize: bool,
+    poll_interval: float,
+) -> CmdletResult:
+    result = CmdletResult(
+        script, CmdletStatus.ERROR, stdout_path=stdout_path, stderr_path=stderr_path
+    )
+    argv, use_cmd = Unreal4.python_cmdlet_argv(script, fully_initialize)
+    with trace_span("run_python_cmdlets.script", script=script) as span, open(
+        stdout_path, "wb"
+    ) as stdout, open(stderr_path, "wb") as stderr:
+        result.started_at = time.time()
+        start = time.perf_counter()
+        try:
+            process = unreal4.run_editor(
+                argv,
+                run_process_callable=Popen,
+                run_process_kws={"stdout": stdout, "stderr": stderr},
+                as_cmd=use_cmd,
+            )
+        except OSError as e:
+            result.error = str(e)
+            logging.warning(f"Failed to run {script}: {e}")
+            return result
+        result.pid = process.pid
+        status = None
+        while status is None:
+            try:
+                result.returncode = process.wait(timeout=poll_interval)
+                break
+            except TimeoutExpired:
+                pass
+            result.peak_rss = max(result.peak_rss, process_tree_rss(process.pid))
+            if timeout is not None and time.perf_counter() - start > timeout:
+                status = CmdletStatus.TIMED_OUT
+            elif max_rss_bytes is not None and result.peak_rss > max_rss_bytes:
+                status = CmdletStatus.MEMORY_EXCEEDED
+        if status is not None:
+            logging.warning(f"Killing {script} (pid {process.pid}): {status.value}")
+            kill_process_tree(process.pid)
+            result.returncode = process.wait()
+        else:
+            status = CmdletStatus.SUCCEEDED if result.returncode == 0 else CmdletStatus.FAILED
+        result.status = status
+        result.duration = time.perf_counter() - start
+        span.set_tag("status", status.value)
+        span.set_tag("returncode", result.returncode)
+        span.set_tag("peak_rss", result.peak_rss)
+    return result
@@ -0,0 +1,393 @@
+# utf-8
+# python 3.9
+from __future__ import annotations
+
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from subprocess import Popen
+from typing import Iterator, Optional, Sequence
+
+import psutil
+
+from .remote_execution import (
+    MODE_EVAL_STATEMENT,
+    RemoteExecutionHistogram,
+    trace_span,
+)
+from .unreal_global import Unreal4, RemoteExecution, UnrealRemoteResponse, global_remote
+from .utils import logging, kill_process_tree
+
+# Arguments for an editor with no UI or rendering, with remote execution enabled whatever the project settings say
+DEFAULT_HEADLESS_EDITOR_ARGV = (
+    "-unattended",
+    "-nullrhi",
+    "-nosplash",
+    "-nosound",
+    "-nopause",
+    "-ini:Engine:[/Script/PythonScriptPlugin.PythonScriptPluginSettings]:bRemoteExecution=True",
+)
+
+
+# The seconds to wait before asking a node for its process ID again, after it failed to answer
+NODE_PID_RETRY_SECONDS = 1.0
+
+
+class EditorPoolError(RuntimeError):
+    pass
+
+
+@dataclass
+class PooledEditor:
+    """An editor process launched by an EditorPool, and the remote node it appeared as"""
+
+    process: Popen
+    launched_at: float
+    node_id: str = field(default_factory=str)
+    pid: int = 0
+    ready_at: Optional[float] = None
+    jobs: int = 0
+    crashed: bool = False
+
+    @property
+    def startup_seconds(self) -> Optional[float]:
+        return None if self.ready_at is None else self.ready_at - self.launched_at
+
+    def rss(self) -> int:
+        """
+        :return int: The resident memory of the editor process, in bytes (0 if it has exited).
+        """
+        try:
+            return psutil.Process(self.pid or self.process.pid).memory_info().rss
+        except psutil.Error:
+            return 0
+
+
+class EditorPool:
+    """
+    A pool of warm headless editors that run python scripts over remote execution, instead of paying for
+    engine startup on every script like Unreal4.run_python_cmdlet does.
+
+    The editors are launched with Unreal4.run_editor, and each is matched to the remote node it appears as by asking
+    the discovered nodes for their process ID. Callers lease an idle editor (waiting for one if they are all busy),
+    and an editor is recycled (killed and replaced by a fresh launch) once it has run max_jobs scripts, grown past
+    max_rss_bytes, or crashed.
+
+    A lease is only exclusive among the pool's callers: the pooled editors are ordinary remote nodes, so
+    Unreal4.run_python_remote (or anything else that picks nodes with remote_exec.session.select_node) may still send
+    them work. Don't mix the two on one remote_exec while leased work must run alone.
+    """
+
+    def __init__(
+        self,
+        unreal4: Unreal4,
+        size: int = 2,
+        max_jobs: int = 100,
+        max_rss_bytes: Optional[int] = None,
+        startup_timeout: float = 300.0,
+        remote_exec: RemoteExecution = global_remote,
+        editor_argv: Sequence[str] = DEFAULT_HEADLESS_EDITOR_ARGV,
+        custom_editor_path: str = "",
+        custom_project_path: str = "",
+    ):
+        """
+        :param object unreal4: The Unreal4 instance whose config (or the custom paths) the editors are launched with.
+        :param int size: The number of editors to keep running.
+        :param int max_jobs: The number of scripts an editor runs before it is recycled, or 0 for no limit.
+        :param int max_rss_bytes: The resident memory an editor may grow to before it is recycled, or None for no limit.
+        :param float startup_timeout: The number of seconds to wait for a launched editor to appear in discovery.
+        :param object remote_exec: A RemoteExecution instance.
+        :param list editor_argv: The arguments the editors are launched with.
+        :param str custom_editor_path: The editor executable to launch instead of the configured one.
+        :param str custom_project_path: The project to open instead of the configured one.
+        """
+        self.unreal4 = unreal4
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self.startup_timeout = startup_timeout
+        self.remote_exec = remote_exec
+        self.editor_argv = list(editor_argv)
+        self.custom_editor_path = custom_editor_path
+        self.custom_project_path = custom_project_path
+        self._condition = threading.Condition()
+        self._idle: list[PooledEditor] = []
+        self._leased: list[PooledEditor] = []
+        self._launching: list[PooledEditor] = []
+        self._starting = 0
+        self._closed = False
+        self._claimed_node_ids: set[str] = set()
+        self._node_pids: dict[str, int] = {}
+        self._node_pid_retry_at: dict[str, float] = {}
+        self._node_pid_lock = threading.Lock()
+        self.launches = 0
+        self.launch_failures = 0
+        self.recycles = {"jobs": 0, "rss": 0, "crashed": 0}
+        self.lease_wait_seconds = RemoteExecutionHistogram()
+        self.startup_seconds = RemoteExecutionHistogram()
+
+    def __enter__(self) -> EditorPool:
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self, wait: bool = True):
+        """
+        Launch the editors.
+
+        :param bool wait: True to wait until every editor has appeared in discovery (or failed to).
+        :raises EditorPoolError: If waiting, and no editor could be launched.
+        """
+        with self._condition:
+            self._closed = False
+            for _ in range(self.size - len(self._idle) - len(self._leased) - self._starting):
+                self._launch_async()
+            if wait:
+                self._condition.wait_for(lambda: not self._starting)
+                if not self._idle and not self._leased:
+                    raise EditorPoolError("None of the pooled editors could be launched")
+
+    def stop(self):
+        """
+        Kill every editor. Leased editors are killed too, so their scripts fail, and so are editors still starting.
+        """
+        with self._condition:
+            self._closed = True
+            editors = self._idle + self._leased + self._launching
+            self._idle.clear()
+            self._condition.notify_all()
+        for editor in editors:
+            self._stop_editor(editor)
+        # wait for the launches in progress to notice, so no editor outlives the pool
+        with self._condition:
+            self._condition.wait_for(lambda: not self._starting)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[PooledEditor]:
+        """
+        Lease an idle editor, waiting for one to be free (or launched) if needed.
+
+        :param float timeout: The number of seconds to wait for an editor, or None to wait for as long as it takes.
+        :raises EditorPoolError: If no editor was free in time, or the pool can't provide one.
+        """
+        start_time = time.perf_counter()
+        deadline = None if timeout is None else start_time + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise EditorPoolError("The editor pool has been stopped")
+                if self._idle:
+                    editor = self._idle.pop(0)
+                    reason = self._recycle_reason(editor)
+                    if reason:
+                        # it crashed (or was killed) while idle
+                        self._recycle(editor, reason)
+                        continue
+                    break
+                if not self._leased and not self._starting:
+                    raise EditorPoolError("No editors are running (every launch failed)")
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise EditorPoolError(f"Timed out after {timeout}s waiting for a free editor")
+                self._condition.wait(remaining)
+            self._leased.append(editor)
+            self.lease_wait_seconds.record(time.perf_counter() - start_time)
+        try:
+            yield editor
+        finally:
+            editor.jobs += 1
+            self._release(editor)
+
+    def run_python(self, commands: str, timeout: Optional[float] = None) -> UnrealRemoteResponse:
+        """
+        Run python commands on a pooled editor.
+
+        :param str commands: A formatted string of python commands that will be run by the engine.
+        :param float timeout: The number of seconds to wait for a free editor, or None to wait for as long as it takes.
+        :return UnrealRemoteResponse: The response of the editor (failed if the editor crashed while running the commands).
+        """
+        with self.lease(timeout) as editor:
+            with trace_span("EditorPool.run_python", node_id=editor.node_id, job=editor.jobs):
+                try:
+                    data = self.remote_exec.session.run_command(editor.node_id, commands)
+                except (RuntimeError, OSError) as e:
+                    editor.crashed = editor.process.poll() is not None or editor.node_id not in self.remote_exec.node_snapshot
+                    return UnrealRemoteResponse("", str(e), commands)
+        return UnrealRemoteResponse(**data)
+
+    def stats(self) -> dict:
+        """
+        :return dict: The pool size, the number of idle, leased and starting editors, the launch and recycle counts,
+        and summaries of the time callers waited for an editor and the time editors took to start, in seconds.
+        """
+        with self._condition:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "leased": len(self._leased),
+                "starting": self._starting,
+                "launches": self.launches,
+                "launch_failures": self.launch_failures,
+                "recycles": dict(self.recycles),
+                "lease_wait_seconds": self.lease_wait_seconds.summary(),
+                "startup_seconds": self.startup_seconds.summary(),
+            }
+
+    def _launch_async(self):
+        # called with the condition held, so waiting callers always see the editor as starting
+        self._starting += 1
+        threading.Thread(target=self._launch, daemon=True).start()
+
+    def _launch(self):
+        editor = None
+        try:
+            with trace_span("EditorPool.launch"):
+                editor = self._start_editor()
+        except Exception as e:
+            logging.warning(f"Failed to launch a pooled editor: {e}")
+        with self._condition:
+            self._starting -= 1
+            self.launches += 1
+            if editor is None:
+                self.launch_failures += 1
+            elif self._closed:
+                self._claimed_node_ids.discard(editor.node_id)
+            else:
+                self._idle.append(editor)
+                self.startup_seconds.record(editor.startup_seconds)
+                editor = None
+            self._condition.notify_all()
+        if editor:
+            self._stop_editor(editor)
+
+    def _start_editor(self) -> PooledEditor:
+        process = self.unreal4.run_editor(
+            list(self.editor_argv),
+            run_process_callable=Popen,
+            custom_editor_path=self.custom_editor_path,
+            custom_project_path=self.custom_project_path,
+        )
+        editor = PooledEditor(process, time.perf_counter())
+        deadline = editor.launched_at + self.startup_timeout
+        with self._condition:
+            self._launching.append(editor)
+        try:
+            while time.perf_counter() < deadline:
+                if self._closed:
+                    raise EditorPoolError("The editor pool was stopped while the editor was starting")
+                if process.poll() is not None:
+                    raise EditorPoolError(
+                        f"The editor exited with code {process.returncode} before it appeared in discovery"
+                    )
+                for node in self.remote_exec.node_snapshot:
+                    node_id = node["node_id"]
+                    if node_id in self._claimed_node_ids:
+                        continue
+                    pid = self._get_node_pid(node_id)
+                    if pid and self._is_process_or_child(pid, process.pid):
+                        with self._condition:
+                            if node_id in self._claimed_node_ids:
+                                continue
+                            self._claimed_node_ids.add(node_id)
+                        editor.node_id = node_id
+                        editor.pid = pid
+                        editor.ready_at = time.perf_counter()
+                        return editor
+                # wait for a node that hasn't been checked yet (nodes that failed to answer are retried on the next poll)
+                self.remote_exec.wait_for_node(
+                    lambda n: n["node_id"] not in self._node_pids
+                    and n["node_id"] not in self._node_pid_retry_at,
+                    timeout=0.5,
+                )
+            raise EditorPoolError(
+                f"The editor did not appear in discovery within {self.startup_timeout}s"
+            )
+        except BaseException:
+            self._stop_editor(editor)
+            raise
+        finally:
+            with self._condition:
+                self._launching.remove(editor)
+
+    def _get_node_pid(self, node_id: str) -> Optional[int]:
+        # remote nodes don't report their process ID, so ask each one once (and don't hold on to the
+        # command connection, as the node may be someone else's editor). The lock stops concurrent launches
+        # from closing the connection while another launch is still using it. A node that fails to answer
+        # (eg, an editor that is still starting) isn't remembered, but asked again after NODE_PID_RETRY_SECONDS
+        with self._node_pid_lock:
+            if node_id in self._node_pids:
+                return self._node_pids[node_id]
+            if time.perf_counter() < self._node_pid_retry_at.get(node_id, 0.0):
+                return None
+            pid = None
+            try:
+                data = self.remote_exec.session.run_command(
+                    node_id, "__import__('os').getpid()", exec_mode=MODE_EVAL_STATEMENT
+                )
+                if data["success"]:
+                    pid = int(data["result"])
+            except (RuntimeError, OSError, ValueError):
+                pass
+            finally:
+                self.remote_exec.session.close_command_connection(node_id)
+            if pid is None:
+                self._node_pid_retry_at[node_id] = time.perf_counter() + NODE_PID_RETRY_SECONDS
+            else:
+                self._node_pids[node_id] = pid
+                self._node_pid_retry_at.pop(node_id, None)
+            return pid
+
+    @staticmethod
+    def _is_process_or_child(pid: int, root_pid: int) -> bool:
+        if pid == root_pid:
+            return True
+        try:
+            return any(parent.pid == root_pid for parent in psutil.Process(pid).parents())
+        except psutil.Error:
+            return False
+
+    def _recycle_reason(self, editor: PooledEditor) -> Optional[str]:
+        if (
+            editor.crashed
+            or editor.process.poll() is not None
+            or editor.node_id not in self.remote_exec.node_snapshot
+        ):
+            return "crashed"
+        if self.max_jobs and editor.jobs >= self.max_jobs:
+            return "jobs"
+        if self.max_rss_bytes and editor.rss() > self.max_rss_bytes:
+            return "rss"
+        return None
+
+    def _release(self, editor: PooledEditor):
+        reason = self._recycle_reason(editor)
+        with self._condition:
+            self._leased.remove(editor)
+            if self._closed:
+                return
+            if not reason:
+                self._idle.append(editor)
+                self._condition.notify_all()
+                return
+            self._recycle(editor, reason)
+
+    def _recycle(self, editor: PooledEditor, reason: str):
+        # called with the condition held; the replacement is counted as starting before the old editor is stopped
+        logging.info(f"Recycling pooled editor {editor.node_id} ({reason} after {editor.jobs} jobs)")
+        self.recycles[reason] += 1
+        self._launch_async()
+        threading.Thread(target=self._stop_editor, args=(editor,), daemon=True).start()
+
+    def _stop_editor(self, editor: PooledEditor):
+        if editor.node_id:
+            self.remote_exec.session.close_command_connection(editor.node_id)
+        kill_process_tree(editor.process.pid)
+        try:
+            editor.process.wait(timeout=10)
+        except Exception:
+            pass
+        with self._condition:
+            self._claimed_node_ids.discard(editor.node_id)
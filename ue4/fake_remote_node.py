@@ -0,0 +1,414 @@
+import os as _os
+import sys as _sys
+import time as _time
+import uuid as _uuid
+import random as _random
+import socket as _socket
+import select as _select
+import getpass as _getpass
+import logging as _logging
+import threading as _threading
+import traceback as _traceback
+
+from .remote_execution import (
+    RemoteExecutionConfig,
+    MODE_EXEC_FILE,
+    MODE_EXEC_STATEMENT,
+    MODE_EVAL_STATEMENT,
+    _TYPE_PING,
+    _TYPE_PONG,
+    _TYPE_OPEN_CONNECTION,
+    _TYPE_CLOSE_CONNECTION,
+    _TYPE_COMMAND,
+    _TYPE_COMMAND_RESULT,
+    _RemoteExecutionMessage,
+    _RemoteExecutionMessageReader,
+    _create_broadcast_socket,
+)
+
+DEFAULT_ENGINE_VERSION = '4.26.2-0+++UE4+Release-4.26'  # The engine version reported by a fake node
+DEFAULT_RECEIVE_BUFFER_SIZE = 65536                     # The size of the buffer a fake node receives command messages with
+SIMULATED_FAILURE_RESULT = 'Simulated failure'          # The result of a command that a fake node has chosen to fail
+
+class FakeRemoteNode(object):
+    '''
+    A local stand-in for the Python plugin of a running Unreal Editor, implementing the remote execution protocol in pure Python.
+    It answers "ping" messages, connects back on "open_connection" (replacing any existing command connection, like the editor does), and executes (or echoes) commands.
+    Any number of fake nodes may run in the same process, as each has its own multicast socket and threads.
+
+    Args:
+        config (RemoteExecutionConfig): Configuration controlling the connection settings (must match the client).
+        node_info (dict): Data to report in "pong" responses (see `UnrealRemoteInfo`), overriding the defaults for this machine.
+        latency (float): Number of seconds to wait before replying to each command.
+        payload_size (int): Number of extra bytes of output to add to each command result.
+        failure_rate (float): Probability (0-1) that a command fails without being run.
+        tick_delay (float): Length of an editor tick, in seconds. Messages are only handled on tick boundaries, like the editor handles them on the game thread:
+            every discovery message that arrived before a tick is handled at its start, before any command of that tick.
+        execute (bool): True to execute commands, or False to echo each command back as its result.
+        namespace (dict): The global namespace that commands are executed in (eg, to provide a fake `unreal` module).
+        seed (int): The seed of the random numbers used to decide which commands fail.
+    '''
+    def __init__(self, config=RemoteExecutionConfig(), node_info=None, latency=0.0, payload_size=0, failure_rate=0.0, tick_delay=0.0, execute=True, namespace=None, seed=None):
+        self._config = config
+        self._node_id = str(_uuid.uuid4())
+        self.node_info = {
+            'user': _getpass.getuser(),
+            'machine': _socket.gethostname(),
+            'engine_version': DEFAULT_ENGINE_VERSION,
+            'engine_root': '/fake/UE_4.26',
+            'project_root': '/fake/FakeProject',
+            'project_name': 'FakeProject',
+            }
+        self.node_info.update(node_info or {})
+        self.latency = latency
+        self.payload_size = payload_size
+        self.failure_rate = failure_rate
+        self.tick_delay = tick_delay
+        self.execute = execute
+        self.namespace = namespace if namespace is not None else {}
+        self._random = _random.Random(seed)
+        self._running = False
+        self._lock = _threading.Lock()
+        self._tick_condition = _threading.Condition(self._lock)
+        self._broadcast_tick = None
+        self._broadcast_socket = None
+        self._broadcast_listen_thread = None
+        self._command_channel_socket = None
+        self._command_thread = None
+        self._command_remote_node_id = None
+        self.pings_received = 0
+        self.connections_opened = 0
+        self.commands_run = 0
+        self.commands_failed = 0
+
+    @property
+    def node_id(self):
+        '''
+        Get the ID of this fake node, which the client sees as the remote node ID.
+
+        Returns:
+            str: The ID of this fake node.
+        '''
+        return self._node_id
+
+    @property
+    def has_command_connection(self):
+        '''
+        Check whether this fake node currently has a command connection to a client.
+
+        Returns:
+            bool: True if this fake node has a command connection, False otherwise.
+        '''
+        return self._command_channel_socket is not None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        '''
+        Start this fake node, so it can be discovered by clients.
+        '''
+        self._running = True
+        self._broadcast_socket = _create_broadcast_socket(self._config)
+        self._broadcast_listen_thread = _threading.Thread(target=self._run_broadcast_listen_thread)
+        self._broadcast_listen_thread.daemon = True
+        self._broadcast_listen_thread.start()
+
+    def stop(self):
+        '''
+        Stop this fake node, closing its command connection. Clients will time it out, as it no longer answers "ping" messages.
+        '''
+        self._running = False
+        self._close_command_connection()
+        if self._broadcast_listen_thread:
+            self._broadcast_listen_thread.join()
+            self._broadcast_listen_thread = None
+        if self._broadcast_socket:
+            self._broadcast_socket.close()
+            self._broadcast_socket = None
+
+    def _next_tick(self):
+        '''
+        Get the next editor tick.
+
+        Returns:
+            int: The number of the next tick (counted from the epoch), or None if ticks aren't being simulated.
+        '''
+        if self.tick_delay > 0:
+            return int(_time.time() // self.tick_delay) + 1
+        return None
+
+    def _wait_for_tick(self, tick):
+        '''
+        Wait until the start of the given editor tick.
+
+        Args:
+            tick (int): The number of the tick (see `_next_tick`), or None to not wait.
+        '''
+        if tick is not None:
+            _time.sleep(max(tick * self.tick_delay - _time.time(), 0))
+
+    def _wait_for_command_tick(self):
+        '''
+        Wait until the start of the next editor tick, and until the discovery messages handled at the start of that tick have been handled.
+        '''
+        tick = self._next_tick()
+        self._wait_for_tick(tick)
+        if tick is not None:
+            with self._tick_condition:
+                self._tick_condition.wait_for(lambda: self._broadcast_tick != tick)
+
+    def _run_broadcast_listen_thread(self):
+        '''
+        Main loop for the listen thread that handles the UDP broadcast messages.
+        '''
+        while self._running:
+            ready, _, _ = _select.select([self._broadcast_socket], [], [], 0.1)
+            if not ready:
+                continue
+            tick = self._next_tick()
+            with self._tick_condition:
+                self._broadcast_tick = tick
+            try:
+                self._wait_for_tick(tick)
+                # Handle every message that has arrived by the start of the tick
+                while ready:
+                    self._handle_broadcast_data(self._broadcast_socket.recv(4096))
+                    ready, _, _ = _select.select([self._broadcast_socket], [], [], 0)
+            finally:
+                with self._tick_condition:
+                    self._broadcast_tick = None
+                    self._tick_condition.notify_all()
+
+    def _handle_broadcast_data(self, data):
+        '''
+        Handle a UDP broadcast message.
+
+        Args:
+            data (bytes): The received message.
+        '''
+        message = _RemoteExecutionMessage(None, None)
+        if not message.from_json_bytes(data) or message.source == self._node_id or not message.passes_receive_filter(self._node_id):
+            return
+        if message.type_ == _TYPE_PING:
+            self.pings_received += 1
+            self._broadcast_message(_RemoteExecutionMessage(_TYPE_PONG, self._node_id, message.source, self.node_info))
+        elif message.type_ == _TYPE_OPEN_CONNECTION:
+            self._open_command_connection(message.source, message.data)
+        elif message.type_ == _TYPE_CLOSE_CONNECTION:
+            if message.source == self._command_remote_node_id:
+                self._close_command_connection()
+
+    def _broadcast_message(self, message):
+        '''
+        Broadcast the given message over the UDP socket to anything that might be listening.
+
+        Args:
+            message (_RemoteExecutionMessage): The message to broadcast.
+        '''
+        self._broadcast_socket.sendto(message.to_json_bytes(), self._config.multicast_group_endpoint)
+
+    def _open_command_connection(self, remote_node_id, data):
+        '''
+        Connect to the command endpoint of a client, replacing any existing command connection.
+
+        Args:
+            remote_node_id (string): The ID of the client that asked for the connection.
+            data (dict): The data of the "open_connection" message, containing the command endpoint to connect to.
+        '''
+        self._close_command_connection()
+        try:
+            command_channel_socket = _socket.create_connection((data['command_ip'], data['command_port']), timeout=5)
+        except OSError as e:
+            _logger.debug('Failed to connect to "{0}": {1}'.format(remote_node_id, e))
+            return
+        command_channel_socket.settimeout(None)
+        with self._lock:
+            self._command_channel_socket = command_channel_socket
+            self._command_remote_node_id = remote_node_id
+            self.connections_opened += 1
+        self._command_thread = _threading.Thread(target=self._run_command_thread, args=(command_channel_socket, remote_node_id))
+        self._command_thread.daemon = True
+        self._command_thread.start()
+
+    def _close_command_connection(self):
+        '''
+        Close the active command connection, if any.
+        '''
+        with self._lock:
+            command_channel_socket = self._command_channel_socket
+            self._command_channel_socket = None
+            self._command_remote_node_id = None
+        if command_channel_socket:
+            try:
+                command_channel_socket.shutdown(_socket.SHUT_RDWR)
+            except OSError:
+                pass
+            command_channel_socket.close()
+
+    def _run_command_thread(self, command_channel_socket, remote_node_id):
+        '''
+        Main loop for the thread that receives commands over a TCP command connection, and replies with their results.
+
+        Args:
+            command_channel_socket (socket): The connected TCP socket.
+            remote_node_id (string): The ID of the client at the other end of the connection.
+        '''
+        message_reader = _RemoteExecutionMessageReader(DEFAULT_RECEIVE_BUFFER_SIZE)
+        while self._running:
+            try:
+                data = message_reader.read_message(command_channel_socket)
+            except OSError:
+                data = None
+            if data is None:
+                break
+            message = _RemoteExecutionMessage(None, None)
+            if not message.from_json_bytes(data) or message.type_ != _TYPE_COMMAND or not message.passes_receive_filter(self._node_id):
+                continue
+            self._wait_for_command_tick()
+            result = self._run_command(message.data.get('command', ''), message.data.get('exec_mode', MODE_EXEC_FILE))
+            if self.latency > 0:
+                _time.sleep(self.latency)
+            try:
+                command_channel_socket.sendall(_RemoteExecutionMessage(_TYPE_COMMAND_RESULT, self._node_id, remote_node_id, result).to_json_bytes())
+            except OSError:
+                break
+        with self._lock:
+            if self._command_channel_socket is command_channel_socket:
+                self._command_channel_socket = None
+                self._command_remote_node_id = None
+        command_channel_socket.close()
+
+    def _run_command(self, command, exec_mode):
+        '''
+        Run a command, capturing anything it prints as its output.
+
+        Args:
+            command (string): The Python command to run.
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+
+        Returns:
+            dict: The result of running the command (see `command_result` from the protocol definition).
+        '''
+        self.commands_run += 1
+        output = []
+        success = True
+        result = 'None'
+        if self.failure_rate > 0 and self._random.random() < self.failure_rate:
+            self.commands_failed += 1
+            success = False
+            result = SIMULATED_FAILURE_RESULT
+        elif not self.execute:
+            result = command
+        else:
+            def _print(*args, sep=' ', end='\n', file=None, flush=False):
+                output.append({'type': 'Info', 'output': sep.join(str(arg) for arg in args) + end})
+            self.namespace['print'] = _print
+            try:
+                if exec_mode == MODE_EVAL_STATEMENT:
+                    result = repr(eval(command, self.namespace))
+                elif exec_mode == MODE_EXEC_STATEMENT:
+                    try:
+                        code = compile(command, '<statement>', 'eval')
+                    except SyntaxError:
+                        exec(compile(command, '<statement>', 'single'), self.namespace)
+                    else:
+                        value = eval(code, self.namespace)
+                        if value is not None:
+                            _print(repr(value))
+                else:
+                    exec(compile(command, '<file>', 'exec'), self.namespace)
+            except Exception:
+                success = False
+                result = _traceback.format_exc()
+                output.append({'type': 'Error', 'output': result})
+        if self.payload_size > 0:
+            output.append({'type': 'Info', 'output': 'x' * self.payload_size})
+        return {
+            'success': success,
+            'command': command,
+            'result': result,
+            'output': output,
+            }
+
+def start_fake_nodes(count, **kwargs):
+    '''
+    Start several fake nodes in this process.
+
+    Args:
+        count (int): The number of fake nodes to start.
+        **kwargs: The arguments to create each `FakeRemoteNode` with.
+
+    Returns:
+        list: The started `FakeRemoteNode` instances (call `stop` on each once finished with them).
+    '''
+    nodes = []
+    for _index in range(count):
+        node = FakeRemoteNode(**kwargs)
+        node.start()
+        nodes.append(node)
+    return nodes
+
+# The script of a fake editor executable (see `write_fake_editor`). It loads this package without running its `__init__`,
+# so the only thing it needs is this directory, and runs a fake node for the project it was launched with until it is killed
+_FAKE_EDITOR_SCRIPT = '''#!{python}
+import os, sys, time, types
+package = types.ModuleType('fake_editor_ue4')
+package.__path__ = [{package_dir!r}]
+sys.modules['fake_editor_ue4'] = package
+from fake_editor_ue4.fake_remote_node import FakeRemoteNode
+project_file = next((arg for arg in sys.argv[1:] if arg.endswith('.uproject')), '')
+time.sleep({startup_delay!r})
+node = FakeRemoteNode(node_info={{
+    'engine_root': os.path.dirname(os.path.abspath(sys.argv[0])),
+    'project_root': os.path.dirname(project_file),
+    'project_name': os.path.splitext(os.path.basename(project_file))[0],
+    }}, **{node_kwargs!r})
+node.start()
+while True:
+    time.sleep(1)
+'''
+
+def write_fake_editor(directory, startup_delay=0.0, **kwargs):
+    '''
+    Write a fake editor executable (named "UE4Editor.exe", so it passes the editor path validation) that runs a fake node in its own process,
+    for testing code that launches editors on a platform (or machine) that doesn't have Unreal. It ignores every argument except the ".uproject" file.
+
+    Args:
+        directory (string): The directory to write the executable to.
+        startup_delay (float): Number of seconds the fake editor takes to start, before it can be discovered.
+        **kwargs: The arguments (that can be written as literals) to create its `FakeRemoteNode` with.
+
+    Returns:
+        string: The path of the executable.
+    '''
+    path = _os.path.join(directory, 'UE4Editor.exe')
+    with open(path, 'w') as f:
+        f.write(_FAKE_EDITOR_SCRIPT.format(
+            python=_sys.executable,
+            package_dir=_os.path.dirname(_os.path.abspath(__file__)),
+            startup_delay=startup_delay,
+            node_kwargs=kwargs,
+            ))
+    _os.chmod(path, 0o755)
+    return path
+
+# Log handling
+_logger = _logging.getLogger(__name__)
+
+# Usage example
+if __name__ == '__main__':
+    _logging.basicConfig(level=_logging.INFO)
+    fake_node = FakeRemoteNode()
+    fake_node.start()
+    _sys.stdout.write('Running fake node "{0}" (Ctrl+C to stop)\n'.format(fake_node.node_id))
+    try:
+        while True:
+            _time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    fake_node.stop()
@@ -0,0 +1,220 @@
+# utf-8
+# python 3.9
+from __future__ import annotations
+
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Sequence
+
+from .unreal_global import AssetImportData, AssetImportProperties
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class SourceFingerprint:
+    """The size, modification time and content hash of an import source file"""
+
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass
+class ImportManifestEntry:
+    """What was last imported from one source file"""
+
+    fingerprint: SourceFingerprint
+    options_hash: str
+    game_path: str
+    imported_object_paths: list[str] = field(default_factory=list)
+    imported_at: float = 0.0
+
+
+def hash_file(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    Hash a file's content without reading it into memory all at once.
+
+    :param str path: The path of the file.
+    :param int chunk_size: The number of bytes hashed at a time.
+    :return str: The hex SHA-256 digest of the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_hash(asset_data: AssetImportData, properties: AssetImportProperties) -> str:
+    """
+    :return str: A hash of everything that affects an import besides the source content (including its game_path).
+    """
+    options = json.dumps(
+        {"asset_data": asdict(asset_data), "properties": asdict(properties)}, sort_keys=True
+    )
+    return hashlib.sha256(options.encode("utf-8")).hexdigest()
+
+
+class ImportManifest:
+    """
+    A record of the source files that have been imported, kept in a JSON file, so unchanged sources can be skipped.
+    A source needs importing again when its content hash or its import options (see ``options_hash``) differ
+    from the last successful import. Sources whose size and modification time are unchanged keep their recorded
+    hash, so only new or touched files are read.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param str path: The path of the manifest file (created by ``save`` if it doesn't exist).
+        """
+        self.path = path
+        self.entries: dict[str, ImportManifestEntry] = {}
+        self._hashed: dict[str, SourceFingerprint] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                for source, entry in data["entries"].items():
+                    entry["fingerprint"] = SourceFingerprint(**entry["fingerprint"])
+                    self.entries[source] = ImportManifestEntry(**entry)
+
+    @staticmethod
+    def source_key(fbx_file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(fbx_file_path)).replace("\\", "/")
+
+    def fingerprint(self, fbx_file_path: str) -> Optional[SourceFingerprint]:
+        """
+        :param str fbx_file_path: The path of the source file.
+        :return SourceFingerprint: The fingerprint of the source file, or None if it can't be read.
+        """
+        key = self.source_key(fbx_file_path)
+        try:
+            stat = os.stat(fbx_file_path)
+            entry = self.entries.get(key)
+            # a file that hasn't been touched keeps its hash, whether it was recorded or just computed
+            for known in (entry.fingerprint if entry else None, self._hashed.get(key)):
+                if known and (known.size, known.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                    return known
+            fingerprint = SourceFingerprint(stat.st_size, stat.st_mtime_ns, hash_file(fbx_file_path))
+        except OSError:
+            return None
+        with self._lock:
+            self._hashed[key] = fingerprint
+        return fingerprint
+
+    def fingerprints(
+        self, fbx_file_paths: Sequence[str], max_workers: Optional[int] = None
+    ) -> dict[str, Optional[SourceFingerprint]]:
+        """
+        Fingerprint many source files in parallel. hashlib releases the GIL while hashing, so the threads use every core.
+
+        :param list fbx_file_paths: The paths of the source files.
+        :param int max_workers: The maximum number of files hashed at once, or None for one per core.
+        :return dict: The fingerprint of each source file (None for a file that can't be read).
+        """
+        unique_paths = list(dict.fromkeys(fbx_file_paths))
+        with ThreadPoolExecutor(max_workers or os.cpu_count() or 1) as executor:
+            return dict(zip(unique_paths, executor.map(self.fingerprint, unique_paths)))
+
+    def needs_import(
+        self,
+        asset_data: AssetImportData,
+        properties: AssetImportProperties,
+        fingerprint: Optional[SourceFingerprint] = None,
+    ) -> bool:
+        """
+        :param object asset_data: The asset data of the import.
+        :param object properties: The import properties of the import.
+        :param SourceFingerprint fingerprint: The source's fingerprint, if already known.
+        :return bool: True if the source changed (or can't be read) or its options changed since its last successful import.
+        """
+        fingerprint = fingerprint or self.fingerprint(asset_data.fbx_file_path)
+        entry = self.entries.get(self.source_key(asset_data.fbx_file_path))
+        return not (
+            fingerprint
+            and entry
+            and entry.fingerprint.sha256 == fingerprint.sha256
+            and entry.options_hash == options_hash(asset_data, properties)
+        )
+
+    def filter_changed(
+        self,
+        assets: Sequence[tuple[AssetImportData, AssetImportProperties]],
+        max_workers: Optional[int] = None,
+    ) -> list[tuple[AssetImportData, AssetImportProperties]]:
+        """
+        :param list assets: The asset data and import properties of each asset to import.
+        :param int max_workers: The maximum number of files hashed at once, or None for one per core.
+        :return list: The assets that need importing, in order.
+        """
+        return [assets[i] for i in self.changed_indices(assets, max_workers)]
+
+    def changed_indices(
+        self,
+        assets: Sequence[tuple[AssetImportData, AssetImportProperties]],
+        max_workers: Optional[int] = None,
+    ) -> list[int]:
+        """
+        :param list assets: The asset data and import properties of each asset to import.
+        :param int max_workers: The maximum number of files hashed at once, or None for one per core.
+        :return list: The indices of the assets that need importing, in order.
+        """
+        fingerprints = self.fingerprints(
+            [asset_data.fbx_file_path for asset_data, _ in assets], max_workers
+        )
+        return [
+            i
+            for i, (asset_data, properties) in enumerate(assets)
+            if self.needs_import(asset_data, properties, fingerprints[asset_data.fbx_file_path])
+        ]
+
+    def imported_object_paths(self, fbx_file_path: str) -> list[str]:
+        entry = self.entries.get(self.source_key(fbx_file_path))
+        return list(entry.imported_object_paths) if entry else []
+
+    def record(
+        self,
+        asset_data: AssetImportData,
+        properties: AssetImportProperties,
+        imported_object_paths: Sequence[str] = (),
+    ):
+        """
+        Record a successful import (call ``save`` to write it to the manifest file).
+
+        :param object asset_data: The asset data of the import.
+        :param object properties: The import properties of the import.
+        :param list imported_object_paths: The objects the import created.
+        """
+        fingerprint = self.fingerprint(asset_data.fbx_file_path)
+        if not fingerprint:
+            return
+        with self._lock:
+            self.entries[self.source_key(asset_data.fbx_file_path)] = ImportManifestEntry(
+                fingerprint,
+                options_hash(asset_data, properties),
+                asset_data.game_path,
+                list(imported_object_paths),
+                time.time(),
+            )
+
+    def save(self):
+        """
+        Write the manifest file, replacing it in one step so an interrupted save can't corrupt it.
+        """
+        with self._lock:
+            data = {
+                "version": MANIFEST_VERSION,
+                "entries": {source: asdict(entry) for source, entry in self.entries.items()},
+            }
+            temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,417 @@
+# utf-8
+# python 3.9
+from __future__ import annotations
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from enum import Enum
+from typing import Iterator, Optional, Sequence
+
+import psutil
+
+from .remote_execution import trace_span, trace_tags
+from .import_manifest import ImportManifest
+from .unreal_global import (
+    Unreal4,
+    RemoteExecution,
+    AssetImportData,
+    AssetImportProperties,
+    AssetImportResult,
+    global_remote,
+)
+from .utils import logging
+
+
+class ImportJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class ImportJob:
+    """An asset import recorded in an ImportJobQueue"""
+
+    id: int
+    asset_data: AssetImportData
+    properties: AssetImportProperties
+    status: ImportJobStatus = ImportJobStatus.PENDING
+    attempts: int = 0
+    max_attempts: int = 3
+    worker: str = field(default_factory=str)
+    error: str = field(default_factory=str)
+    imported_object_paths: list[str] = field(default_factory=list)
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fbx_file_path TEXT NOT NULL,
+    game_path TEXT NOT NULL,
+    asset_data TEXT NOT NULL,
+    properties TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT '',
+    imported_object_paths TEXT NOT NULL DEFAULT '[]',
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires_at REAL,
+    UNIQUE (fbx_file_path, game_path)
+);
+CREATE INDEX IF NOT EXISTS import_jobs_status ON import_jobs (status, id);
+"""
+
+
+class ImportJobQueue:
+    """
+    A durable queue of asset imports, kept in a SQLite database so an interrupted pipeline can resume
+    where it stopped. Each job records its status, attempts, timings and the objects it imported.
+
+    Workers claim jobs with a lease. A job whose worker goes away (eg, because the pipeline was killed)
+    is claimed again once the lease expires, or straight away by ``recover`` when the worker process is known to be gone.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, lease_seconds: float = 900.0):
+        """
+        :param str path: The path of the SQLite database file (created if needed).
+        :param int max_attempts: The number of times a job is tried before it is left failed.
+        :param float lease_seconds: The number of seconds a claimed job is reserved for its worker.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        # a connection per operation, so the queue can be shared by worker threads and processes
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            if write:
+                db.execute("BEGIN IMMEDIATE")
+            yield db
+            if write:
+                db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def enqueue(
+        self,
+        assets: Sequence[tuple[AssetImportData, AssetImportProperties]],
+        max_attempts: Optional[int] = None,
+    ) -> int:
+        """
+        Add imports to the queue. An asset that is already queued (by its fbx file and game path) is skipped,
+        so re-running a pipeline doesn't re-import what has already succeeded.
+
+        :param list assets: The asset data and import properties of each asset to import.
+        :param int max_attempts: The number of times each job is tried, or None to use the queue's default.
+        :return int: The number of jobs that were added.
+        """
+        now = time.time()
+        rows = [
+            (
+                asset_data.fbx_file_path,
+                asset_data.game_path,
+                json.dumps(asdict(asset_data)),
+                json.dumps(asdict(properties)),
+                ImportJobStatus.PENDING.value,
+                max_attempts or self.max_attempts,
+                now,
+            )
+            for asset_data, properties in assets
+        ]
+        with self._connect(write=True) as db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO import_jobs"
+                " (fbx_file_path, game_path, asset_data, properties, status, max_attempts, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return db.total_changes - before
+
+    def claim(self, worker: str, limit: int) -> list[ImportJob]:
+        """
+        Reserve the next pending jobs (including jobs whose lease has expired) for a worker.
+
+        :param str worker: The ID of the worker (see ``worker_id``).
+        :param int limit: The maximum number of jobs to claim.
+        :return list: The claimed jobs, with their attempts already counted.
+        """
+        now = time.time()
+        with self._connect(write=True) as db:
+            # a job whose worker went away on its last attempt won't be claimed again, so give up on it
+            db.execute(
+                "UPDATE import_jobs SET status = ?, error = ?, lease_expires_at = NULL"
+                " WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+                (ImportJobStatus.FAILED.value, "The worker stopped before finishing", ImportJobStatus.RUNNING.value, now),
+            )
+            rows = db.execute(
+                "SELECT id FROM import_jobs"
+                " WHERE attempts < max_attempts AND (status = ? OR (status = ? AND lease_expires_at < ?))"
+                " ORDER BY id LIMIT ?",
+                (ImportJobStatus.PENDING.value, ImportJobStatus.RUNNING.value, now, limit),
+            ).fetchall()
+            ids = [row["id"] for row in rows]
+            db.executemany(
+                "UPDATE import_jobs SET status = ?, attempts = attempts + 1, worker = ?,"
+                " started_at = ?, finished_at = NULL, lease_expires_at = ? WHERE id = ?",
+                [
+                    (ImportJobStatus.RUNNING.value, worker, now, now + self.lease_seconds, job_id)
+                    for job_id in ids
+                ],
+            )
+            return self._get_jobs(db, ids)
+
+    def complete(self, job: ImportJob, result: AssetImportResult):
+        """
+        Record the outcome of a claimed job. A failed job goes back to pending until it runs out of attempts.
+        Nothing is recorded if the job has since been claimed by another worker (after its lease expired).
+
+        :param object job: The job, as returned by ``claim``.
+        :param object result: The import result for the job's asset.
+        """
+        self._finish(
+            [job],
+            result.success,
+            result.error,
+            result.imported_object_paths,
+        )
+
+    def fail(self, jobs: Sequence[ImportJob], error: str):
+        """
+        Record that claimed jobs failed without a per-asset result (eg, the editor crashed mid-batch).
+
+        :param list jobs: The jobs, as returned by ``claim``.
+        :param str error: The reason they failed.
+        """
+        self._finish(jobs, False, error, [])
+
+    def _finish(self, jobs: Sequence[ImportJob], success: bool, error: str, imported_object_paths: list[str]):
+        now = time.time()
+        with self._connect(write=True) as db:
+            db.executemany(
+                "UPDATE import_jobs SET status = CASE"
+                " WHEN ? THEN ? WHEN attempts < max_attempts THEN ? ELSE ? END,"
+                " error = ?, imported_object_paths = ?, finished_at = ?, lease_expires_at = NULL"
+                " WHERE id = ? AND worker = ? AND status = ?",
+                [
+                    (
+                        success,
+                        ImportJobStatus.SUCCEEDED.value,
+                        ImportJobStatus.PENDING.value,
+                        ImportJobStatus.FAILED.value,
+                        error,
+                        json.dumps(imported_object_paths),
+                        now,
+                        job.id,
+                        job.worker,
+                        ImportJobStatus.RUNNING.value,
+                    )
+                    for job in jobs
+                ],
+            )
+
+    def recover(self) -> int:
+        """
+        Return the running jobs of workers on this machine whose process has gone (eg, a killed pipeline)
+        to pending, without waiting for their leases to expire. The interrupted attempt is not counted.
+
+        :return int: The number of jobs that were recovered.
+        """
+        host = socket.gethostname()
+        with self._connect(write=True) as db:
+            rows = db.execute(
+                "SELECT id, worker FROM import_jobs WHERE status = ?",
+                (ImportJobStatus.RUNNING.value,),
+            ).fetchall()
+            ids = []
+            for row in rows:
+                worker_host, _, worker_pid = row["worker"].partition(":")
+                pid = worker_pid.split(":", 1)[0]
+                if worker_host == host and pid.isdigit() and not psutil.pid_exists(int(pid)):
+                    ids.append(row["id"])
+            db.executemany(
+                "UPDATE import_jobs SET status = ?, attempts = attempts - 1, lease_expires_at = NULL WHERE id = ?",
+                [(ImportJobStatus.PENDING.value, job_id) for job_id in ids],
+            )
+            return len(ids)
+
+    def retry_failed(self) -> int:
+        """
+        Give every failed job another set of attempts.
+
+        :return int: The number of jobs that were queued again.
+        """
+        with self._connect(write=True) as db:
+            return db.execute(
+                "UPDATE import_jobs SET status = ?, attempts = 0 WHERE status = ?",
+                (ImportJobStatus.PENDING.value, ImportJobStatus.FAILED.value),
+            ).rowcount
+
+    def counts(self) -> dict[str, int]:
+        """
+        :return dict: The number of jobs with each status.
+        """
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) FROM import_jobs GROUP BY status").fetchall()
+        counts = {status.value: 0 for status in ImportJobStatus}
+        counts.update((row[0], row[1]) for row in rows)
+        return counts
+
+    def jobs(self, status: Optional[ImportJobStatus] = None) -> list[ImportJob]:
+        """
+        :param status: Only get the jobs with this status, or None to get every job.
+        :return list: The jobs, in the order they were queued.
+        """
+        with self._connect() as db:
+            if status is None:
+                rows = db.execute("SELECT id FROM import_jobs ORDER BY id").fetchall()
+            else:
+                rows = db.execute(
+                    "SELECT id FROM import_jobs WHERE status = ? ORDER BY id",
+                    (ImportJobStatus(status).value,),
+                ).fetchall()
+            return self._get_jobs(db, [row["id"] for row in rows])
+
+    def has_running_jobs(self) -> bool:
+        """
+        :return bool: True if any job is claimed by a worker and not finished yet.
+        """
+        with self._connect() as db:
+            return bool(
+                db.execute(
+                    "SELECT 1 FROM import_jobs WHERE status = ? LIMIT 1",
+                    (ImportJobStatus.RUNNING.value,),
+                ).fetchone()
+            )
+
+
+    @staticmethod
+    def _get_jobs(db: sqlite3.Connection, ids: Sequence[int]) -> list[ImportJob]:
+        jobs = []
+        for job_id in ids:
+            row = db.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+            jobs.append(
+                ImportJob(
+                    id=row["id"],
+                    asset_data=AssetImportData(**json.loads(row["asset_data"])),
+                    properties=AssetImportProperties(**json.loads(row["properties"])),
+                    status=ImportJobStatus(row["status"]),
+                    attempts=row["attempts"],
+                    max_attempts=row["max_attempts"],
+                    worker=row["worker"],
+                    error=row["error"],
+                    imported_object_paths=json.loads(row["imported_object_paths"]),
+                    created_at=row["created_at"],
+                    started_at=row["started_at"],
+                    finished_at=row["finished_at"],
+                )
+            )
+        return jobs
+
+
+def worker_id(name: str = "") -> str:
+    """
+    :param str name: A name telling apart the workers of one process.
+    :return str: A worker ID of the form "host:pid:name", which ``ImportJobQueue.recover`` uses to find workers that have gone.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{name or threading.current_thread().name}"
+
+
+def run_import_workers(
+    queue: ImportJobQueue,
+    unreal4: Unreal4,
+    workers: Optional[int] = None,
+    batch_size: int = 50,
+    as_remote: bool = True,
+    remote_exec: RemoteExecution = global_remote,
+    poll_interval: float = 1.0,
+    manifest: Optional[ImportManifest] = None,
+) -> dict[str, int]:
+    """
+    Import every queued job, with worker threads that each claim a batch of jobs at a time and import it with
+    Unreal4.import_assets. Remotely, each batch goes to the editor picked by the node selection policy
+    (least in-flight by default), so the workers are spread over every open editor.
+    Jobs left running by a pipeline that was interrupted on this machine are recovered first.
+
+    :param object queue: The ImportJobQueue to work through.
+    :param object unreal4: The Unreal4 instance used to import (its config is used when launching cmdlets).
+    :param int workers: The number of worker threads, or None for one per open editor (or one when importing with cmdlets).
+    :param int batch_size: The maximum number of jobs claimed and imported at once.
+    :param bool as_remote: True to import in the open editors, False to launch a cmdlet per batch.
+    :param object remote_exec: A RemoteExecution instance.
+    :param float poll_interval: The number of seconds an idle worker waits for jobs still running elsewhere (which may fail and be retried).
+    :param object manifest: An ImportManifest, so jobs whose source and options are unchanged since their last import are skipped.
+    :return dict: The number of jobs with each status once the queue is drained.
+    """
+    recovered = queue.recover()
+    if recovered:
+        logging.info(f"Recovered {recovered} interrupted import jobs")
+    if workers is None:
+        workers = max(1, len(remote_exec.node_snapshot)) if as_remote else 1
+
+    def work(name: str):
+        worker = worker_id(name)
+        while True:
+            jobs = queue.claim(worker, batch_size)
+            if not jobs:
+                if not queue.has_running_jobs():
+                    return
+                time.sleep(poll_interval)
+                continue
+            with trace_span("import_queue.batch", worker=worker, jobs=len(jobs)), trace_tags(
+                source="import_queue.run_import_workers"
+            ):
+                try:
+                    results = unreal4.import_assets(
+                        [(job.asset_data, job.properties) for job in jobs],
+                        chunk_size=batch_size,
+                        as_remote=as_remote,
+                        remote_exec=remote_exec,
+                        manifest=manifest,
+                    )
+                except Exception as e:
+                    logging.warning(f"Import batch failed on {worker}: {e}")
+                    queue.fail(jobs, str(e))
+                    continue
+            for job, result in zip(jobs, results):
+                queue.complete(job, result)
+
+    threads = [
+        threading.Thread(target=work, args=(f"import-worker-{i}",), daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return queue.counts()
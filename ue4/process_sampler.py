@@ -0,0 +1,276 @@
+# utf-8
+# python 3.9
+from __future__ import annotations
+
+import sys
+import json
+import math
+import time
+import threading
+from array import array
+from dataclasses import dataclass, field, asdict
+from typing import Optional
+
+import psutil
+
+from .utils import logging
+
+DEFAULT_SAMPLE_INTERVAL = 1.0
+DEFAULT_SAMPLE_CAPACITY = 3600
+DEFAULT_MAX_ENDED_JOBS = 1000
+
+# The metrics recorded for each sample, summed over a tracked process and its children.
+# read_bytes and write_bytes are the I/O totals of the processes alive at the time of the sample,
+# and handles is the number of open handles on Windows (file descriptors elsewhere).
+SAMPLE_METRICS = ("cpu_percent", "rss", "read_bytes", "write_bytes", "threads", "handles")
+
+
+class SampleRing:
+    """
+    A bounded time series of samples, one array of floats per metric, that overwrites its oldest samples when full.
+    The arrays grow as samples are appended (up to capacity), so a short-lived process only costs the samples it has.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SAMPLE_CAPACITY, metrics: tuple[str, ...] = SAMPLE_METRICS):
+        """
+        :param int capacity: The maximum number of samples kept.
+        :param tuple metrics: The names of the metrics of each sample.
+        """
+        self.capacity = capacity
+        self.metrics = metrics
+        self._columns = {name: array("d") for name in ("timestamp", *metrics)}
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._columns["timestamp"])
+
+    def append(self, timestamp: float, values: dict[str, float]):
+        """
+        :param float timestamp: The time of the sample.
+        :param dict values: The value of each metric (0 for any missing).
+        """
+        sample = {"timestamp": timestamp}
+        sample.update((name, values.get(name, 0.0)) for name in self.metrics)
+        if len(self) < self.capacity:
+            for name, column in self._columns.items():
+                column.append(sample[name])
+            return
+        for name, column in self._columns.items():
+            column[self._next] = sample[name]
+        self._next = (self._next + 1) % self.capacity
+
+    def column(self, name: str) -> list[float]:
+        """
+        :param str name: The name of a metric, or "timestamp".
+        :return list: The values of the metric, oldest first.
+        """
+        values = self._columns[name]
+        return values[self._next :].tolist() + values[: self._next].tolist()
+
+
+@dataclass
+class MetricSummary:
+    peak: float = 0.0
+    mean: float = 0.0
+    p95: float = 0.0
+
+    @classmethod
+    def from_values(cls, values: list[float]) -> MetricSummary:
+        if not values:
+            return cls()
+        ordered = sorted(values)
+        p95 = ordered[max(math.ceil(0.95 * len(ordered)) - 1, 0)]
+        return cls(ordered[-1], sum(ordered) / len(ordered), p95)
+
+
+@dataclass
+class JobResourceSummary:
+    """The resource use of one tracked process (and its children) over the samples kept"""
+
+    job: str
+    pid: int
+    started_at: float
+    ended_at: Optional[float]
+    samples: int
+    metrics: dict[str, MetricSummary] = field(default_factory=dict)
+
+
+@dataclass
+class _TrackedJob:
+    job: str
+    pid: int
+    started_at: float
+    ring: SampleRing
+    ended_at: Optional[float] = None
+    # psutil keeps the previous cpu times on each Process, so the same objects are reused between samples
+    processes: dict[int, psutil.Process] = field(default_factory=dict)
+
+
+class ProcessSampler:
+    """
+    A background thread that samples the CPU, memory, I/O, thread and handle use of tracked processes and their
+    children every interval seconds. Pass one to Unreal4 to track every editor it launches with run_editor.
+    A tracked process stops being sampled once it exits, but its samples are kept for ``summaries``, for up to
+    max_ended_jobs ended jobs (the jobs that ended first are dropped first).
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_SAMPLE_INTERVAL,
+        capacity: int = DEFAULT_SAMPLE_CAPACITY,
+        max_ended_jobs: Optional[int] = DEFAULT_MAX_ENDED_JOBS,
+    ):
+        """
+        :param float interval: The seconds between samples.
+        :param int capacity: The maximum number of samples kept per tracked process (the oldest are dropped).
+        :param int max_ended_jobs: The maximum number of ended jobs kept, or None to keep them until they are untracked.
+        """
+        self.interval = interval
+        self.capacity = capacity
+        self.max_ended_jobs = max_ended_jobs
+        self._jobs: dict[str, _TrackedJob] = {}
+        # the ended jobs, in the order they ended
+        self._ended_jobs: dict[str, _TrackedJob] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> ProcessSampler:
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ProcessSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def track(self, pid: int, job: Optional[str] = None) -> str:
+        """
+        Start sampling a process and its children.
+
+        :param int pid: The ID of the process.
+        :param str job: The name of the job the process runs, or None to name it after the process.
+        :return str: The name of the job.
+        """
+        job = job or f"{pid}"
+        with self._lock:
+            self._jobs[job] = _TrackedJob(job, pid, time.time(), SampleRing(self.capacity))
+            self._ended_jobs.pop(job, None)
+        return job
+
+    def untrack(self, job: str):
+        with self._lock:
+            self._jobs.pop(job, None)
+            self._ended_jobs.pop(job, None)
+
+    def sample(self):
+        """
+        Take one sample of every tracked process that is still running (the background thread calls this every interval).
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.ended_at is None]
+        for job in jobs:
+            values = self._sample_job(job)
+            with self._lock:
+                if values is None:
+                    job.ended_at = time.time()
+                    self._end_job(job)
+                else:
+                    job.ring.append(time.time(), values)
+
+    def _end_job(self, job: _TrackedJob):
+        # called with the lock held
+        if self._jobs.get(job.job) is not job:
+            return  # untracked (or replaced) while it was being sampled
+        self._ended_jobs[job.job] = job
+        while self.max_ended_jobs is not None and len(self._ended_jobs) > self.max_ended_jobs:
+            oldest = next(iter(self._ended_jobs))
+            del self._ended_jobs[oldest]
+            del self._jobs[oldest]
+
+    def summary(self, job: str) -> JobResourceSummary:
+        """
+        :param str job: The name of the job.
+        :return JobResourceSummary: The peak, mean and 95th percentile of each metric of the job.
+        """
+        with self._lock:
+            tracked = self._jobs[job]
+            columns = {name: tracked.ring.column(name) for name in SAMPLE_METRICS}
+            samples = len(tracked.ring)
+        return JobResourceSummary(
+            tracked.job,
+            tracked.pid,
+            tracked.started_at,
+            tracked.ended_at,
+            samples,
+            {name: MetricSummary.from_values(values) for name, values in columns.items()},
+        )
+
+    def summaries(self) -> dict[str, JobResourceSummary]:
+        with self._lock:
+            jobs = list(self._jobs)
+        return {job: self.summary(job) for job in jobs}
+
+    def export(self, path: str):
+        """
+        Write the summary of every job to a JSON file.
+
+        :param str path: The path of the file.
+        """
+        summaries = {job: asdict(summary) for job, summary in self.summaries().items()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=1, sort_keys=True)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.warning(f"Failed to sample processes: {e}")
+            self._stop_event.wait(self.interval)
+
+    def _sample_job(self, job: _TrackedJob) -> Optional[dict[str, float]]:
+        """
+        :return dict: The metrics summed over the process and its children, or None if the process has exited.
+        """
+        try:
+            root = job.processes.get(job.pid) or psutil.Process(job.pid)
+            if root.status() == psutil.STATUS_ZOMBIE:
+                return None
+            processes = [root, *root.children(recursive=True)]
+        except psutil.Error:
+            return None
+        job.processes = {
+            process.pid: job.processes.get(process.pid, process) for process in processes
+        }
+        values = dict.fromkeys(SAMPLE_METRICS, 0.0)
+        for process in job.processes.values():
+            try:
+                with process.oneshot():
+                    values["cpu_percent"] += process.cpu_percent()
+                    values["rss"] += process.memory_info().rss
+                    values["threads"] += process.num_threads()
+                    values["handles"] += (
+                        process.num_handles() if sys.platform == "win32" else process.num_fds()
+                    )
+                    try:
+                        io = process.io_counters()
+                        values["read_bytes"] += io.read_bytes
+                        values["write_bytes"] += io.write_bytes
+                    except (AttributeError, psutil.AccessDenied):
+                        pass
+            except psutil.Error:
+                pass
+        return values
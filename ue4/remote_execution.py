@@ -1,12 +1,30 @@
 # Copyright 1998-2019 Epic Games, Inc. All Rights Reserved.
 
+import os as _os
+import abc as _abc
+import re as _re
 import sys as _sys
 import json as _json
+import hashlib as _hashlib
+import types as _types
 import uuid as _uuid
 import time as _time
 import socket as _socket
+import select as _select
+import copy as _copy
+import queue as _queue
 import logging as _logging
+import itertools as _itertools
+import collections as _collections
 import threading as _threading
+import contextlib as _contextlib
+import contextvars as _contextvars
+import concurrent.futures as _futures
+
+try:
+    import orjson as _orjson # Optional faster JSON backend
+except ImportError:
+    _orjson = None
 
 # Protocol constants (see PythonScriptRemoteExecution.cpp for the full protocol definition)
 _PROTOCOL_VERSION = 1                                   # Protocol version number
@@ -17,20 +35,45 @@ _TYPE_OPEN_CONNECTION = 'open_connection'               # Open a TCP command con
 _TYPE_CLOSE_CONNECTION = 'close_connection'             # Close any active TCP command connection (UDP)
 _TYPE_COMMAND = 'command'                               # Execute a remote Python command (TCP)
 _TYPE_COMMAND_RESULT = 'command_result'                 # Result of executing a remote Python command (TCP)
+_PROTOCOL_MAGIC_BYTES = _json.dumps(_PROTOCOL_MAGIC).encode('utf-8') # The quoted protocol magic identifier, which every valid message must contain
 
 _NODE_PING_SECONDS = 1                                  # Number of seconds to wait before sending another "ping" message to discover remote notes
+_NODE_WAIT_PING_SECONDS = 0.1                           # Number of seconds to wait before sending another "ping" message while something is waiting for a remote node to be discovered
+_HANDSHAKE_RETRANSMIT_SECONDS = 0.05                    # Number of seconds to wait for a command connection before re-sending the first "open_connection" message (doubled for each re-send)
+_HANDSHAKE_MAX_RETRANSMIT_SECONDS = 1                   # Maximum number of seconds to wait for a command connection before re-sending an "open_connection" message
+_HANDSHAKE_LISTEN_BACKLOG = 16                          # Number of command connections that can wait to be accepted (a re-sent "open_connection" message can make the remote party connect again)
+_HANDSHAKE_CONFIRM_COMMAND = 'None'                     # The no-op command run (with MODE_EVAL_STATEMENT) to confirm which command connection the remote party kept, after "open_connection" was re-sent
+_TRACE_COMMAND_PREVIEW_LENGTH = 256                     # Number of characters of a command to include in the tags of its span
+_PARSE_ERROR_PREVIEW_LENGTH = 256                       # Number of characters of a message that failed to parse to include in the error log
 _NODE_TIMEOUT_SECONDS = 5                               # Number of seconds to wait before timing out a remote node that was discovered via UDP and has stopped sending "pong" responses
 
 DEFAULT_MULTICAST_TTL = 0                               # Multicast TTL (0 is limited to the local host, 1 is limited to the local subnet)
 DEFAULT_MULTICAST_GROUP_ENDPOINT = ('239.0.0.1', 6766)  # The multicast group endpoint tuple that the UDP multicast socket should join (must match the "Multicast Group Endpoint" setting in the Python plugin)
 DEFAULT_MULTICAST_BIND_ADDRESS = '0.0.0.0'              # The adapter address that the UDP multicast socket should bind to, or 0.0.0.0 to bind to all adapters (must match the "Multicast Bind Address" setting in the Python plugin)
-DEFAULT_COMMAND_ENDPOINT = ('127.0.0.1', 6776)          # The endpoint tuple for the TCP command connection hosted by this client (that the remote client will connect to)
+DEFAULT_COMMAND_ENDPOINT = ('127.0.0.1', 0)             # The endpoint tuple for the TCP command connection hosted by this client (that the remote client will connect to). Port 0 listens on a new ephemeral port for each command connection
+DEFAULT_COMMAND_PORT_POOL = None                        # The ports that command connections may listen on (the first free port is used), or None to use the port from the command endpoint
+DEFAULT_COMMAND_CONNECT_TIMEOUT = 30                    # The number of seconds to wait for a remote node to make its command connection before giving up
+DEFAULT_FAN_OUT_WORKERS = 8                             # The maximum number of remote nodes that a fan-out command is run on concurrently
+DEFAULT_METRICS_QUANTILES = (0.5, 0.9, 0.99)           # The quantiles reported for each timing histogram in the metrics stats and dumps
+DEFAULT_RESULT_CACHE_MAX_ENTRIES = 4096                 # The maximum number of command results kept by the result cache before the least recently used are evicted
+DEFAULT_RESULT_CACHE_TTL = 30                           # The number of seconds a cached command result is used for before the command is run again
+DEFAULT_STREAM_BUFFERED_LINES = 1000                    # The maximum number of streamed output lines buffered by the client before the remote command is made to wait for them to be read
+DEFAULT_RECEIVE_BUFFER_SIZE = 2097152                   # The size of the reusable buffer used to receive TCP command messages (should match the "Receive Buffer Size" setting in the Python plugin)
+DEFAULT_MAX_MESSAGE_SIZE = 268435456                    # The maximum size of a single TCP command message, in bytes, before the message is rejected (rather than buffered without limit)
 
 # Execution modes (these must match the names given to LexToString for EPythonCommandExecutionMode in IPythonScriptPlugin.h)
 MODE_EXEC_FILE = 'ExecuteFile'                          # Execute the Python command as a file. This allows you to execute either a literal Python script containing multiple statements, or a file with optional arguments
 MODE_EXEC_STATEMENT = 'ExecuteStatement'                # Execute the Python command as a single statement. This will execute a single statement and print the result. This mode cannot run files
 MODE_EVAL_STATEMENT = 'EvaluateStatement'               # Evaluate the Python command as a single statement. This will evaluate a single statement and return the result. This mode cannot run files
 
+# Node selection policies (see `RemoteExecutionSession.select_node`)
+NODE_POLICY_LEAST_IN_FLIGHT = 'least_in_flight'         # Pick the node with the fewest commands running or queued, preferring nodes that already have a command connection
+NODE_POLICY_EWMA_LATENCY = 'ewma_latency'               # Pick the node expected to finish soonest, based on its recent command latency and the commands already queued on it
+NODE_POLICY_ROUND_ROBIN = 'round_robin'                 # Pick each node in turn
+NODE_POLICY_STICKY = 'sticky'                           # Pick the same node for the same key for as long as it is available (falls back to least in-flight without a key)
+DEFAULT_NODE_POLICY = NODE_POLICY_LEAST_IN_FLIGHT       # The node selection policy used when none is given
+DEFAULT_NODE_LATENCY_EWMA_ALPHA = 0.3                   # The weight of the latest command latency in each node's moving average latency (0-1)
+
 class RemoteExecutionConfig(object):
     '''
     Configuration data for establishing a remote connection with a UE4 instance running Python.
@@ -40,6 +83,10 @@ class RemoteExecutionConfig(object):
         self.multicast_group_endpoint = DEFAULT_MULTICAST_GROUP_ENDPOINT
         self.multicast_bind_address = DEFAULT_MULTICAST_BIND_ADDRESS
         self.command_endpoint = DEFAULT_COMMAND_ENDPOINT
+        self.command_port_pool = DEFAULT_COMMAND_PORT_POOL
+        self.receive_buffer_size = DEFAULT_RECEIVE_BUFFER_SIZE
+        self.max_message_size = DEFAULT_MAX_MESSAGE_SIZE
+        self.command_connect_timeout = DEFAULT_COMMAND_CONNECT_TIMEOUT
 
 class RemoteExecution(object):
     '''
@@ -52,6 +99,11 @@ class RemoteExecution(object):
         self._config = config
         self._broadcast_connection = None
         self._command_connection = None
+        self._session = None
+        self.metrics = RemoteExecutionMetrics()
+        self.result_cache = RemoteExecutionResultCache()
+        self._node_added_callbacks = []
+        self._node_lost_callbacks = []
         self._node_id = str(_uuid.uuid4())
 
     @property
@@ -64,11 +116,52 @@ class RemoteExecution(object):
         '''
         return self._broadcast_connection.remote_nodes if self._broadcast_connection else []
 
+    @property
+    def is_running(self):
+        '''
+        Check whether the remote execution session has been started (and not stopped), so remote "nodes" are being discovered.
+
+        Returns:
+            bool: True if the session is running, False otherwise.
+        '''
+        return self._broadcast_connection is not None
+
+    @property
+    def node_snapshot(self):
+        '''
+        Get an immutable, indexed snapshot of the discovered remote "nodes" (UE4 instances running Python), without copying any node data.
+
+        Returns:
+            RemoteExecutionNodeSnapshot: The current snapshot (its version increases whenever the set of nodes changes).
+        '''
+        return self._broadcast_connection.node_snapshot if self._broadcast_connection else _EMPTY_NODE_SNAPSHOT
+
+    def stats(self):
+        '''
+        Get the command timings and counts recorded by this remote execution session (see `RemoteExecutionMetrics.stats`).
+
+        Returns:
+            dict: The recorded metrics for each remote node ID.
+        '''
+        return self.metrics.stats()
+
+    @property
+    def session(self):
+        '''
+        Get the long-lived command session for this remote execution session, creating it if needed.
+
+        Returns:
+            RemoteExecutionSession: The session that keeps a command connection open to each remote node it has been used with.
+        '''
+        if not self._session:
+            self._session = RemoteExecutionSession(self)
+        return self._session
+
     def start(self):
         '''
         Start the remote execution session. This will begin the discovey process for remote "nodes" (UE4 instances running Python).
         '''
-        self._broadcast_connection = _RemoteExecutionBroadcastConnection(self._config, self._node_id)
+        self._broadcast_connection = _RemoteExecutionBroadcastConnection(self._config, self._node_id, self._node_added_callbacks, self._node_lost_callbacks)
         self._broadcast_connection.open()
 
     def stop(self):
@@ -76,10 +169,55 @@ class RemoteExecution(object):
         Stop the remote execution session. This will end the discovey process for remote "nodes" (UE4 instances running Python), and close any open command connection.
         '''
         self.close_command_connection()
+        if self._session:
+            self._session.close()
         if self._broadcast_connection:
             self._broadcast_connection.close()
             self._broadcast_connection = None
 
+    def wait_for_node(self, predicate=None, timeout=None):
+        '''
+        Wait until a remote "node" (UE4 instance running Python) matching the given predicate has been discovered.
+        This returns as soon as the matching "pong" message arrives, rather than polling `remote_nodes`.
+
+        Args:
+            predicate (callable): Called with each node dict (as returned by `remote_nodes`), returning True for a matching node. None matches any node.
+            timeout (float): The number of seconds to wait, or None to wait forever.
+
+        Returns:
+            dict: The first matching node (containing the node ID and the other data), or None if no matching node was discovered within the timeout (or the session isn't started).
+        '''
+        return self._broadcast_connection.wait_for_node(predicate, timeout) if self._broadcast_connection else None
+
+    def add_node_added_callback(self, callback):
+        '''
+        Add a callback to be called (from the discovery thread) whenever a new remote node is discovered.
+
+        Args:
+            callback (callable): Called with the node dict (containing the node ID and the other data).
+        '''
+        self._node_added_callbacks.append(callback)
+
+    def add_node_lost_callback(self, callback):
+        '''
+        Add a callback to be called (from the discovery thread) whenever a remote node has stopped responding and is removed.
+
+        Args:
+            callback (callable): Called with the node dict (containing the node ID and the other data).
+        '''
+        self._node_lost_callbacks.append(callback)
+
+    def remove_node_callback(self, callback):
+        '''
+        Remove a callback previously added with `add_node_added_callback` or `add_node_lost_callback`.
+
+        Args:
+            callback (callable): The callback to remove.
+        '''
+        for callbacks in (self._node_added_callbacks, self._node_lost_callbacks):
+            while callback in callbacks:
+                callbacks.remove(callback)
+
     def has_command_connection(self):
         '''
         Check whether the remote execution session has an active command connection.
@@ -89,6 +227,16 @@ class RemoteExecution(object):
         '''
         return self._command_connection is not None
 
+    @property
+    def last_receive_stats(self):
+        '''
+        Get the size of the last message received over the current command connection.
+
+        Returns:
+            dict: The number of bytes and socket reads ("chunks") used by the last received message, or None if there is no command connection.
+        '''
+        return self._command_connection.last_receive_stats if self._command_connection else None
+
     def open_command_connection(self, remote_node_id):
         '''
         Open a command connection to the given remote "node" (a UE4 instance running Python), closing any command connection that may currently be open.
@@ -97,14 +245,17 @@ class RemoteExecution(object):
             remote_node_id (string): The ID of the remote node (this can be obtained by querying `remote_nodes`).
         '''
         self._command_connection = _RemoteExecutionCommandConnection(self._config, self._node_id, remote_node_id)
-        self._command_connection.open(self._broadcast_connection)
+        with trace_span('open_command_connection', remote_node_id=remote_node_id):
+            self._command_connection.open(self._broadcast_connection)
+        self.metrics.record(remote_node_id, 'handshake_seconds', self._command_connection.handshake_latency)
 
     def close_command_connection(self):
         '''
         Close any command connection that may currently be open.
         '''
         if self._command_connection:
-            self._command_connection.close(self._broadcast_connection)
+            with trace_span('close_command_connection', remote_node_id=self._command_connection.remote_node_id):
+                self._command_connection.close(self._broadcast_connection)
             self._command_connection = None
 
     def run_command(self, command, unattended=True, exec_mode=MODE_EXEC_FILE, raise_on_failure=False):
@@ -120,366 +271,2536 @@ class RemoteExecution(object):
         Returns:
             dict: The result from running the remote command (see `command_result` from the protocol definition).
         '''
-        data = self._command_connection.run_command(command, unattended, exec_mode)
+        with trace_span('run_command', remote_node_id=self._command_connection.remote_node_id, exec_mode=exec_mode) as span:
+            data = self.metrics.run_command(self._command_connection, command, unattended, exec_mode)
+            span.set_command_tags(command, data, self._command_connection.last_command_timings)
         if raise_on_failure and not data['success']:
             raise RuntimeError('Remote Python Command failed! {0}'.format(data['result']))
         return data
 
-class _RemoteExecutionNode(object):
-    '''
-    A discovered remote "node" (aka, a UE4 instance running Python).
-
-    Args:
-        data (dict): The data representing this node (from its "pong" reponse).
-        now (float): The timestamp at which this node was last seen.
-    '''
-    def __init__(self, data, now=None):
-        self.data = data
-        self._last_pong = _time_now(now)
-
-    def should_timeout(self, now=None):
+    def run_batch(self, commands, unattended=True):
         '''
-        Check to see whether this remote node should be considered timed-out.
+        Run several independent commands remotely based on the current command connection, using a single round trip.
 
         Args:
-            now (float): The current timestamp.
+            commands (list): The Python commands to run remotely (see `_RemoteExecutionBatch` for how each one is run).
+            unattended (bool): True to run these commands in "unattended" mode (suppressing some UI).
 
         Returns:
-            bool: True of the node has exceeded the timeout limit (`_NODE_TIMEOUT_SECONDS`), False otherwise.
+            list: The result from running each remote command, in the same format as `run_command`.
         '''
-        return (self._last_pong + _NODE_TIMEOUT_SECONDS) < _time_now(now)
+        batch = _RemoteExecutionBatch(commands)
+        with trace_span('run_batch', remote_node_id=self._command_connection.remote_node_id, commands=len(batch.commands)) as span:
+            data = self.metrics.run_command(self._command_connection, batch.command, unattended, MODE_EXEC_FILE)
+            span.set_command_tags(None, data, self._command_connection.last_command_timings)
+        return batch.split_result(data)
 
-class _RemoteExecutionBroadcastNodes(object):
+class RemoteExecutionSession(object):
     '''
-    A thread-safe set of remote execution "nodes" (UE4 instances running Python).
+    A long-lived command session on top of a remote execution session. This keeps one command connection open per remote "node" (UE4 instance running Python),
+    reusing it for every command sent to that node, and only re-opening it when its socket has actually failed.
+
+    Args:
+        remote_exec (RemoteExecution): The remote execution session used to discover nodes and send UDP based messages.
     '''
-    def __init__(self):
-        self._remote_nodes = {}
-        self._remote_nodes_lock = _threading.RLock()
+    def __init__(self, remote_exec):
+        self._remote_exec = remote_exec
+        self._command_connections = {}
+        self._node_locks = {}
+        self._lock = _threading.RLock()
+        max_handshakes = _get_max_concurrent_handshakes(remote_exec._config)
+        self._handshake_semaphore = _threading.BoundedSemaphore(max_handshakes) if max_handshakes else None
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.reconnects = 0
+        self.commands_run = 0
+        self.handshake_latencies = {}
+        self.node_policy = DEFAULT_NODE_POLICY
+        self._node_policies = {}
+        self._node_loads = {}
 
     @property
-    def remote_nodes(self):
+    def stats(self):
         '''
-        Get the current set of discovered remote "nodes" (UE4 instances running Python).
+        Get the connection reuse counters for this session.
 
         Returns:
-            list: A list of dicts containg the node ID and the other data.
+            dict: The number of connections opened, reused and re-opened (after a socket failure), the number of commands run, and the latest handshake latency (in seconds) per remote node ID.
         '''
-        with self._remote_nodes_lock:
-            remote_nodes_list = []
-            for node_id, node in self._remote_nodes.items():
-                remote_node_data = dict(node.data)
-                remote_node_data['node_id'] = node_id
-                remote_nodes_list.append(remote_node_data)
-            return remote_nodes_list
+        with self._lock:
+            return {
+                'connections_opened': self.connections_opened,
+                'connections_reused': self.connections_reused,
+                'reconnects': self.reconnects,
+                'commands_run': self.commands_run,
+                'open_connections': len(self._command_connections),
+                'handshake_latencies': dict(self.handshake_latencies),
+                }
 
-    def update_remote_node(self, node_id, node_data, now=None):
+    def has_command_connection(self, remote_node_id):
         '''
-        Update a remote node, replacing any existing data.
+        Check whether this session has an open command connection to the given remote node.
 
         Args:
-            node_id (str): The ID of the remote node (from its "pong" reponse).
-            node_data (dict): The data representing this node (from its "pong" reponse).
-            now (float): The timestamp at which this node was last seen.
-        '''
-        now = _time_now(now)
-        with self._remote_nodes_lock:
-            if node_id not in self._remote_nodes:
-                _logger.debug('Found Node {0}: {1}'.format(node_id, node_data))
-            self._remote_nodes[node_id] = _RemoteExecutionNode(node_data, now)
+            remote_node_id (string): The ID of the remote node.
 
-    def timeout_remote_nodes(self, now=None):
+        Returns:
+            bool: True if a command connection is open to the remote node, False otherwise.
         '''
-        Check to see whether any remote nodes should be considered timed-out, and if so, remove them from this set.
+        with self._lock:
+            return remote_node_id in self._command_connections
 
-        Args:
-            now (float): The current timestamp.
+    def run_command(self, remote_node_id, command, unattended=True, exec_mode=MODE_EXEC_FILE, raise_on_failure=False):
         '''
-        now = _time_now(now)
-        with self._remote_nodes_lock:
-            for node_id, node in list(self._remote_nodes.items()):
-                if node.should_timeout(now):
-                    _logger.debug('Lost Node {0}: {1}'.format(node_id, node.data))
-                    del self._remote_nodes[node_id]
+        Run a command remotely on the given remote node, opening (or re-opening) a command connection to it if needed.
 
-class _RemoteExecutionBroadcastConnection(object):
-    '''
-    A remote execution broadcast connection (for UDP based messaging and node discovery).
+        Args:
+            remote_node_id (string): The ID of the remote node to run the command on.
+            command (string): The Python command to run remotely.
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+            raise_on_failure (bool): True to raise a RuntimeError if the command fails on the remote target.
 
-    Args:
-        config (RemoteExecutionConfig): Configuration controlling the connection settings.
-        node_id (string): The ID of the local "node" (this session).
-    '''
-    def __init__(self, config, node_id):
-        self._config = config
-        self._node_id = node_id
-        self._nodes = None
-        self._running = False
-        self._broadcast_socket = None
-        self._broadcast_listen_thread = None
+        Returns:
+            dict: The result from running the remote command (see `command_result` from the protocol definition).
+        '''
+        with self._lock:
+            node_load = self._node_loads.get(remote_node_id)
+            if node_load is None:
+                node_load = self._node_loads[remote_node_id] = _RemoteExecutionNodeLoad()
+            node_load.in_flight += 1
+        start_time = _time.perf_counter()
+        try:
+            with trace_span('run_command', remote_node_id=remote_node_id, exec_mode=exec_mode) as span, self._get_node_lock(remote_node_id):
+                command_connection = self._get_command_connection(remote_node_id)
+                try:
+                    data = self._remote_exec.metrics.run_command(command_connection, command, unattended, exec_mode)
+                except (RuntimeError, _socket.error):
+                    # The connection is in an unknown state, so drop it and let the next command re-open it
+                    self.close_command_connection(remote_node_id)
+                    raise
+                span.set_command_tags(command, data, command_connection.last_command_timings)
+                latency = command_connection.last_command_timings.get('total_seconds')
+        finally:
+            with self._lock:
+                node_load.in_flight -= 1
+        with self._lock:
+            self.commands_run += 1
+            node_load.record_latency(latency if latency is not None else _time.perf_counter() - start_time)
+        if raise_on_failure and not data['success']:
+            raise RuntimeError('Remote Python Command failed! {0}'.format(data['result']))
+        return data
 
-    @property
-    def remote_nodes(self):
+    def run_batch(self, remote_node_id, commands, unattended=True):
         '''
-        Get the current set of discovered remote "nodes" (UE4 instances running Python).
+        Run several independent commands remotely on the given remote node, using a single round trip.
+
+        Args:
+            remote_node_id (string): The ID of the remote node to run the commands on.
+            commands (list): The Python commands to run remotely (see `_RemoteExecutionBatch` for how each one is run).
+            unattended (bool): True to run these commands in "unattended" mode (suppressing some UI).
 
         Returns:
-            list: A list of dicts containg the node ID and the other data.
+            list: The result from running each remote command, in the same format as `run_command`.
         '''
-        return self._nodes.remote_nodes if self._nodes else []
+        batch = _RemoteExecutionBatch(commands)
+        with trace_span('run_batch', remote_node_id=remote_node_id, commands=len(batch.commands)):
+            return batch.split_result(self.run_command(remote_node_id, batch.command, unattended, MODE_EXEC_FILE))
 
-    def open(self):
-        '''
-        Open the UDP based messaging and discovery connection. This will begin the discovey process for remote "nodes" (UE4 instances running Python).
+    def stream_command(self, remote_node_id, command, callback=None, unattended=True, max_buffered_lines=DEFAULT_STREAM_BUFFERED_LINES):
         '''
-        self._running = True
-        self._last_ping = None
-        self._nodes = _RemoteExecutionBroadcastNodes()
-        self._init_broadcast_socket()
-        self._init_broadcast_listen_thread()
+        Run a command remotely on the given remote node, streaming its output line by line as it happens (rather than only receiving it with the result).
+        The command is wrapped so that it connects back to a local socket, and also sends its printed and `unreal.log` output over it (the output still reaches the editor log and the result). The command is run in `MODE_EXEC_FILE`.
 
-    def close(self):
-        '''
-        Close the UDP based messaging and discovery connection. This will end the discovey process for remote "nodes" (UE4 instances running Python).
-        '''
-        self._running = False
-        if self._broadcast_listen_thread:
-            self._broadcast_listen_thread.join()
-        if self._broadcast_socket:
-            self._broadcast_socket.close()
-            self._broadcast_socket = None
-        self._nodes = None
+        Args:
+            remote_node_id (string): The ID of the remote node to run the command on.
+            command (string): The Python command to run remotely.
+            callback (callable): Called (on a background thread) with each output entry dict as it arrives, or None to read the entries by iterating the returned stream.
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            max_buffered_lines (int): The maximum number of output lines waiting to be read, before the remote command is made to wait for them.
 
-    def _init_broadcast_socket(self):
-        '''
-        Initialize the UDP based broadcast socket based on the current configuration.
+        Returns:
+            RemoteExecutionCommandStream: The running command, which yields its output entries when iterated, and gives its result from `result`.
         '''
-        self._broadcast_socket = _socket.socket(_socket.AF_INET, _socket.SOCK_DGRAM, _socket.IPPROTO_UDP) # UDP/IP socket
-        self._broadcast_socket.setsockopt(_socket.SOL_SOCKET, _socket.SO_REUSEADDR, 1)
-        self._broadcast_socket.bind((self._config.multicast_bind_address, self._config.multicast_group_endpoint[1]))
-        self._broadcast_socket.setsockopt(_socket.IPPROTO_IP, _socket.IP_MULTICAST_LOOP, 1)
-        self._broadcast_socket.setsockopt(_socket.IPPROTO_IP, _socket.IP_MULTICAST_TTL, self._config.multicast_ttl)
-        self._broadcast_socket.setsockopt(_socket.IPPROTO_IP, _socket.IP_ADD_MEMBERSHIP, _socket.inet_aton(self._config.multicast_group_endpoint[0]) + _socket.inet_aton('0.0.0.0'))
-        self._broadcast_socket.settimeout(0.1)
+        stream = RemoteExecutionCommandStream(self._remote_exec._config, callback, max_buffered_lines)
+        stream.start(lambda: self.run_command(remote_node_id, stream.wrap_command(command), unattended, MODE_EXEC_FILE))
+        return stream
 
-    def _init_broadcast_listen_thread(self):
+    def run_cached_command(self, remote_node_id, command, paths=None, ttl=None, unattended=True, exec_mode=MODE_EXEC_FILE, cache_failures=False):
         '''
-        Initialize the listen thread for the UDP based broadcast socket to allow discovery to run async.
+        Run a read-only command remotely on the given remote node, re-using its result from `RemoteExecution.result_cache` if the same command has already been run recently.
+        Results are cached per remote node and project, and are dropped once they expire, or when `invalidate_cache` is called for one of their paths.
+
+        Args:
+            remote_node_id (string): The ID of the remote node to run the command on.
+            command (string): The Python command to run remotely. This must not change anything, as it may not be run at all.
+            paths (list): The asset or directory paths the result depends on (eg, "/Game/Props"), or None if it may depend on anything (so any invalidation drops it).
+            ttl (float): The number of seconds to cache the result for, or None to use the cache's default.
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+            cache_failures (bool): True to also cache a result where the command failed (eg, when failing is the answer to the query).
+
+        Returns:
+            dict: The result from running the remote command (see `command_result` from the protocol definition).
         '''
-        self._broadcast_listen_thread = _threading.Thread(target=self._run_broadcast_listen_thread)
-        self._broadcast_listen_thread.daemon = True
-        self._broadcast_listen_thread.start()
+        result_cache = self._remote_exec.result_cache
+        project = self._get_node_project(remote_node_id)
+        key = (exec_mode, command)
+        data = result_cache.get(remote_node_id, project, key)
+        if data is None:
+            data = self.run_command(remote_node_id, command, unattended, exec_mode)
+            if data['success'] or cache_failures:
+                result_cache.put(remote_node_id, project, key, data, paths, ttl)
+        return data
 
-    def _run_broadcast_listen_thread(self):
+    def invalidate_cache(self, paths=None, remote_node_id=None):
         '''
-        Main loop for the listen thread that handles processing discovery messages.
+        Drop the cached command results that may have been changed by a write (eg, an import, rename, delete or save).
+
+        Args:
+            paths (list): The asset or directory paths that were changed (a directory also invalidates everything below it), or None if anything may have changed.
+            remote_node_id (string): The ID of the remote node that made the change, which limits the invalidation to results from the same project, or None to invalidate results from every project.
+
+        Returns:
+            int: The number of cached results that were dropped.
         '''
-        while self._running:
-            # Receive and process all pending data
-            while True:
-                try:
-                    data = self._broadcast_socket.recv(4096)
-                except _socket.timeout:
-                    data = None
-                if data:
-                    self._handle_data(data)
-                else:
-                    break
-            # Run tick logic
-            now = _time_now()
-            self._broadcast_ping(now)
-            self._nodes.timeout_remote_nodes(now)
-            _time.sleep(0.1)
+        project = self._get_node_project(remote_node_id) if remote_node_id else None
+        return self._remote_exec.result_cache.invalidate(paths, project)
 
-    def _broadcast_message(self, message):
+    def run_command_on_nodes(self, command, remote_node_ids=None, unattended=True, exec_mode=MODE_EXEC_FILE, max_workers=DEFAULT_FAN_OUT_WORKERS):
         '''
-        Broadcast the given message over the UDP socket to anything that might be listening.
+        Run a command remotely on several remote nodes concurrently, using a bounded pool of threads.
+        A failure on one node doesn't affect the others, it is reported in that node's result instead.
 
         Args:
-            message (_RemoteExecutionMessage): The message to broadcast.
-        '''
-        self._broadcast_socket.sendto(message.to_json_bytes(), self._config.multicast_group_endpoint)
+            command (string|dict): The Python command to run on every node, or a dict mapping each remote node ID to the command to run on it.
+            remote_node_ids (list): The IDs of the remote nodes to run the command on, or None to use every discovered node (ignored if `command` is a dict).
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+            max_workers (int): The maximum number of nodes to run the command on at the same time.
 
-    def _broadcast_ping(self, now=None):
+        Returns:
+            dict: A `RemoteExecutionNodeResult` for each remote node ID.
         '''
-        Broadcast a "ping" message over the UDP socket to anything that might be listening.
+        if isinstance(command, dict):
+            node_commands = dict(command)
+        else:
+            if remote_node_ids is None:
+                remote_node_ids = [node['node_id'] for node in self._remote_exec.remote_nodes]
+            node_commands = {remote_node_id: command for remote_node_id in remote_node_ids}
+        if not node_commands:
+            return {}
+        with _futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(node_commands)))) as executor:
+            # Run each command in a copy of this context, so its spans are children of the current span
+            futures = {
+                remote_node_id: executor.submit(_contextvars.copy_context().run, self._run_node_command, remote_node_id, node_command, unattended, exec_mode)
+                for remote_node_id, node_command in node_commands.items()
+                }
+            return {remote_node_id: future.result() for remote_node_id, future in futures.items()}
+
+    def node_load(self, remote_node_id):
+        '''
+        Get the live load statistics of the given remote node, as used by the node selection policies.
 
         Args:
-            now (float): The current timestamp.
+            remote_node_id (string): The ID of the remote node.
+
+        Returns:
+            dict: The number of commands running or queued on the node ("in_flight"), the number of commands it has completed ("commands"),
+            its moving average command latency in seconds ("ewma_latency", None until a command has completed), and whether it has an open command connection ("connected").
         '''
-        now = _time_now(now)
-        if not self._last_ping or ((self._last_ping + _NODE_PING_SECONDS) < now):
-            self._last_ping = now
-            self._broadcast_message(_RemoteExecutionMessage(_TYPE_PING, self._node_id))
+        with self._lock:
+            node_load = self._node_loads.get(remote_node_id) or _RemoteExecutionNodeLoad()
+            return {
+                'in_flight': node_load.in_flight,
+                'commands': node_load.commands,
+                'ewma_latency': node_load.ewma_latency,
+                'connected': remote_node_id in self._command_connections,
+                }
 
-    def broadcast_open_connection(self, remote_node_id):
+    def select_node(self, policy=None, key=None, predicate=None):
         '''
-        Broadcast an "open_connection" message over the UDP socket to be handled by the specified remote node.
+        Select the best discovered remote node to run a command (or batch) on.
 
         Args:
-            remote_node_id (string): The ID of the remote node that we want to open a command connection with.
+            policy (string|RemoteExecutionNodePolicy): The node selection policy (one of the NODE_POLICY_ constants, or a policy instance), or None to use `node_policy`.
+            key (string): The key used by `NODE_POLICY_STICKY` (eg, the asset path or job ID), so related commands are sent to the same node.
+            predicate (callable): Called with each node dict (as returned by `remote_nodes`), returning True for a node that may be selected. None allows any node.
+
+        Returns:
+            string: The ID of the selected remote node, or None if no node is available.
         '''
-        self._broadcast_message(_RemoteExecutionMessage(_TYPE_OPEN_CONNECTION, self._node_id, remote_node_id, {
-            'command_ip': self._config.command_endpoint[0],
-            'command_port': self._config.command_endpoint[1],
-            }))
+        candidates = [node for node in self._remote_exec.node_snapshot if predicate is None or predicate(node)]
+        if not candidates:
+            return None
+        node = self._get_node_policy(policy or self.node_policy).select(candidates, self, key)
+        return node['node_id'] if node else None
 
-    def broadcast_close_connection(self, remote_node_id):
+    def close_command_connection(self, remote_node_id):
         '''
-        Broadcast a "close_connection" message over the UDP socket to be handled by the specified remote node.
+        Close the command connection to the given remote node, if one is open.
 
         Args:
-            remote_node_id (string): The ID of the remote node that we want to close a command connection with.
+            remote_node_id (string): The ID of the remote node.
         '''
-        self._broadcast_message(_RemoteExecutionMessage(_TYPE_CLOSE_CONNECTION, self._node_id, remote_node_id))
+        with self._lock:
+            command_connection = self._command_connections.pop(remote_node_id, None)
+        if command_connection:
+            with trace_span('close_command_connection', remote_node_id=remote_node_id):
+                self._close_connection(command_connection)
 
-    def _handle_data(self, data):
+    def close(self):
         '''
-        Handle data received from the UDP broadcast socket.
+        Close every command connection held by this session.
+        '''
+        with self._lock:
+            command_connections = list(self._command_connections.values())
+            self._command_connections.clear()
+        for command_connection in command_connections:
+            self._close_connection(command_connection)
 
-        Args:
-            data (bytes): The raw bytes received from the socket.
+    def _get_node_policy(self, policy):
         '''
-        message = _RemoteExecutionMessage(None, None)
-        if message.from_json_bytes(data):
-            self._handle_message(message)
+        Get the node selection policy instance for the given policy (policies with state, like round robin, keep it per session).
+        '''
+        if isinstance(policy, RemoteExecutionNodePolicy):
+            return policy
+        with self._lock:
+            node_policy = self._node_policies.get(policy)
+            if node_policy is None:
+                if policy not in _NODE_POLICY_TYPES:
+                    raise ValueError('Unknown node selection policy "{0}"!'.format(policy))
+                node_policy = self._node_policies[policy] = _NODE_POLICY_TYPES[policy]()
+            return node_policy
 
-    def _handle_message(self, message):
+    def _get_node_project(self, remote_node_id):
         '''
-        Handle a message received from the UDP broadcast socket.
+        Get the project root of the given remote node, so results can be shared and invalidated per project.
+        '''
+        node = self._remote_exec.node_snapshot.get(remote_node_id)
+        return node.get('project_root', '') if node else ''
 
-        Args:
-            message (_RemoteExecutionMessage): The message received from the socket.
+    def _get_node_lock(self, remote_node_id):
         '''
-        if not message.passes_receive_filter(self._node_id):
-            return
-        if message.type_ == _TYPE_PONG:
-            self._handle_pong_message(message)
-            return
-        _logger.debug('Unhandled remote execution message type "{0}"'.format(message.type_))
+        Get the lock serializing commands sent to the given remote node (a command connection only handles one command at a time).
+        '''
+        with self._lock:
+            return self._node_locks.setdefault(remote_node_id, _threading.Lock())
 
-    def _handle_pong_message(self, message):
+    def _run_node_command(self, remote_node_id, command, unattended, exec_mode):
         '''
-        Handle a "pong" message received from the UDP broadcast socket.
+        Run a command on a single remote node as part of a fan-out, capturing any failure in the result.
+        '''
+        start = _time.perf_counter()
+        try:
+            data = self.run_command(remote_node_id, command, unattended, exec_mode)
+            return RemoteExecutionNodeResult(remote_node_id, data=data, latency=_time.perf_counter() - start)
+        except Exception as e:
+            _logger.debug('Command failed on {0}: {1}'.format(remote_node_id, e))
+            return RemoteExecutionNodeResult(remote_node_id, error=e, latency=_time.perf_counter() - start)
+
+    def _get_command_connection(self, remote_node_id):
+        '''
+        Get the open command connection to the given remote node, opening a new one if there is none or the existing one has failed.
+        '''
+        with self._lock:
+            command_connection = self._command_connections.get(remote_node_id)
+            if command_connection and command_connection.is_alive():
+                self.connections_reused += 1
+                return command_connection
+            if command_connection:
+                _logger.debug('Command connection to {0} was lost, reconnecting'.format(remote_node_id))
+                del self._command_connections[remote_node_id]
+                self._close_connection(command_connection)
+                self.reconnects += 1
+        command_connection = _RemoteExecutionCommandConnection(self._remote_exec._config, self._remote_exec._node_id, remote_node_id)
+        # Each handshake needs a command port to itself, so limit how many run at once if the ports aren't ephemeral
+        with self._handshake_semaphore or _contextlib.nullcontext(), trace_span('open_command_connection', remote_node_id=remote_node_id):
+            try:
+                command_connection.open(self._remote_exec._broadcast_connection)
+            except Exception:
+                self._close_connection(command_connection)
+                raise
+        with self._lock:
+            self._command_connections[remote_node_id] = command_connection
+            self.connections_opened += 1
+            self.handshake_latencies[remote_node_id] = command_connection.handshake_latency
+        self._remote_exec.metrics.record(remote_node_id, 'handshake_seconds', command_connection.handshake_latency)
+        return command_connection
 
-        Args:
-            message (_RemoteExecutionMessage): The message received from the socket.
+    def _close_connection(self, command_connection):
         '''
-        self._nodes.update_remote_node(message.source, message.data)
+        Close a command connection, notifying the remote party if the broadcast connection is still open.
+        '''
+        try:
+            command_connection.close(self._remote_exec._broadcast_connection)
+        except (AttributeError, _socket.error):
+            command_connection.close(None)
 
-class _RemoteExecutionCommandConnection(object):
+class RemoteExecutionCommandStream(object):
     '''
-    A remote execution command connection (for TCP based command processing).
+    A remote command whose output is streamed back over a side channel as it happens (see `RemoteExecutionSession.stream_command`).
+    Iterating the stream yields each output entry (a dict with "type" and "output", like the entries of `command_result`) until the command finishes.
+    Only `max_buffered_lines` entries are held at once: the remote command waits while the buffer is full, so memory use stays flat on huge logs.
 
     Args:
         config (RemoteExecutionConfig): Configuration controlling the connection settings.
-        node_id (string): The ID of the local "node" (this session).
-        remote_node_id (string): The ID of the remote "node" (the UE4 instance running Python).
+        callback (callable): Called with each output entry as it arrives (instead of buffering it for iteration), or None.
+        max_buffered_lines (int): The maximum number of output entries waiting to be read.
     '''
-    def __init__(self, config, node_id, remote_node_id):
+    _COMMAND_TEMPLATE = '''\
+import builtins as _stream_builtins, json as _stream_json, socket as _stream_socket, sys as _stream_sys
+def _run_streamed(_command, _endpoint, _namespace):
+    _stream = None
+    def _stop_streaming():
+        nonlocal _stream
+        if _stream is not None:
+            _stream.close()
+            _stream = None
+    def _send(_type, _text):
+        if _stream is None:
+            return
+        try:
+            _stream.sendall((_stream_json.dumps({'type': _type, 'output': _text}) + '\\n').encode('utf-8'))
+        except OSError:
+            # The client stopped reading (eg, the stream was closed), so the command carries on with only its original output
+            _stop_streaming()
+    class _StreamWriter(object):
+        def __init__(self, _type, _target):
+            self._type = _type
+            self._target = _target
+            self._pending = ''
+        def __getattr__(self, _name):
+            return getattr(self._target, _name)
+        def write(self, _text):
+            self._target.write(_text)
+            return self.stream(_text)
+        def stream(self, _text):
+            _lines = (self._pending + _text).split('\\n')
+            self._pending = _lines.pop()
+            for _line in _lines:
+                _send(self._type, _line)
+            return len(_text)
+        def flush(self):
+            self._target.flush()
+            if self._pending:
+                _send(self._type, self._pending)
+                self._pending = ''
+    _std_streams = (_stream_sys.stdout, _stream_sys.stderr)
+    _writers = tuple(_StreamWriter(_type, _target) for _type, _target in zip(('Info', 'Error'), _std_streams))
+    _had_print, _print = 'print' in _namespace, _namespace.get('print')
+    _unreal = _stream_sys.modules.get('unreal')
+    _logs = {}
+    try:
+        try:
+            _stream = _stream_socket.create_connection(_endpoint)
+        except OSError:
+            pass # The client has stopped listening, but the command is still run
+        # Output still goes wherever it went before (the editor log and the command result), and is also sent over the stream
+        _stream_sys.stdout, _stream_sys.stderr = _writers
+        if _had_print and _print is not _stream_builtins.print:
+            def _tee_print(*_args, **_kwargs):
+                _print(*_args, **_kwargs)
+                if _kwargs.get('file') is None:
+                    _sep, _end = _kwargs.get('sep'), _kwargs.get('end')
+                    _writers[0].stream((' ' if _sep is None else _sep).join(str(_arg) for _arg in _args) + ('\\n' if _end is None else _end))
+            _namespace['print'] = _tee_print
+        if _unreal is not None:
+            for _name, _type in (('log', 'Info'), ('log_warning', 'Warning'), ('log_error', 'Error')):
+                _logs[_name] = getattr(_unreal, _name)
+                def _tee_log(_arg, _log=_logs[_name], _type=_type):
+                    _log(_arg)
+                    _send(_type, str(_arg))
+                setattr(_unreal, _name, _tee_log)
+        exec(compile(_command, '<streamed command>', 'exec'), _namespace)
+    finally:
+        _stream_sys.stdout, _stream_sys.stderr = _std_streams
+        if _had_print:
+            _namespace['print'] = _print
+        for _name, _log in _logs.items():
+            setattr(_unreal, _name, _log)
+        try:
+            for _writer in _writers:
+                _writer.flush()
+        finally:
+            _stop_streaming()
+_run_streamed(%(command)s, %(endpoint)s, globals())
+'''
+    _END = object()
+
+    def __init__(self, config, callback=None, max_buffered_lines=DEFAULT_STREAM_BUFFERED_LINES):
         self._config = config
-        self._node_id = node_id
-        self._remote_node_id = remote_node_id
-        self._command_listen_socket = None
-        self._command_channel_socket = _socket.socket() # This type is only here to appease PyLint
+        self._callback = callback
+        self._entries = _queue.Queue(max(1, max_buffered_lines))
+        self._listen_socket = _socket.socket(_socket.AF_INET, _socket.SOCK_STREAM, _socket.IPPROTO_TCP)
+        self._listen_socket.bind((config.command_endpoint[0], 0))
+        self._listen_socket.listen(1)
+        self._endpoint = self._listen_socket.getsockname()
+        self._stream_socket = None
+        self._closed = False
+        self._future = None
+        self._read_thread = None
+        self.lines_received = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        '''
+        Yield each output entry as it arrives, until the command has finished (and all of its output has been read).
+        '''
+        while True:
+            entry = self._entries.get()
+            if entry is self._END:
+                self._entries.put(self._END) # Let any later iteration finish straight away too
+                return
+            yield entry
+
+    @property
+    def endpoint(self):
+        '''
+        Get the endpoint that the remote command connects back to, to stream its output.
+
+        Returns:
+            tuple: The (ip, port) endpoint tuple.
+        '''
+        return self._endpoint
+
+    def wrap_command(self, command):
+        '''
+        Wrap a command so it streams its output back over this side channel while it runs.
+
+        Args:
+            command (string): The Python command to run remotely.
+
+        Returns:
+            string: The command to run remotely in `MODE_EXEC_FILE`.
+        '''
+        return self._COMMAND_TEMPLATE % {
+            'command': repr(command),
+            'endpoint': repr(tuple(self._endpoint)),
+            }
+
+    def start(self, run_command):
+        '''
+        Start running the command, and reading its streamed output.
+
+        Args:
+            run_command (callable): Runs the wrapped command remotely, returning its result (see `command_result` from the protocol definition).
+        '''
+        self._future = _futures.Future()
+        self._read_thread = _threading.Thread(target=self._run_read_thread)
+        self._read_thread.daemon = True
+        self._read_thread.start()
+        command_thread = _threading.Thread(target=self._run_command_thread, args=(run_command,))
+        command_thread.daemon = True
+        command_thread.start()
+
+    def result(self, timeout=None):
+        '''
+        Wait for the command to finish, discarding any output that hasn't been read.
+
+        Args:
+            timeout (float): The number of seconds to wait, or None to wait forever.
+
+        Returns:
+            dict: The result from running the remote command (see `command_result` from the protocol definition).
+            Its output also contains everything that was streamed, as the remote command's output still goes to the editor.
+        '''
+        for _entry in self:
+            pass
+        return self._future.result(timeout)
+
+    def close(self):
+        '''
+        Stop reading the streamed output. The remote command keeps running, but any further output it streams is discarded.
+        '''
+        self._closed = True
+        self._listen_socket.close()
+        if self._stream_socket:
+            try:
+                self._stream_socket.shutdown(_socket.SHUT_RDWR)
+            except _socket.error:
+                pass
+        self._discard_entries()
+
+    def _run_command_thread(self, run_command):
+        '''
+        Run the command, storing its result (or failure).
+        '''
+        try:
+            self._future.set_result(run_command())
+        except BaseException as e:
+            self._future.set_exception(e)
+
+    def _accept_stream(self):
+        '''
+        Wait to accept the side channel connection from the remote command.
+
+        Returns:
+            socket: The accepted connection, or None if the command finished (or failed) without connecting.
+        '''
+        deadline = _time.perf_counter() + self._config.command_connect_timeout
+        while not self._closed:
+            # A command that has finished has already connected (if it was going to), so only check for the connection once more
+            command_done = self._future.done()
+            if _select.select([self._listen_socket], [], [], 0 if command_done else 0.1)[0]:
+                return self._listen_socket.accept()[0]
+            if command_done or _time.perf_counter() > deadline:
+                return None
+        return None
+
+    def _run_read_thread(self):
+        '''
+        Main loop for the thread that accepts the side channel connection, and reads the output entries from it.
+        '''
+        try:
+            try:
+                self._stream_socket = self._accept_stream()
+            finally:
+                self._listen_socket.close()
+            if not self._stream_socket:
+                return
+            self._stream_socket.settimeout(None)
+            with self._stream_socket.makefile('rb') as stream_file:
+                for line in stream_file:
+                    if self._closed:
+                        break
+                    try:
+                        entry = _codec.loads(line)
+                    except Exception as e:
+                        _logger.error('Failed to decode streamed output: {0}'.format(e))
+                        continue
+                    self.lines_received += 1
+                    if self._callback:
+                        try:
+                            self._callback(entry)
+                        except Exception as e:
+                            _logger.error('Streamed output callback failed: {0}'.format(e))
+                    else:
+                        self._put(entry)
+        except (_socket.error, OSError, ValueError):
+            pass
+        finally:
+            if self._stream_socket:
+                self._stream_socket.close()
+            # The result is only ready after the command finishes, which also closes the stream, so wait for it before ending the iteration
+            _futures.wait([self._future])
+            self._put(self._END)
+
+    def _put(self, entry):
+        '''
+        Add an entry to the buffer, waiting for space unless the stream has been closed (when only the end of the stream is kept).
+        '''
+        while True:
+            try:
+                self._entries.put(entry, timeout=0.1)
+                return
+            except _queue.Full:
+                if self._closed:
+                    if entry is not self._END:
+                        return
+                    self._discard_entries()
+
+    def _discard_entries(self):
+        '''
+        Discard every buffered entry, unblocking the read thread if it's waiting for buffer space.
+        '''
+        try:
+            while True:
+                self._entries.get_nowait()
+        except _queue.Empty:
+            pass
+
+class _RemoteExecutionNodeLoad(object):
+    '''
+    The live load statistics of a remote "node" (UE4 instance running Python), as tracked by a `RemoteExecutionSession`.
+    '''
+    def __init__(self):
+        self.in_flight = 0
+        self.commands = 0
+        self.ewma_latency = None
+
+    def record_latency(self, latency):
+        '''
+        Record the latency of a completed command in the moving average.
+
+        Args:
+            latency (float): The number of seconds the command took.
+        '''
+        self.commands += 1
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += DEFAULT_NODE_LATENCY_EWMA_ALPHA * (latency - self.ewma_latency)
+
+class RemoteExecutionNodePolicy(_abc.ABC):
+    '''
+    The base class of the policies that select which remote "node" (UE4 instance running Python) a command is sent to (see `RemoteExecutionSession.select_node`).
+    Subclasses must implement `select`.
+    '''
+    @_abc.abstractmethod
+    def select(self, candidates, session, key=None):
+        '''
+        Select a node from the given candidates.
+
+        Args:
+            candidates (list): The node dicts that may be selected (never empty), in discovery order.
+            session (RemoteExecutionSession): The session whose live load statistics (see `node_load`) should drive the selection.
+            key (string): The key of the command, for policies that use one (may be None).
+
+        Returns:
+            dict: The selected node dict.
+        '''
+
+class LeastInFlightNodePolicy(RemoteExecutionNodePolicy):
+    '''
+    Select the node with the fewest commands running or queued, breaking ties by preferring a node that already has a command connection, then the lower average latency.
+    '''
+    def select(self, candidates, session, key=None):
+        def _cost(node):
+            node_load = session.node_load(node['node_id'])
+            return (node_load['in_flight'], not node_load['connected'], node_load['ewma_latency'] or 0.0)
+        return min(candidates, key=_cost)
+
+class EwmaLatencyNodePolicy(RemoteExecutionNodePolicy):
+    '''
+    Select the node expected to finish a new command soonest: its moving average latency multiplied by the commands it would then be running.
+    A node without a completed command yet is expected to be instant, so every node is tried.
+    '''
+    def select(self, candidates, session, key=None):
+        def _cost(node):
+            node_load = session.node_load(node['node_id'])
+            return ((node_load['ewma_latency'] or 0.0) * (node_load['in_flight'] + 1), node_load['in_flight'])
+        return min(candidates, key=_cost)
+
+class RoundRobinNodePolicy(RemoteExecutionNodePolicy):
+    '''
+    Select each node in turn (ordered by node ID, so the order doesn't depend on discovery).
+    '''
+    def __init__(self):
+        self._counter = _itertools.count()
+
+    def select(self, candidates, session, key=None):
+        candidates = sorted(candidates, key=lambda node: node['node_id'])
+        return candidates[next(self._counter) % len(candidates)]
+
+class StickyNodePolicy(RemoteExecutionNodePolicy):
+    '''
+    Select the same node for the same key, using rendezvous hashing so that only the keys of a lost node move when the set of nodes changes.
+    Commands without a key are sent to the least loaded node instead (see `LeastInFlightNodePolicy`).
+    '''
+    def __init__(self):
+        self._fallback_policy = LeastInFlightNodePolicy()
+
+    def select(self, candidates, session, key=None):
+        if key is None:
+            return self._fallback_policy.select(candidates, session)
+        return max(candidates, key=lambda node: _hashlib.md5('{0}:{1}'.format(key, node['node_id']).encode('utf-8')).digest())
+
+class RemoteExecutionNodeResult(object):
+    '''
+    The result of running a command on one remote "node" (UE4 instance running Python) as part of a fan-out.
+
+    Args:
+        node_id (string): The ID of the remote node the command was run on.
+        data (dict): The result from running the remote command (see `command_result` from the protocol definition), or None if it failed to run.
+        error (Exception): The error that prevented the command from running, or None if it ran.
+        latency (float): The number of seconds taken to run the command (including opening a command connection, if needed).
+    '''
+    def __init__(self, node_id, data=None, error=None, latency=0.0):
+        self.node_id = node_id
+        self.data = data
+        self.error = error
+        self.latency = latency
+
+    @property
+    def success(self):
+        '''
+        Check whether the command was run and succeeded on the remote node.
+
+        Returns:
+            bool: True if the command ran without an error, False otherwise.
+        '''
+        return self.error is None and bool(self.data and self.data.get('success'))
+
+    def __repr__(self):
+        return 'RemoteExecutionNodeResult(node_id={0!r}, success={1}, error={2!r}, latency={3:.3f})'.format(self.node_id, self.success, self.error, self.latency)
+
+class RemoteExecutionHistogram(object):
+    '''
+    A histogram of recorded values with bounded relative error (in the style of an HDR histogram), so quantiles can be reported without keeping every value.
+    Values are recorded as integer units, into log-linear buckets: each power of two is split into `2 ** sub_bucket_bits` linear buckets.
+
+    Args:
+        unit (float): The size of the smallest distinguishable value (eg, 1e-6 to record seconds at microsecond resolution).
+        sub_bucket_bits (int): The number of bits of precision kept for each value (5 bits keeps the relative error of the reported quantiles under ~3%).
+    '''
+    def __init__(self, unit=1e-6, sub_bucket_bits=5):
+        self._unit = unit
+        self._sub_bucket_bits = sub_bucket_bits
+        self._buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        '''
+        Record a value.
+
+        Args:
+            value (float): The value to record (negative values are recorded as 0).
+        '''
+        value = max(value, 0.0)
+        index = self._bucket_index(int(value / self._unit))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        '''
+        Get the mean of the recorded values.
+
+        Returns:
+            float: The mean value, or 0 if nothing has been recorded.
+        '''
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        '''
+        Get the value at the given quantile of the recorded values.
+
+        Args:
+            q (float): The quantile to get (0-1).
+
+        Returns:
+            float: The highest value equivalent to the value at the quantile (clamped to the recorded range), or 0 if nothing has been recorded.
+        '''
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(q * self.count)))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(max(self._bucket_upper_value(index) * self._unit, self.min), self.max)
+        return self.max
+
+    def merge(self, other):
+        '''
+        Add the values recorded by another histogram (with the same unit and precision) to this histogram.
+
+        Args:
+            other (RemoteExecutionHistogram): The histogram to merge.
+        '''
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        if other.count:
+            self.count += other.count
+            self.total += other.total
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def summary(self, quantiles=DEFAULT_METRICS_QUANTILES):
+        '''
+        Summarize the recorded values.
+
+        Args:
+            quantiles (tuple): The quantiles to include.
+
+        Returns:
+            dict: The count, sum, mean, min and max of the recorded values, and a "p<N>" entry for each quantile (eg, "p99").
+        '''
+        summary = {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.mean,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            }
+        for q in quantiles:
+            summary['p{0:g}'.format(q * 100)] = self.quantile(q)
+        return summary
+
+    def _bucket_index(self, units):
+        '''
+        Get the index of the bucket that a value (in integer units) is recorded in.
+        '''
+        shift = max(units.bit_length() - self._sub_bucket_bits - 1, 0)
+        return (shift << (self._sub_bucket_bits + 1)) + (units >> shift)
+
+    def _bucket_upper_value(self, index):
+        '''
+        Get the highest value (in integer units) recorded in the given bucket.
+        '''
+        shift = index >> (self._sub_bucket_bits + 1)
+        return (((index & ((2 << self._sub_bucket_bits) - 1)) + 1) << shift) - 1
+
+class RemoteExecutionMetrics(object):
+    '''
+    An in-process registry of the timings and counts of remote commands, kept per remote "node" (UE4 instance running Python).
+    Timings (eg, "total_seconds") are kept in a `RemoteExecutionHistogram` and counts (eg, "bytes_in") are kept as running totals.
+
+    Args:
+        quantiles (tuple): The quantiles reported for each timing.
+    '''
+    _TIMINGS = ('encode_seconds', 'send_seconds', 'first_byte_seconds', 'receive_seconds', 'decode_seconds', 'total_seconds')
+    _COUNTS = ('bytes_out', 'bytes_in')
+
+    def __init__(self, quantiles=DEFAULT_METRICS_QUANTILES):
+        self.quantiles = quantiles
+        self._lock = _threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def record(self, remote_node_id, name, value):
+        '''
+        Record a timing (or any other value that should be summarized by a histogram).
+
+        Args:
+            remote_node_id (string): The ID of the remote node the value belongs to.
+            name (string): The name of the timing (eg, "handshake_seconds").
+            value (float): The value to record.
+        '''
+        if value is None:
+            return
+        with self._lock:
+            histograms = self._histograms.setdefault(remote_node_id, {})
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = RemoteExecutionHistogram()
+            histogram.record(value)
+
+    def increment(self, remote_node_id, name, amount=1):
+        '''
+        Add to a count.
+
+        Args:
+            remote_node_id (string): The ID of the remote node the count belongs to.
+            name (string): The name of the count (eg, "failures").
+            amount (int): The amount to add.
+        '''
+        with self._lock:
+            counters = self._counters.setdefault(remote_node_id, {})
+            counters[name] = counters.get(name, 0) + amount
+
+    def run_command(self, command_connection, command, unattended, exec_mode):
+        '''
+        Run a command on a command connection, recording its timings and counts.
+        A command that fails on the remote party counts as a "failure", and one that fails to complete the round trip counts as an "error".
+
+        Args:
+            command_connection (_RemoteExecutionCommandConnection): The open command connection to run the command on.
+            command (string): The Python command to run remotely.
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+
+        Returns:
+            dict: The result from running the remote command (see `command_result` from the protocol definition).
+        '''
+        remote_node_id = command_connection.remote_node_id
+        try:
+            data = command_connection.run_command(command, unattended, exec_mode)
+        except Exception:
+            self.increment(remote_node_id, 'errors')
+            raise
+        timings = command_connection.last_command_timings
+        with self._lock:
+            histograms = self._histograms.setdefault(remote_node_id, {})
+            for name in self._TIMINGS:
+                if name in timings:
+                    histogram = histograms.get(name)
+                    if histogram is None:
+                        histogram = histograms[name] = RemoteExecutionHistogram()
+                    histogram.record(timings[name])
+            counters = self._counters.setdefault(remote_node_id, {})
+            for name in self._COUNTS:
+                counters[name] = counters.get(name, 0) + timings.get(name, 0)
+            counters['messages_out'] = counters.get('messages_out', 0) + 1
+            counters['messages_in'] = counters.get('messages_in', 0) + 1
+            if not data.get('success'):
+                counters['failures'] = counters.get('failures', 0) + 1
+        return data
+
+    def reset(self):
+        '''
+        Forget everything that has been recorded.
+        '''
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def stats(self):
+        '''
+        Get a summary of everything that has been recorded.
+
+        Returns:
+            dict: For each remote node ID, a dict with "timings" (a `RemoteExecutionHistogram.summary` per timing) and "counts" (the total per count).
+            The "*" entry combines every remote node.
+        '''
+        with self._lock:
+            node_ids = sorted(set(self._histograms) | set(self._counters))
+            stats = {}
+            all_histograms = {}
+            all_counters = {}
+            for node_id in node_ids:
+                histograms = self._histograms.get(node_id, {})
+                counters = dict(self._counters.get(node_id, {}))
+                stats[node_id] = {
+                    'timings': {name: histogram.summary(self.quantiles) for name, histogram in histograms.items()},
+                    'counts': counters,
+                    }
+                for name, histogram in histograms.items():
+                    all_histograms.setdefault(name, RemoteExecutionHistogram()).merge(histogram)
+                for name, count in counters.items():
+                    all_counters[name] = all_counters.get(name, 0) + count
+            if node_ids:
+                stats['*'] = {
+                    'timings': {name: histogram.summary(self.quantiles) for name, histogram in all_histograms.items()},
+                    'counts': all_counters,
+                    }
+            return stats
+
+    def to_prometheus(self, prefix='ue_remote_execution'):
+        '''
+        Format the recorded metrics in the Prometheus text exposition format (timings as summaries, counts as counters).
+
+        Args:
+            prefix (string): The prefix of every metric name.
+
+        Returns:
+            str: The formatted metrics.
+        '''
+        stats = self.stats()
+        stats.pop('*', None)
+        lines = []
+        for kind in ('timings', 'counts'):
+            names = sorted(set(name for node_stats in stats.values() for name in node_stats[kind]))
+            for name in names:
+                metric = '{0}_{1}'.format(prefix, name) if kind == 'timings' else '{0}_{1}_total'.format(prefix, name)
+                lines.append('# TYPE {0} {1}'.format(metric, 'summary' if kind == 'timings' else 'counter'))
+                for node_id, node_stats in stats.items():
+                    if name not in node_stats[kind]:
+                        continue
+                    labels = 'node_id="{0}"'.format(_prometheus_label(node_id))
+                    if kind == 'counts':
+                        lines.append('{0}{{{1}}} {2}'.format(metric, labels, node_stats[kind][name]))
+                        continue
+                    summary = node_stats[kind][name]
+                    for q in self.quantiles:
+                        lines.append('{0}{{{1},quantile="{2:g}"}} {3!r}'.format(metric, labels, q, summary['p{0:g}'.format(q * 100)]))
+                    lines.append('{0}_sum{{{1}}} {2!r}'.format(metric, labels, summary['sum']))
+                    lines.append('{0}_count{{{1}}} {2}'.format(metric, labels, summary['count']))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def to_json_lines(self):
+        '''
+        Format the recorded metrics as JSON lines, with one line per remote node (including the "*" entry that combines every node).
+
+        Returns:
+            str: The formatted metrics.
+        '''
+        timestamp = _time.time()
+        return ''.join(_json.dumps({'timestamp': timestamp, 'node_id': node_id, 'timings': node_stats['timings'], 'counts': node_stats['counts']}) + '\n' for node_id, node_stats in self.stats().items())
+
+    def dump(self, path, format='prometheus'):
+        '''
+        Write the recorded metrics to a file. Prometheus text replaces the file, while JSON lines are appended to it (so it keeps a history).
+
+        Args:
+            path (string): The path of the file to write.
+            format (string): Either "prometheus" or "jsonl".
+        '''
+        if format == 'prometheus':
+            with open(path, 'w') as f:
+                f.write(self.to_prometheus())
+        elif format == 'jsonl':
+            with open(path, 'a') as f:
+                f.write(self.to_json_lines())
+        else:
+            raise ValueError('Unknown metrics format "{0}"!'.format(format))
+
+class _RemoteExecutionCachedResult(object):
+    '''
+    A command result held by the result cache.
+    '''
+    __slots__ = ('data', 'project', 'paths', 'expire_time')
+
+    def __init__(self, data, project, paths, expire_time):
+        self.data = data
+        self.project = project
+        self.paths = paths
+        self.expire_time = expire_time
+
+class RemoteExecutionResultCache(object):
+    '''
+    A client-side cache of the results of read-only remote commands, keyed by remote node, project, and normalized command.
+    Results are evicted once they expire, or when the cache is full (least recently used first), and are dropped when a write invalidates one of the paths they depend on.
+
+    Args:
+        max_entries (int): The maximum number of results to keep.
+        ttl (float): The default number of seconds to keep each result for.
+    '''
+    def __init__(self, max_entries=DEFAULT_RESULT_CACHE_MAX_ENTRIES, ttl=DEFAULT_RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = _threading.Lock()
+        self._entries = _collections.OrderedDict()
+        self._reset_counters()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def normalize_command(command):
+        '''
+        Normalize a command, so that commands which only differ by line endings or by whitespace around the whole command share a cache entry.
+        Whitespace inside the command is kept, as it may be part of a string literal.
+
+        Args:
+            command (string|tuple): The Python command (or a tuple of it and anything else that affects its result, like the execution mode).
+
+        Returns:
+            string|tuple: The normalized command.
+        '''
+        if isinstance(command, tuple):
+            return tuple(RemoteExecutionResultCache.normalize_command(part) for part in command)
+        if not isinstance(command, str):
+            return command
+        return command.strip().replace('\r\n', '\n').replace('\r', '\n') # Python source treats every line ending as "\n", even inside string literals
+
+    @staticmethod
+    def normalize_path(path):
+        '''
+        Normalize an asset or directory path, so that "/Game/Props/", "/Game/Props/Chair.Chair" and "/Game/Props/Chair" match the same asset or directory.
+
+        Args:
+            path (string): The asset or directory path.
+
+        Returns:
+            string: The normalized path (with no trailing slash or object name).
+        '''
+        path = path.replace('\\', '/').rstrip('/')
+        head, sep, name = path.rpartition('/')
+        return head + sep + name.split('.', 1)[0]
+
+    def get(self, remote_node_id, project, command, now=None):
+        '''
+        Get the cached result of a command, if it hasn't expired.
+
+        Args:
+            remote_node_id (string): The ID of the remote node that the command would run on.
+            project (string): The project that the remote node has open.
+            command (string|tuple): The Python command (see `normalize_command`).
+            now (float): The current timestamp.
+
+        Returns:
+            dict: A copy of the cached result, or None if there isn't one.
+        '''
+        key = (remote_node_id, project, self.normalize_command(command))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expire_time <= _time_now(now):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _copy.deepcopy(entry.data)
+
+    def put(self, remote_node_id, project, command, data, paths=None, ttl=None, now=None):
+        '''
+        Cache the result of a command.
+
+        Args:
+            remote_node_id (string): The ID of the remote node that the command was run on.
+            project (string): The project that the remote node has open.
+            command (string|tuple): The Python command (see `normalize_command`).
+            data (dict): The result from running the command.
+            paths (list): The asset or directory paths the result depends on, or None if it may depend on anything.
+            ttl (float): The number of seconds to keep the result for, or None to use `ttl`.
+            now (float): The current timestamp.
+        '''
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        key = (remote_node_id, project, self.normalize_command(command))
+        paths = None if paths is None else tuple(self.normalize_path(path) for path in paths)
+        entry = _RemoteExecutionCachedResult(_copy.deepcopy(data), project, paths, _time_now(now) + ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, paths=None, project=None):
+        '''
+        Drop the cached results that depend on any of the given paths.
+        A path invalidates results for itself, for anything below it (as a directory), and for anything above it (eg, listings of its directory).
+
+        Args:
+            paths (list): The asset or directory paths that were changed, or None to drop every result.
+            project (string): The project that was changed, or None to drop results from every project.
+
+        Returns:
+            int: The number of results that were dropped.
+        '''
+        paths = None if paths is None else [self.normalize_path(path) for path in paths]
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if (project is None or entry.project == project) and self._depends_on(entry, paths)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        '''
+        Drop every cached result, and reset the hit and miss counters.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self._reset_counters()
+
+    def stats(self):
+        '''
+        Get the hit and miss counters of this cache.
+
+        Returns:
+            dict: The number of hits and misses, the hit rate (0-1), the number of results that expired, were evicted, or were invalidated, and the number of results currently cached.
+        '''
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                }
+
+    def _reset_counters(self):
+        '''
+        Reset the hit and miss counters.
+        '''
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _depends_on(entry, paths):
+        '''
+        Check whether a cached result depends on any of the given (normalized) paths.
+        '''
+        if paths is None or entry.paths is None:
+            return True
+        for path in paths:
+            for entry_path in entry.paths:
+                if entry_path == path or entry_path.startswith(path + '/') or path.startswith(entry_path + '/'):
+                    return True
+        return False
+
+class RemoteExecutionSpan(object):
+    '''
+    A timed operation (eg, running a remote command), as reported to the trace hooks (see `add_trace_hook` and `trace_span`).
+
+    Args:
+        name (string): The name of the operation.
+        parent_id (int): The ID of the span this span was started within, or None if it is a root span.
+        tags (dict): Details of the operation (eg, the remote node ID, or the source of the command).
+    '''
+    def __init__(self, name, parent_id=None, tags=None):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.tags = tags if tags is not None else {}
+        self.error = None
+        self.thread_id = _threading.get_ident()
+        self.start_time = _time.perf_counter()
+        self.end_time = None
+
+    @property
+    def duration(self):
+        '''
+        Get how long the operation took.
+
+        Returns:
+            float: The duration in seconds, or None if the span hasn't finished.
+        '''
+        return None if self.end_time is None else self.end_time - self.start_time
+
+    def set_tag(self, key, value):
+        '''
+        Add (or replace) a detail of the operation.
+
+        Args:
+            key (string): The name of the tag.
+            value (object): The value of the tag (should be JSON serializable).
+        '''
+        self.tags[key] = value
+
+    def set_command_tags(self, command, data, timings):
+        '''
+        Tag this span with the details of a command that was run.
+
+        Args:
+            command (string): The Python command that was run, or None to leave it out.
+            data (dict): The result from running the remote command (see `command_result` from the protocol definition).
+            timings (dict): The timings of the command (see `_RemoteExecutionCommandConnection.last_command_timings`).
+        '''
+        if command is not None:
+            self.tags['command'] = command[:_TRACE_COMMAND_PREVIEW_LENGTH]
+        self.tags['success'] = bool(data.get('success'))
+        self.tags.update(timings)
+
+    def __repr__(self):
+        return 'RemoteExecutionSpan(name={0!r}, span_id={1}, parent_id={2}, duration={3})'.format(self.name, self.span_id, self.parent_id, self.duration)
+
+class _RemoteExecutionNullSpan(object):
+    '''
+    The span used when there are no trace hooks, which ignores any tags set on it.
+    '''
+    def set_tag(self, key, value):
+        pass
+
+    def set_command_tags(self, command, data, timings):
+        pass
+
+class RemoteExecutionTraceHook(object):
+    '''
+    The base class of the hooks that are notified of every span and event (see `add_trace_hook`). Every method does nothing by default.
+    Hooks are called on the thread that ran the operation, so should be quick and thread-safe.
+    '''
+    def span_started(self, span):
+        '''
+        Called when a span is started.
+
+        Args:
+            span (RemoteExecutionSpan): The span that was started.
+        '''
+        pass
+
+    def span_finished(self, span):
+        '''
+        Called when a span is finished.
+
+        Args:
+            span (RemoteExecutionSpan): The span that was finished.
+        '''
+        pass
+
+    def event(self, name, timestamp, parent_id, tags):
+        '''
+        Called when something happens at a single point in time (eg, a remote node was discovered).
+
+        Args:
+            name (string): The name of the event.
+            timestamp (float): When the event happened (on the same clock as the span times).
+            parent_id (int): The ID of the span the event happened within, or None.
+            tags (dict): Details of the event.
+        '''
+        pass
+
+class RemoteExecutionTraceRecorder(RemoteExecutionTraceHook):
+    '''
+    A trace hook that keeps every finished span and event, so they can be exported as Chrome trace-event JSON (viewable in chrome://tracing or Perfetto).
+
+    Args:
+        max_records (int): The maximum number of spans and events to keep (the oldest are dropped first), or None to keep everything.
+    '''
+    def __init__(self, max_records=None):
+        self._lock = _threading.Lock()
+        self._max_records = max_records
+        self._records = []
+
+    def span_finished(self, span):
+        self._add_record(('X', span.name, span.start_time, span.duration, span.thread_id, span.span_id, span.parent_id, span.error, span.tags))
+
+    def event(self, name, timestamp, parent_id, tags):
+        self._add_record(('i', name, timestamp, None, _threading.get_ident(), None, parent_id, None, tags))
+
+    @property
+    def spans(self):
+        '''
+        Get the spans that have been recorded.
+
+        Returns:
+            list: A dict for each finished span, with its name, IDs, start time, duration, error and tags.
+        '''
+        with self._lock:
+            records = list(self._records)
+        return [{
+            'name': name,
+            'span_id': span_id,
+            'parent_id': parent_id,
+            'start_time': start_time,
+            'duration': duration,
+            'error': error,
+            'tags': tags,
+            } for phase, name, start_time, duration, _thread_id, span_id, parent_id, error, tags in records if phase == 'X']
+
+    def clear(self):
+        '''
+        Forget every recorded span and event.
+        '''
+        with self._lock:
+            del self._records[:]
+
+    def to_chrome_trace(self):
+        '''
+        Convert the recorded spans and events to Chrome trace-event format. Spans are complete ("X") events and events are instant ("i") events.
+
+        Returns:
+            dict: The trace, ready to be serialized as JSON.
+        '''
+        with self._lock:
+            records = list(self._records)
+        pid = _os.getpid()
+        trace_events = []
+        for phase, name, start_time, duration, thread_id, span_id, parent_id, error, tags in records:
+            args = dict(tags)
+            if span_id is not None:
+                args['span_id'] = span_id
+            if parent_id is not None:
+                args['parent_id'] = parent_id
+            if error is not None:
+                args['error'] = error
+            trace_event = {
+                'name': name,
+                'cat': 'remote_execution',
+                'ph': phase,
+                'ts': start_time * 1e6,
+                'pid': pid,
+                'tid': thread_id,
+                'args': args,
+                }
+            if phase == 'X':
+                trace_event['dur'] = duration * 1e6
+            else:
+                trace_event['s'] = 't'
+            trace_events.append(trace_event)
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path):
+        '''
+        Write the recorded spans and events to a Chrome trace-event JSON file.
+
+        Args:
+            path (string): The path of the file to write.
+        '''
+        with open(path, 'w') as f:
+            _json.dump(self.to_chrome_trace(), f, default=str)
+
+    def _add_record(self, record):
+        with self._lock:
+            self._records.append(record)
+            if self._max_records is not None and len(self._records) > self._max_records:
+                del self._records[:len(self._records) - self._max_records]
+
+class _RemoteExecutionNode(object):
+    '''
+    A discovered remote "node" (aka, a UE4 instance running Python).
+
+    Args:
+        data (dict): The data representing this node (from its "pong" reponse).
+        now (float): The timestamp at which this node was last seen.
+    '''
+    def __init__(self, data, now=None):
+        self.data = data
+        self.snapshot_dict = None
+        self._last_pong = _time_now(now)
+
+    def mark_seen(self, now=None):
+        '''
+        Record that this remote node has sent another "pong".
+
+        Args:
+            now (float): The timestamp at which this node was last seen.
+        '''
+        self._last_pong = _time_now(now)
+
+    def should_timeout(self, now=None):
+        '''
+        Check to see whether this remote node should be considered timed-out.
+
+        Args:
+            now (float): The current timestamp.
+
+        Returns:
+            bool: True of the node has exceeded the timeout limit (`_NODE_TIMEOUT_SECONDS`), False otherwise.
+        '''
+        return self.timeout_time() < _time_now(now)
+
+    def timeout_time(self):
+        '''
+        Get the time at which this remote node will be considered timed-out, unless it sends another "pong" before then.
+
+        Returns:
+            float: The timestamp at which the node will exceed the timeout limit (`_NODE_TIMEOUT_SECONDS`).
+        '''
+        return self._last_pong + _NODE_TIMEOUT_SECONDS
+
+class RemoteExecutionNodeSnapshot(object):
+    '''
+    An immutable snapshot of a set of remote "nodes" (UE4 instances running Python), indexed by node ID and by the `INDEXED_FIELDS` of their data.
+    Each node is a read-only dict containing the node ID and the other data (from its "pong" reponse), shared by every reader of the snapshot.
+
+    Args:
+        version (int): The version of the set of nodes this is a snapshot of.
+        nodes (dict): The read-only node dict for each node ID.
+    '''
+    INDEXED_FIELDS = ('project_name', 'machine', 'engine_version', 'user')
+
+    def __init__(self, version, nodes):
+        self.version = version
+        self._nodes = nodes
+        self.nodes = tuple(nodes.values())
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        for node in self.nodes:
+            for field, index in self._indexes.items():
+                value = node.get(field)
+                index[value] = index.get(value, ()) + (node,)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __contains__(self, node_id):
+        return node_id in self._nodes
+
+    def get(self, node_id):
+        '''
+        Get a node by its ID.
+
+        Args:
+            node_id (str): The ID of the remote node.
+
+        Returns:
+            dict: The read-only node dict, or None if the node isn't in this snapshot.
+        '''
+        return self._nodes.get(node_id)
+
+    def find(self, **criteria):
+        '''
+        Find the nodes whose data matches every given field value (eg, `find(project_name='MyGame', machine='BUILD01')`).
+        Indexed fields are looked up directly, and any other fields filter the (already narrowed) result.
+
+        Returns:
+            tuple: The matching read-only node dicts, in discovery order.
+        '''
+        matches = None
+        other_criteria = []
+        for field, value in criteria.items():
+            index = self._indexes.get(field)
+            if index is None:
+                other_criteria.append((field, value))
+                continue
+            indexed_matches = index.get(value, ())
+            if matches is None or len(indexed_matches) < len(matches):
+                matches, indexed_matches = indexed_matches, matches
+            if indexed_matches is not None:
+                indexed_ids = set(id(node) for node in indexed_matches)
+                matches = tuple(node for node in matches if id(node) in indexed_ids)
+        if matches is None:
+            matches = self.nodes
+        if other_criteria:
+            matches = tuple(node for node in matches if all(node.get(field) == value for field, value in other_criteria))
+        return matches
+
+    def values(self, field):
+        '''
+        Get the distinct values of an indexed field (eg, every project that has a running editor).
+
+        Args:
+            field (str): One of the `INDEXED_FIELDS`.
+
+        Returns:
+            list: The distinct values of the field.
+        '''
+        return list(self._indexes[field])
+
+    def __repr__(self):
+        return 'RemoteExecutionNodeSnapshot(version={0}, nodes={1})'.format(self.version, len(self.nodes))
+
+class _RemoteExecutionBroadcastNodes(object):
+    '''
+    A thread-safe set of remote execution "nodes" (UE4 instances running Python).
+    Readers get an immutable `RemoteExecutionNodeSnapshot` without taking the lock, which is only rebuilt when the set of nodes (or their data) changes.
+
+    Args:
+        node_added_callbacks (list): Callables to call with the node dict whenever a new node is added.
+        node_lost_callbacks (list): Callables to call with the node dict whenever a node is removed after timing-out.
+    '''
+    def __init__(self, node_added_callbacks=None, node_lost_callbacks=None):
+        self._remote_nodes = {}
+        self._remote_nodes_lock = _threading.RLock()
+        self._remote_nodes_changed = _threading.Condition(self._remote_nodes_lock)
+        self._snapshot = _EMPTY_NODE_SNAPSHOT
+        self._closed = False
+        self._node_added_callbacks = node_added_callbacks if node_added_callbacks is not None else []
+        self._node_lost_callbacks = node_lost_callbacks if node_lost_callbacks is not None else []
+
+    @property
+    def snapshot(self):
+        '''
+        Get an immutable snapshot of the current set of discovered remote "nodes" (UE4 instances running Python).
+
+        Returns:
+            RemoteExecutionNodeSnapshot: The current snapshot.
+        '''
+        return self._snapshot
+
+    @property
+    def remote_nodes(self):
+        '''
+        Get the current set of discovered remote "nodes" (UE4 instances running Python).
+
+        Returns:
+            list: A list of read-only dicts containg the node ID and the other data.
+        '''
+        return list(self._snapshot.nodes)
+
+    def wait_for_node(self, predicate=None, timeout=None):
+        '''
+        Wait until a remote node matching the given predicate is in this set, waking whenever the set changes.
+
+        Args:
+            predicate (callable): Called with each node dict (as returned by `remote_nodes`), returning True for a matching node. None matches any node.
+            timeout (float): The number of seconds to wait, or None to wait forever.
+
+        Returns:
+            dict: The first matching node (containing the node ID and the other data), or None if no matching node was found within the timeout (or this set was closed).
+        '''
+        def _find_node():
+            for remote_node in self._snapshot.nodes:
+                if predicate is None or predicate(remote_node):
+                    return remote_node
+            return None
+        with self._remote_nodes_changed:
+            remote_node = self._remote_nodes_changed.wait_for(lambda: self._closed or _find_node(), timeout)
+            return None if self._closed else remote_node
+
+    def close(self):
+        '''
+        Close this set, waking anything waiting on it (as no more nodes will be discovered).
+        '''
+        with self._remote_nodes_changed:
+            self._closed = True
+            self._remote_nodes_changed.notify_all()
+
+    def has_remote_node(self, node_id):
+        '''
+        Check whether the given remote node is in this set.
+
+        Args:
+            node_id (str): The ID of the remote node.
+
+        Returns:
+            bool: True if the node has been discovered and hasn't timed-out, False otherwise.
+        '''
+        return node_id in self._snapshot
+
+    def next_timeout_time(self):
+        '''
+        Get the earliest time at which a remote node in this set could be considered timed-out.
+
+        Returns:
+            float: The timestamp at which the next node will exceed the timeout limit, or None if this set is empty.
+        '''
+        with self._remote_nodes_lock:
+            return min([node.timeout_time() for node in self._remote_nodes.values()] or [None])
+
+    def update_remote_node(self, node_id, node_data, now=None):
+        '''
+        Update a remote node, replacing any existing data.
+
+        Args:
+            node_id (str): The ID of the remote node (from its "pong" reponse).
+            node_data (dict): The data representing this node (from its "pong" reponse).
+            now (float): The timestamp at which this node was last seen.
+        '''
+        now = _time_now(now)
+        with self._remote_nodes_lock:
+            existing_node = self._remote_nodes.get(node_id)
+            if existing_node and existing_node.data == node_data:
+                existing_node.mark_seen(now)
+                return
+            self._remote_nodes[node_id] = _RemoteExecutionNode(node_data, now)
+            self._update_snapshot()
+            self._remote_nodes_changed.notify_all()
+        if not existing_node:
+            _logger.debug('Found Node {0}: {1}'.format(node_id, node_data))
+            trace_event('node_added', remote_node_id=node_id)
+            self._call_node_callbacks(self._node_added_callbacks, node_id, node_data)
+
+    def timeout_remote_nodes(self, now=None):
+        '''
+        Check to see whether any remote nodes should be considered timed-out, and if so, remove them from this set.
+
+        Args:
+            now (float): The current timestamp.
+        '''
+        now = _time_now(now)
+        lost_nodes = []
+        with self._remote_nodes_lock:
+            for node_id, node in list(self._remote_nodes.items()):
+                if node.should_timeout(now):
+                    _logger.debug('Lost Node {0}: {1}'.format(node_id, node.data))
+                    del self._remote_nodes[node_id]
+                    lost_nodes.append((node_id, node))
+            if lost_nodes:
+                self._update_snapshot()
+                self._remote_nodes_changed.notify_all()
+        for node_id, node in lost_nodes:
+            trace_event('node_lost', remote_node_id=node_id)
+            self._call_node_callbacks(self._node_lost_callbacks, node_id, node.data)
+
+    def _update_snapshot(self):
+        '''
+        Rebuild the snapshot after the set of nodes has changed (the lock must be held), reusing the node dicts of any unchanged nodes.
+        '''
+        nodes = {}
+        for node_id, node in self._remote_nodes.items():
+            if node.snapshot_dict is None:
+                node.snapshot_dict = _types.MappingProxyType(_remote_node_dict(node_id, node.data))
+            nodes[node_id] = node.snapshot_dict
+        self._snapshot = RemoteExecutionNodeSnapshot(self._snapshot.version + 1, nodes)
+
+    def _call_node_callbacks(self, callbacks, node_id, node_data):
+        '''
+        Call each of the given callbacks with a node dict, logging (rather than propagating) any errors.
+        '''
+        for callback in list(callbacks):
+            try:
+                callback(_remote_node_dict(node_id, node_data))
+            except Exception as e:
+                _logger.error('Remote node callback failed: {0}'.format(str(e)))
+
+class _RemoteExecutionBroadcastConnection(object):
+    '''
+    A remote execution broadcast connection (for UDP based messaging and node discovery).
+
+    Args:
+        config (RemoteExecutionConfig): Configuration controlling the connection settings.
+        node_id (string): The ID of the local "node" (this session).
+        node_added_callbacks (list): Callables to call with the node dict whenever a new node is discovered.
+        node_lost_callbacks (list): Callables to call with the node dict whenever a node has timed-out.
+    '''
+    def __init__(self, config, node_id, node_added_callbacks=None, node_lost_callbacks=None):
+        self._config = config
+        self._node_id = node_id
+        self._node_added_callbacks = node_added_callbacks
+        self._node_lost_callbacks = node_lost_callbacks
+        self._nodes = None
+        self._running = False
+        self._broadcast_socket = None
+        self._broadcast_listen_thread = None
+        self._wake_send_socket = None
+        self._wake_receive_socket = None
+        self._node_waiters = 0
+        self._node_waiters_lock = _threading.Lock()
+        self._constant_messages = _RemoteExecutionConstantMessages(node_id)
+
+    @property
+    def remote_nodes(self):
+        '''
+        Get the current set of discovered remote "nodes" (UE4 instances running Python).
+
+        Returns:
+            list: A list of dicts containg the node ID and the other data.
+        '''
+        return self._nodes.remote_nodes if self._nodes else []
+
+    @property
+    def node_snapshot(self):
+        '''
+        Get an immutable, indexed snapshot of the discovered remote "nodes" (UE4 instances running Python).
+
+        Returns:
+            RemoteExecutionNodeSnapshot: The current snapshot.
+        '''
+        return self._nodes.snapshot if self._nodes else _EMPTY_NODE_SNAPSHOT
+
+    def wait_for_node(self, predicate=None, timeout=None):
+        '''
+        Wait until a remote node matching the given predicate has been discovered.
+
+        Args:
+            predicate (callable): Called with each node dict (as returned by `remote_nodes`), returning True for a matching node. None matches any node.
+            timeout (float): The number of seconds to wait, or None to wait forever.
+
+        Returns:
+            dict: The first matching node (containing the node ID and the other data), or None if no matching node was discovered within the timeout.
+        '''
+        nodes = self._nodes
+        if not nodes:
+            return None
+        # Ping more often while waiting, starting straight away, so new nodes are found as soon as they can respond
+        with self._node_waiters_lock:
+            self._node_waiters += 1
+        self._wake_listen_thread()
+        try:
+            return nodes.wait_for_node(predicate, timeout)
+        finally:
+            with self._node_waiters_lock:
+                self._node_waiters -= 1
+
+    def has_remote_node(self, remote_node_id):
+        '''
+        Check whether the given remote node is currently discovered.
+
+        Args:
+            remote_node_id (string): The ID of the remote node.
+
+        Returns:
+            bool: True if the node has been discovered and hasn't timed-out, False otherwise.
+        '''
+        nodes = self._nodes
+        return bool(nodes and nodes.has_remote_node(remote_node_id))
+
+    def open(self):
+        '''
+        Open the UDP based messaging and discovery connection. This will begin the discovey process for remote "nodes" (UE4 instances running Python).
+        '''
+        self._running = True
+        self._last_ping = None
+        self._nodes = _RemoteExecutionBroadcastNodes(self._node_added_callbacks, self._node_lost_callbacks)
+        self._init_broadcast_socket()
+        self._init_broadcast_listen_thread()
+
+    def close(self):
+        '''
+        Close the UDP based messaging and discovery connection. This will end the discovey process for remote "nodes" (UE4 instances running Python).
+        '''
+        self._running = False
+        if self._broadcast_listen_thread:
+            self._wake_listen_thread()
+            self._broadcast_listen_thread.join()
+            self._broadcast_listen_thread = None
+        if self._broadcast_socket:
+            self._broadcast_socket.close()
+            self._broadcast_socket = None
+        if self._wake_send_socket:
+            self._wake_send_socket.close()
+            self._wake_receive_socket.close()
+            self._wake_send_socket = None
+            self._wake_receive_socket = None
+        if self._nodes:
+            self._nodes.close()
+        self._nodes = None
+
+    def _init_broadcast_socket(self):
+        '''
+        Initialize the UDP based broadcast socket based on the current configuration.
+        '''
+        self._broadcast_socket = _create_broadcast_socket(self._config)
+        self._broadcast_socket.setblocking(False)
+        # Used to wake the listen thread when closing, as it otherwise sleeps until data arrives or it has work to do
+        self._wake_send_socket, self._wake_receive_socket = _socket.socketpair()
+
+    def _init_broadcast_listen_thread(self):
+        '''
+        Initialize the listen thread for the UDP based broadcast socket to allow discovery to run async.
+        '''
+        self._broadcast_listen_thread = _threading.Thread(target=self._run_broadcast_listen_thread)
+        self._broadcast_listen_thread.daemon = True
+        self._broadcast_listen_thread.start()
+
+    def _run_broadcast_listen_thread(self):
+        '''
+        Main loop for the listen thread that handles processing discovery messages.
+        The thread sleeps until a message arrives, or until the next ping or node timeout is due, rather than polling.
+        '''
+        while self._running:
+            # Run tick logic
+            now = _time_now()
+            self._broadcast_ping(now)
+            self._nodes.timeout_remote_nodes(now)
+            # Wait for data (or the next tick), then receive and process all pending data
+            readable = _select.select([self._broadcast_socket, self._wake_receive_socket], [], [], self._get_tick_timeout(now))[0]
+            if self._wake_receive_socket in readable:
+                self._wake_receive_socket.recv(4096)
+                self._last_ping = None # Woken to ping straight away
+            if self._broadcast_socket in readable:
+                self._receive_pending_data()
+
+    def _wake_listen_thread(self):
+        '''
+        Wake the listen thread from waiting for data, so that it runs its tick logic straight away.
+        '''
+        try:
+            self._wake_send_socket.send(b'\0')
+        except (AttributeError, _socket.error):
+            pass
+
+    def _get_tick_timeout(self, now):
+        '''
+        Get the number of seconds until the listen thread next has tick logic to run.
+
+        Args:
+            now (float): The current timestamp.
+
+        Returns:
+            float: The number of seconds until the next ping should be sent, or the next node could time-out.
+        '''
+        next_tick = self._last_ping + self._get_ping_seconds()
+        next_timeout = self._nodes.next_timeout_time()
+        if next_timeout is not None:
+            next_tick = min(next_tick, next_timeout)
+        return max(next_tick - now, 0) + 0.001 # The tick checks are exclusive, so wake just after they're due
+
+    def _receive_pending_data(self):
+        '''
+        Receive and process all data that is pending on the (non-blocking) UDP broadcast socket.
+        '''
+        while True:
+            try:
+                data = self._broadcast_socket.recv(4096)
+            except _socket.error: # Nothing left to receive
+                return
+            if data:
+                self._handle_data(data)
+
+    def _broadcast_message(self, message):
+        '''
+        Broadcast the given message over the UDP socket to anything that might be listening.
+
+        Args:
+            message (_RemoteExecutionMessage): The message to broadcast.
+        '''
+        self._broadcast_bytes(message.to_json_bytes())
+
+    def _broadcast_bytes(self, message_bytes):
+        '''
+        Broadcast the given encoded message over the UDP socket to anything that might be listening.
+
+        Args:
+            message_bytes (bytes): The JSON representation of the message as UTF-8 bytes.
+        '''
+        self._broadcast_socket.sendto(message_bytes, self._config.multicast_group_endpoint)
+
+    def _get_ping_seconds(self):
+        '''
+        Get the number of seconds to wait between "ping" messages.
+
+        Returns:
+            float: `_NODE_WAIT_PING_SECONDS` while something is waiting for a node to be discovered, `_NODE_PING_SECONDS` otherwise.
+        '''
+        return _NODE_WAIT_PING_SECONDS if self._node_waiters else _NODE_PING_SECONDS
+
+    def _broadcast_ping(self, now=None):
+        '''
+        Broadcast a "ping" message over the UDP socket to anything that might be listening.
+
+        Args:
+            now (float): The current timestamp.
+        '''
+        now = _time_now(now)
+        if not self._last_ping or ((self._last_ping + self._get_ping_seconds()) < now):
+            self._last_ping = now
+            self._broadcast_bytes(self._constant_messages.get(_TYPE_PING))
+
+    def broadcast_open_connection(self, remote_node_id, command_endpoint=None):
+        '''
+        Broadcast an "open_connection" message over the UDP socket to be handled by the specified remote node.
+
+        Args:
+            remote_node_id (string): The ID of the remote node that we want to open a command connection with.
+            command_endpoint (tuple): The endpoint tuple that the remote node should connect to, or None to use the configured command endpoint.
+        '''
+        command_endpoint = command_endpoint or self._config.command_endpoint
+        self._broadcast_message(_RemoteExecutionMessage(_TYPE_OPEN_CONNECTION, self._node_id, remote_node_id, {
+            'command_ip': command_endpoint[0],
+            'command_port': command_endpoint[1],
+            }))
+
+    def broadcast_close_connection(self, remote_node_id):
+        '''
+        Broadcast a "close_connection" message over the UDP socket to be handled by the specified remote node.
+
+        Args:
+            remote_node_id (string): The ID of the remote node that we want to close a command connection with.
+        '''
+        self._broadcast_bytes(self._constant_messages.get(_TYPE_CLOSE_CONNECTION, remote_node_id))
+
+    def _handle_data(self, data):
+        '''
+        Handle data received from the UDP broadcast socket.
+
+        Args:
+            data (bytes): The raw bytes received from the socket.
+        '''
+        if data == self._constant_messages.get(_TYPE_PING):
+            return # Our own "ping", looped back by the multicast group
+        message = _RemoteExecutionMessage(None, None)
+        if message.from_json_bytes(data):
+            self._handle_message(message)
+
+    def _handle_message(self, message):
+        '''
+        Handle a message received from the UDP broadcast socket.
+
+        Args:
+            message (_RemoteExecutionMessage): The message received from the socket.
+        '''
+        if not message.passes_receive_filter(self._node_id):
+            return
+        if message.type_ == _TYPE_PONG:
+            self._handle_pong_message(message)
+            return
+        _logger.debug('Unhandled remote execution message type "{0}"'.format(message.type_))
+
+    def _handle_pong_message(self, message):
+        '''
+        Handle a "pong" message received from the UDP broadcast socket.
+
+        Args:
+            message (_RemoteExecutionMessage): The message received from the socket.
+        '''
+        self._nodes.update_remote_node(message.source, message.data)
+
+class _RemoteExecutionCommandConnection(object):
+    '''
+    A remote execution command connection (for TCP based command processing).
+
+    Args:
+        config (RemoteExecutionConfig): Configuration controlling the connection settings.
+        node_id (string): The ID of the local "node" (this session).
+        remote_node_id (string): The ID of the remote "node" (the UE4 instance running Python).
+    '''
+    def __init__(self, config, node_id, remote_node_id):
+        self._config = config
+        self._node_id = node_id
+        self._remote_node_id = remote_node_id
+        self._command_listen_socket = None
+        self._command_endpoint = None
+        self._command_channel_socket = _socket.socket() # This type is only here to appease PyLint
+        self.handshake_latency = None
+        self.last_command_timings = {}
+        self._message_reader = _RemoteExecutionMessageReader(config.receive_buffer_size, config.max_message_size)
+
+    @property
+    def last_receive_stats(self):
+        '''
+        Get the size of the last message received over this command connection.
+
+        Returns:
+            dict: The number of bytes and socket reads ("chunks") used by the last received message.
+        '''
+        return {
+            'bytes': self._message_reader.last_message_bytes,
+            'chunks': self._message_reader.last_message_chunks,
+            }
+
+    @property
+    def remote_node_id(self):
+        '''
+        Get the ID of the remote party of this command connection.
+
+        Returns:
+            str: The ID of the remote node.
+        '''
+        return self._remote_node_id
+
+    @property
+    def command_endpoint(self):
+        '''
+        Get the endpoint that this command connection listens on for the remote party to connect to.
+
+        Returns:
+            tuple: The (ip, port) endpoint tuple, or None if the connection hasn't been opened.
+        '''
+        return self._command_endpoint
+
+    def open(self, broadcast_connection):
+        '''
+        Open the TCP based command connection, and wait to accept the connection from the remote party.
+
+        Args:
+            broadcast_connection (_RemoteExecutionBroadcastConnection): The broadcast connection to send UDP based messages over.
+        '''
+        self._nodes = _RemoteExecutionBroadcastNodes()
+        self._init_command_listen_socket()
+        self._try_accept(broadcast_connection)
+
+    def close(self, broadcast_connection):
+        '''
+        Close the TCP based command connection, attempting to notify the remote party.
+
+        Args:
+            broadcast_connection (_RemoteExecutionBroadcastConnection): The broadcast connection to send UDP based messages over.
+        '''
+        if broadcast_connection:
+            broadcast_connection.broadcast_close_connection(self._remote_node_id)
+        if self._command_channel_socket:
+            self._command_channel_socket.close()
+            self._command_channel_socket = None
+        if self._command_listen_socket:
+            self._command_listen_socket.close()
+            self._command_listen_socket = None
+
+    def is_alive(self):
+        '''
+        Check whether the TCP command socket is still connected, without blocking or consuming any data.
+
+        Returns:
+            bool: True if the socket is connected and has not been closed by the remote party, False otherwise.
+        '''
+        if not self._command_channel_socket:
+            return False
+        try:
+            readable = _select.select([self._command_channel_socket], [], [], 0)[0]
+            # A socket with nothing pending is idle and alive; a readable socket with nothing to peek has been closed by the remote party
+            return not readable or bool(self._command_channel_socket.recv(1, _socket.MSG_PEEK))
+        except (ValueError, _socket.error):
+            return False
+
+    def run_command(self, command, unattended, exec_mode):
+        '''
+        Run a command on the remote party.
+        The time spent in each stage of the round trip is stored in `last_command_timings`.
+
+        Args:
+            command (string): The Python command to run remotely.
+            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
+            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+
+        Returns:
+            dict: The result from running the remote command (see `command_result` from the protocol definition).
+        '''
+        timings = self.last_command_timings = {}
+        start_time = _time.perf_counter()
+        message_bytes = _RemoteExecutionMessage(_TYPE_COMMAND, self._node_id, self._remote_node_id, {
+            'command': command,
+            'unattended': unattended,
+            'exec_mode': exec_mode,
+            }).to_json_bytes()
+        encoded_time = _time.perf_counter()
+        self._command_channel_socket.sendall(message_bytes)
+        sent_time = _time.perf_counter()
+        timings['bytes_out'] = len(message_bytes)
+        timings['encode_seconds'] = encoded_time - start_time
+        timings['send_seconds'] = sent_time - encoded_time
+        data = self._message_reader.read_message(self._command_channel_socket)
+        received_time = _time.perf_counter()
+        if data:
+            # The reply may already have been (partially) received before the command was sent, so its first byte can't arrive before then
+            first_byte_time = max(self._message_reader.last_message_first_byte_time, sent_time)
+            timings['bytes_in'] = len(data)
+            timings['first_byte_seconds'] = first_byte_time - sent_time
+            timings['receive_seconds'] = received_time - first_byte_time
+        result = self._decode_message(data, _TYPE_COMMAND_RESULT)
+        end_time = _time.perf_counter()
+        timings['decode_seconds'] = end_time - received_time
+        timings['total_seconds'] = end_time - start_time
+        return result.data
+
+    def _send_message(self, message):
+        '''
+        Send the given message over the TCP socket to the remote party.
+
+        Args:
+            message (_RemoteExecutionMessage): The message to send.
+        '''
+        self._command_channel_socket.sendall(message.to_json_bytes())
+
+    def _receive_message(self, expected_type):
+        '''
+        Receive a message over the TCP socket from the remote party.
+
+        Args:
+            expected_type (string): The type of message we expect to receive.
+
+        Returns:
+            The message that was received.
+        '''
+        return self._decode_message(self._message_reader.read_message(self._command_channel_socket), expected_type)
+
+    def _decode_message(self, data, expected_type):
+        '''
+        Decode a message received over the TCP socket from the remote party.
+
+        Args:
+            data (bytearray): The raw bytes of the message, or None if the socket was closed before it was received.
+            expected_type (string): The type of message we expect to receive.
+
+        Returns:
+            The message that was received.
+        '''
+        if data:
+            message = _RemoteExecutionMessage(None, None)
+            if message.from_json_bytes(data) and message.passes_receive_filter(self._node_id) and message.type_ == expected_type:
+                return message
+        raise RuntimeError('Remote party failed to send a valid response!')
+
+    def _init_command_listen_socket(self):
+        '''
+        Initialize the TCP based command socket based on the current configuration, and set it to listen for an incoming connection.
+        This listens on the first free port from `command_port_pool` (if set), otherwise on the port from `command_endpoint` (where 0 picks a new ephemeral port).
+        '''
+        command_ip = self._config.command_endpoint[0]
+        command_ports = list(self._config.command_port_pool or [self._config.command_endpoint[1]])
+        for command_port in command_ports:
+            self._command_listen_socket = _socket.socket(_socket.AF_INET, _socket.SOCK_STREAM, _socket.IPPROTO_TCP) # TCP/IP socket
+            self._command_listen_socket.setsockopt(_socket.SOL_SOCKET, _socket.SO_REUSEADDR, 1) # Allow re-listening while previously accepted connections are still open
+            try:
+                self._command_listen_socket.bind((command_ip, command_port))
+                self._command_listen_socket.listen(_HANDSHAKE_LISTEN_BACKLOG)
+                break
+            except _socket.error:
+                self._command_listen_socket.close()
+                self._command_listen_socket = None
+                if command_port == command_ports[-1]:
+                    raise
+        self._command_endpoint = (command_ip, self._command_listen_socket.getsockname()[1])
+
+    def _try_accept(self, broadcast_connection):
+        '''
+        Wait to accept a connection on the TCP based command connection.
+        The "open_connection" message is re-sent on an exponential schedule (`_HANDSHAKE_RETRANSMIT_SECONDS`, doubling up to `_HANDSHAKE_MAX_RETRANSMIT_SECONDS`),
+        so a lost datagram only costs a short wait, until `command_connect_timeout` has elapsed or the remote node is no longer discovered.
+
+        Args:
+            broadcast_connection (_RemoteExecutionBroadcastConnection): The broadcast connection to send UDP based messages over.
+        '''
+        start_time = _time.perf_counter()
+        deadline = start_time + self._config.command_connect_timeout
+        retransmit_seconds = _HANDSHAKE_RETRANSMIT_SECONDS
+        attempts = 0
+        while True:
+            if not broadcast_connection.has_remote_node(self._remote_node_id):
+                raise RuntimeError('Remote party "{0}" is not available to attempt the command socket connection!'.format(self._remote_node_id))
+            wait_seconds = min(retransmit_seconds, deadline - _time.perf_counter())
+            if wait_seconds <= 0:
+                break
+            broadcast_connection.broadcast_open_connection(self._remote_node_id, self._command_endpoint)
+            attempts += 1
+            try:
+                self._command_listen_socket.settimeout(wait_seconds)
+                command_channel_socket = self._command_listen_socket.accept()[0]
+            except _socket.timeout:
+                retransmit_seconds = min(retransmit_seconds * 2, _HANDSHAKE_MAX_RETRANSMIT_SECONDS)
+                continue
+            if attempts > 1:
+                # The remote party replaces its connection for every "open_connection" it handles, so find the one it kept
+                command_channel_socket = self._confirm_latest(command_channel_socket, deadline)
+            self.handshake_latency = _time.perf_counter() - start_time
+            _logger.debug('Opened command connection to {0} in {1:.3f}s ({2} attempt(s))'.format(self._remote_node_id, self.handshake_latency, attempts))
+            self._command_channel_socket = command_channel_socket
+            self._command_channel_socket.setblocking(True)
+            self._command_channel_socket.setsockopt(_socket.SOL_SOCKET, _socket.SO_RCVBUF, self._config.receive_buffer_size)
+            # The listen socket is no longer needed once accepted, so release the command endpoint for other connections
+            self._command_listen_socket.close()
+            self._command_listen_socket = None
+            return
+        raise RuntimeError('Remote party failed to attempt the command socket connection!')
+
+    def _confirm_latest(self, command_channel_socket, deadline):
+        '''
+        Find the command connection that the remote party kept, after "open_connection" was sent more than once.
+        The remote party replaces (and closes) its connection for every "open_connection" it handles, and a busy editor can handle a re-sent message a tick after the first one.
+        The editor handles discovery messages before commands in each tick, so once a no-op command has a reply over a connection, every "open_connection" sent before it has been handled and that connection is the one that was kept.
+        Until then, each connection that fails is dropped for the next one waiting to be accepted (the newest of those already waiting is tried first).
 
-    def open(self, broadcast_connection):
+        Args:
+            command_channel_socket (socket): The connection that has already been accepted.
+            deadline (float): The `time.perf_counter` time to give up at.
+
+        Returns:
+            socket: The connection that the remote party kept.
+        '''
+        confirm_bytes = _RemoteExecutionMessage(_TYPE_COMMAND, self._node_id, self._remote_node_id, {
+            'command': _HANDSHAKE_CONFIRM_COMMAND,
+            'unattended': True,
+            'exec_mode': MODE_EVAL_STATEMENT,
+            }).to_json_bytes()
+        while True:
+            command_channel_socket = self._accept_waiting(command_channel_socket)
+            wait_seconds = max(deadline - _time.perf_counter(), _HANDSHAKE_MAX_RETRANSMIT_SECONDS)
+            try:
+                command_channel_socket.settimeout(wait_seconds)
+                command_channel_socket.sendall(confirm_bytes)
+                data = _RemoteExecutionMessageReader(self._config.receive_buffer_size, self._config.max_message_size).read_message(command_channel_socket)
+            except _socket.error: # Including a timeout, as the connection may have been replaced while the command was waiting
+                data = None
+            message = _RemoteExecutionMessage(None, None)
+            if data is not None and message.from_json_bytes(data) and message.type_ == _TYPE_COMMAND_RESULT:
+                return command_channel_socket
+            command_channel_socket.close()
+            try:
+                self._command_listen_socket.settimeout(wait_seconds)
+                command_channel_socket = self._command_listen_socket.accept()[0]
+            except _socket.timeout:
+                raise RuntimeError('Remote party failed to attempt the command socket connection!')
+
+    def _accept_waiting(self, command_channel_socket):
         '''
-        Open the TCP based command connection, and wait to accept the connection from the remote party.
+        Accept every connection already waiting on the listen socket, closing all but the most recent one.
 
         Args:
-            broadcast_connection (_RemoteExecutionBroadcastConnection): The broadcast connection to send UDP based messages over.
+            command_channel_socket (socket): The connection that has already been accepted.
+
+        Returns:
+            socket: The most recently accepted connection.
         '''
-        self._nodes = _RemoteExecutionBroadcastNodes()
-        self._init_command_listen_socket()
-        self._try_accept(broadcast_connection)
+        self._command_listen_socket.setblocking(False)
+        while True:
+            try:
+                latest_socket = self._command_listen_socket.accept()[0]
+            except (BlockingIOError, _socket.timeout):
+                return command_channel_socket
+            command_channel_socket.close()
+            command_channel_socket = latest_socket
 
-    def close(self, broadcast_connection):
+class _RemoteExecutionBatch(object):
+    '''
+    Several independent Python commands packed into a single `MODE_EXEC_FILE` command, so they can be run in one round trip.
+
+    Each command is run in its own try/except envelope, in the same global namespace, and in the given order.
+    A command that is a single expression is evaluated and its `repr` becomes its result (like `MODE_EVAL_STATEMENT`), otherwise its result is "None" (like `MODE_EXEC_FILE`).
+    Marker lines are printed between the commands, so the output of the batch can be split back up per command.
+
+    Args:
+        commands (list): The Python commands to run remotely.
+    '''
+    _COMMAND_TEMPLATE = '''\
+import json as _batch_json, traceback as _batch_traceback
+def _run_batch(_commands, _marker, _namespace):
+    _results = []
+    for _index, _command in enumerate(_commands):
+        print(_marker + str(_index))
+        try:
+            try:
+                _code, _is_expression = compile(_command, '<batch %%d>' %% _index, 'eval'), True
+            except SyntaxError:
+                _code, _is_expression = compile(_command, '<batch %%d>' %% _index, 'exec'), False
+            _value = eval(_code, _namespace)
+            _results.append([True, repr(_value) if _is_expression else 'None'])
+        except Exception:
+            _results.append([False, _batch_traceback.format_exc()])
+    print(_marker + 'results' + _batch_json.dumps(_results))
+_run_batch(_batch_json.loads(%(commands)s), %(marker)s, globals())
+'''
+
+    def __init__(self, commands):
+        self.commands = list(commands)
+        self._marker = '__ue_py_batch_{0}__'.format(_uuid.uuid4().hex)
+
+    @property
+    def command(self):
         '''
-        Close the TCP based command connection, attempting to notify the remote party.
+        Get the single Python command that runs every command in this batch.
 
-        Args:
-            broadcast_connection (_RemoteExecutionBroadcastConnection): The broadcast connection to send UDP based messages over.
+        Returns:
+            str: The Python command to run remotely with `MODE_EXEC_FILE`.
         '''
-        broadcast_connection.broadcast_close_connection(self._remote_node_id)
-        if self._command_channel_socket:
-            self._command_channel_socket.close()
-            self._command_channel_socket = None
-        if self._command_listen_socket:
-            self._command_listen_socket.close()
-            self._command_listen_socket = None
+        return self._COMMAND_TEMPLATE % {
+            'commands': repr(_json.dumps(self.commands)),
+            'marker': repr(self._marker),
+            }
 
-    def run_command(self, command, unattended, exec_mode):
+    def split_result(self, data):
         '''
-        Run a command on the remote party.
+        Split the result of running this batch back into a result per command.
 
         Args:
-            command (string): The Python command to run remotely.
-            unattended (bool): True to run this command in "unattended" mode (suppressing some UI).
-            exec_mode (string): The execution mode to use as a string value (must be one of MODE_EXEC_FILE, MODE_EXEC_STATEMENT, or MODE_EVAL_STATEMENT).
+            data (dict): The result from running the batch command (see `command_result` from the protocol definition).
 
         Returns:
-            dict: The result from running the remote command (see `command_result` from the protocol definition).
-        '''
-        self._send_message(_RemoteExecutionMessage(_TYPE_COMMAND, self._node_id, self._remote_node_id, {
+            list: The result from running each command, in the same format as `command_result`.
+        '''
+        outputs = [[] for _command in self.commands]
+        results = None
+        index = None
+        for entry in data.get('output') or []:
+            text = entry.get('output') or ''
+            if self._marker not in text:
+                if index is not None:
+                    outputs[index].append(entry)
+                continue
+            # Split up the entry, in case several lines of output were merged into it
+            for line in text.splitlines():
+                marker_pos = line.find(self._marker)
+                if marker_pos < 0:
+                    if index is not None:
+                        outputs[index].append({'type': entry.get('type'), 'output': line})
+                    continue
+                tag = line[marker_pos + len(self._marker):].strip()
+                if tag.startswith('results'):
+                    results = _json.loads(tag[len('results'):])
+                else:
+                    index = int(tag)
+        if results is None:
+            # The batch itself failed to run, so every command shares its failure
+            results = [[False, data.get('result')]] * len(self.commands)
+        return [{
+            'success': success,
             'command': command,
-            'unattended': unattended,
-            'exec_mode': exec_mode,
-            }))
-        result = self._receive_message(_TYPE_COMMAND_RESULT)
-        return result.data
+            'result': result,
+            'output': output,
+            } for command, (success, result), output in zip(self.commands, results, outputs)]
 
-    def _send_message(self, message):
+class _RemoteExecutionMessageReader(object):
+    '''
+    An incremental reader for the messages received over the TCP command connection.
+    Messages are not length-prefixed, so data is read into a fixed size reusable buffer and scanned until a complete JSON document has arrived.
+    Only the newly received bytes are scanned on each read, so large messages are not re-parsed or re-copied for every chunk.
+
+    Args:
+        buffer_size (int): The size of the reusable receive buffer, in bytes (allocated on the first socket read).
+        max_message_size (int): The maximum size of a message, in bytes. Receiving more data than this without completing a message raises a RuntimeError.
+    '''
+    _TOKEN_RE = _re.compile(br'[{}"]')                     # Structural tokens outside of a JSON string
+    _STRING_BODY_RE = _re.compile(br'[^"\\]*(?:\\.[^"\\]*)*', _re.DOTALL) # The body of a JSON string, up to its closing quote (or a trailing backslash)
+
+    def __init__(self, buffer_size, max_message_size=DEFAULT_MAX_MESSAGE_SIZE):
+        self._buffer_size = buffer_size
+        self._max_message_size = max_message_size
+        self._buffer_view = None
+        self._pending = bytearray()
+        self.last_message_bytes = 0
+        self.last_message_chunks = 0
+        self.last_message_first_byte_time = 0.0
+        self._first_byte_time = 0.0
+        self._reset_scan()
+
+    def read_message(self, sock):
         '''
-        Send the given message over the TCP socket to the remote party.
+        Read a single complete JSON document from the given socket, blocking until it has been fully received.
 
         Args:
-            message (_RemoteExecutionMessage): The message to send.
+            sock (socket): The connected TCP socket to read from.
+
+        Returns:
+            bytearray: The raw bytes of the JSON document, or None if the socket was closed before a complete document was received.
         '''
-        self._command_channel_socket.sendall(message.to_json_bytes())
+        if self._buffer_view is None:
+            self._buffer_view = memoryview(bytearray(self._buffer_size))
+        message = self.next_message()
+        while message is None:
+            num_bytes = sock.recv_into(self._buffer_view)
+            if not num_bytes:
+                return None
+            message = self.feed(self._buffer_view[:num_bytes])
+        return message
 
-    def _receive_message(self, expected_type):
+    def next_message(self):
         '''
-        Receive a message over the TCP socket from the remote party.
+        Take the next complete JSON document from the data that has already been received (eg, data left over from a previous read).
+
+        Returns:
+            bytearray: The raw bytes of the JSON document, or None if a complete document has not been received yet.
+        '''
+        return self._take_message(self._scan(self._pending))
+
+    def feed(self, data):
+        '''
+        Add a chunk of received data, and take the JSON document it completes (if any).
+        This allows the reader to be driven by any source of data, not just a blocking socket.
 
         Args:
-            expected_type (string): The type of message we expect to receive.
+            data (bytes): The chunk of data that was received.
 
         Returns:
-            The message that was received.
+            bytearray: The raw bytes of the JSON document, or None if a complete document has not been received yet.
+
+        Raises:
+            RuntimeError: If the document is (or has grown) larger than the maximum message size (the received data is discarded).
         '''
-        data = self._command_channel_socket.recv(4096)
-        if data:
-            message = _RemoteExecutionMessage(None, None)
-            if message.from_json_bytes(data) and message.passes_receive_filter(self._node_id) and message.type_ == expected_type:
-                return message
-        raise RuntimeError('Remote party failed to send a valid response!')
+        if not self._chunks:
+            self._first_byte_time = _time.perf_counter()
+        self._chunks += 1
+        self._pending += data
+        end = self._scan(self._pending)
+        if (end if end >= 0 else len(self._pending)) > self._max_message_size:
+            message_bytes = end if end >= 0 else len(self._pending)
+            self._pending = bytearray()
+            self._reset_scan()
+            raise RuntimeError('Remote party sent a message larger than the maximum message size ({0} bytes received, the maximum is {1} bytes)!'.format(message_bytes, self._max_message_size))
+        return self._take_message(end)
 
-    def _init_command_listen_socket(self):
+    def _take_message(self, end):
         '''
-        Initialize the TCP based command socket based on the current configuration, and set it to listen for an incoming connection.
+        Split a complete JSON document from the front of the received data, keeping any remaining data for the next message.
+
+        Args:
+            end (int): The offset one past the end of the JSON document, or -1 if the document is not complete yet.
+
+        Returns:
+            bytearray: The raw bytes of the JSON document, or None if the document is not complete yet.
         '''
-        self._command_listen_socket = _socket.socket(_socket.AF_INET, _socket.SOCK_STREAM, _socket.IPPROTO_TCP) # TCP/IP socket
-        self._command_listen_socket.bind(self._config.command_endpoint)
-        self._command_listen_socket.listen(1)
-        self._command_listen_socket.settimeout(5)
+        if end < 0:
+            return None
+        message = self._pending
+        self._pending = message[end:]
+        del message[end:]
+        self.last_message_bytes = len(message)
+        self.last_message_chunks = self._chunks
+        self.last_message_first_byte_time = self._first_byte_time
+        self._reset_scan()
+        _logger.debug('Received {0} bytes in {1} chunk(s)'.format(self.last_message_bytes, self.last_message_chunks))
+        return message
 
-    def _try_accept(self, broadcast_connection):
+    def _reset_scan(self):
+        '''
+        Reset the JSON document scanning state, ready to scan a new message.
         '''
-        Wait to accept a connection on the TCP based command connection. This makes 6 attempts to receive a connection, waiting for 5 seconds between each attempt (30 seconds total).
+        self._scan_offset = 0
+        self._depth = 0
+        self._in_string = False
+        self._chunks = 0
 
-        Args:
-            broadcast_connection (_RemoteExecutionBroadcastConnection): The broadcast connection to send UDP based messages over.
+    def _scan(self, data):
         '''
-        for _n in range(6):
-            broadcast_connection.broadcast_open_connection(self._remote_node_id)
-            try:
-                self._command_channel_socket = self._command_listen_socket.accept()[0]
-                self._command_channel_socket.setblocking(True)
-                return
-            except _socket.timeout:
-                continue
-        raise RuntimeError('Remote party failed to attempt the command socket connection!')
+        Continue scanning for the end of the current JSON document, resuming from where the previous scan stopped.
+        String bodies are skipped by a single regex match, so only the structural tokens are visited in Python.
+
+        Args:
+            data (bytearray): The message data received so far.
+
+        Returns:
+            int: The offset one past the end of the JSON document, or -1 if the document is not complete yet.
+        '''
+        pos = self._scan_offset
+        end = len(data)
+        while True:
+            if self._in_string:
+                pos = self._STRING_BODY_RE.match(data, pos).end()
+                if pos >= end or data[pos] != 0x22: # Ran out of data (possibly mid escape sequence)
+                    self._scan_offset = pos
+                    return -1
+                self._in_string = False
+                pos += 1
+            match = self._TOKEN_RE.search(data, pos)
+            if not match:
+                self._scan_offset = end
+                return -1
+            pos = match.end()
+            token = data[pos - 1]
+            if token == 0x22: # Opening quote
+                self._in_string = True
+            elif token == 0x7B: # Opening brace
+                self._depth += 1
+            else: # Closing brace
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos
 
 class _RemoteExecutionMessage(object):
     '''
@@ -516,6 +2837,59 @@ class _RemoteExecutionMessage(object):
         Returns:
             str: The JSON representation of this message.
         '''
+        return _json.dumps(self._to_json_obj(), ensure_ascii=False)
+    
+    def to_json_bytes(self):
+        '''
+        Convert this message to its JSON representation as UTF-8 bytes, using the current codec (see `set_codec`).
+
+        Returns:
+            bytes: The JSON representation of this message as UTF-8 bytes.
+        '''
+        return _codec.dumps(self._to_json_obj())
+
+    def from_json(self, json_str):
+        '''
+        Parse this message from its JSON representation.
+
+        Args:
+            json_str (str): The JSON representation of this message.
+
+        Returns:
+            bool: True if this message could be parsed, False otherwise.
+        '''
+        try:
+            json_obj = _json.loads(json_str)
+        except Exception as e:
+            return self._log_parse_error(json_str, e)
+        return self._from_json_obj(json_obj, json_str)
+
+    def from_json_bytes(self, json_bytes):
+        '''
+        Parse this message from its JSON representation as UTF-8 bytes, using the current codec (see `set_codec`).
+        Data that doesn't contain the protocol magic identifier is rejected without being decoded.
+
+        Args:
+            json_bytes (bytes): The JSON representation of this message as UTF-8 bytes.
+
+        Returns:
+            bool: True if this message could be parsed, False otherwise.
+        '''
+        if _PROTOCOL_MAGIC_BYTES not in json_bytes:
+            return False # Not a remote execution message (eg, other traffic on the multicast group)
+        try:
+            json_obj = _codec.loads(json_bytes)
+        except Exception as e:
+            return self._log_parse_error(json_bytes, e)
+        return self._from_json_obj(json_obj, json_bytes)
+
+    def _to_json_obj(self):
+        '''
+        Convert this message to the object that is serialized as its JSON representation.
+
+        Returns:
+            dict: The JSON object for this message.
+        '''
         if not self.type_:
             raise ValueError('"type" cannot be empty!')
         if not self.source:
@@ -530,30 +2904,20 @@ class _RemoteExecutionMessage(object):
             json_obj['dest'] = self.dest
         if self.data:
             json_obj['data'] = self.data
-        return _json.dumps(json_obj, ensure_ascii=False)
-    
-    def to_json_bytes(self):
-        '''
-        Convert this message to its JSON representation as UTF-8 bytes.
-
-        Returns:
-            bytes: The JSON representation of this message as UTF-8 bytes.
-        '''
-        json_str = self.to_json()
-        return json_str.encode('utf-8')
+        return json_obj
 
-    def from_json(self, json_str):
+    def _from_json_obj(self, json_obj, json_data):
         '''
-        Parse this message from its JSON representation.
+        Read and validate this message from its deserialized JSON object.
 
         Args:
-            json_str (str): The JSON representation of this message.
+            json_obj (dict): The JSON object for this message.
+            json_data (str|bytes): The JSON representation this object was deserialized from (for error reporting).
 
         Returns:
-            bool: True if this message could be parsed, False otherwise.
+            bool: True if this message could be read, False otherwise.
         '''
         try:
-            json_obj = _json.loads(json_str)
             # Read and validate required protocol version information
             if json_obj['version'] != _PROTOCOL_VERSION:
                 raise ValueError('"version" is incorrect (got {0}, expected {1})!'.format(json_obj['version'], _PROTOCOL_VERSION))
@@ -568,22 +2932,273 @@ class _RemoteExecutionMessage(object):
             self.dest = json_obj.get('dest')
             self.data = json_obj.get('data')
         except Exception as e:
-            _logger.error('Failed to deserialize JSON "{0}": {1}'.format(json_str, str(e)))
-            return False
+            return self._log_parse_error(json_data, e)
         return True
 
-    def from_json_bytes(self, json_bytes):
+    @staticmethod
+    def _log_parse_error(json_data, error):
+        '''
+        Log a failure to parse a message, including only the start of its (potentially huge) JSON representation.
+
+        Returns:
+            bool: Always False, so it can be returned as the parse result.
+        '''
+        _logger.error('Failed to deserialize JSON "{0}"{1}: {2}'.format(json_data[:_PARSE_ERROR_PREVIEW_LENGTH], '...' if len(json_data) > _PARSE_ERROR_PREVIEW_LENGTH else '', str(error)))
+        return False
+
+class _RemoteExecutionConstantMessages(object):
+    '''
+    Messages that never change for a local "node" (eg, "ping" and "close_connection"), encoded once on first use rather than for every send.
+
+    Args:
+        node_id (string): The ID of the local "node" (this session), which is the source of every message.
+    '''
+    def __init__(self, node_id):
+        self._node_id = node_id
+        self._messages = {}
+
+    def get(self, type_, dest=None):
         '''
-        Parse this message from its JSON representation as UTF-8 bytes.
+        Get the encoded message of the given type.
 
         Args:
-            json_bytes (bytes): The JSON representation of this message as UTF-8 bytes.
+            type_ (string): The type of the message (see the `_TYPE_` constants).
+            dest (string): The ID of the destination node of the message, or None to send to all nodes.
 
         Returns:
-            bool: True if this message could be parsed, False otherwise.
+            bytes: The JSON representation of the message as UTF-8 bytes.
+        '''
+        message_bytes = self._messages.get((type_, dest))
+        if message_bytes is None:
+            message_bytes = self._messages[(type_, dest)] = _RemoteExecutionMessage(type_, self._node_id, dest).to_json_bytes()
+        return message_bytes
+
+class RemoteExecutionJsonCodec(object):
+    '''
+    The codec used to encode and decode remote execution messages, based on the standard library `json` module.
+    '''
+    name = 'json'
+
+    def dumps(self, json_obj):
+        '''
+        Encode the given JSON object.
+
+        Args:
+            json_obj (object): The object to encode.
+
+        Returns:
+            bytes: The JSON representation of the object as UTF-8 bytes.
+        '''
+        return _json.dumps(json_obj, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, json_bytes):
+        '''
+        Decode the given JSON representation.
+
+        Args:
+            json_bytes (bytes): The JSON representation as UTF-8 bytes (bytearray is also accepted).
+
+        Returns:
+            object: The decoded object.
         '''
-        json_str = json_bytes.decode('utf-8')
-        return self.from_json(json_str)
+        return _json.loads(json_bytes)
+
+class RemoteExecutionOrjsonCodec(RemoteExecutionJsonCodec):
+    '''
+    A codec used to encode and decode remote execution messages, based on the (optional) `orjson` module.
+    Anything that `orjson` can't encode (eg, integers larger than 64-bits) falls back to the standard library `json` module.
+    '''
+    name = 'orjson'
+
+    def dumps(self, json_obj):
+        try:
+            return _orjson.dumps(json_obj)
+        except TypeError:
+            return super(RemoteExecutionOrjsonCodec, self).dumps(json_obj)
+
+    def loads(self, json_bytes):
+        return _orjson.loads(json_bytes)
+
+def get_default_codec():
+    '''
+    Get the fastest codec that is available.
+
+    Returns:
+        RemoteExecutionJsonCodec: A `RemoteExecutionOrjsonCodec` if `orjson` is installed, otherwise a `RemoteExecutionJsonCodec`.
+    '''
+    return RemoteExecutionOrjsonCodec() if _orjson else RemoteExecutionJsonCodec()
+
+def get_codec():
+    '''
+    Get the codec currently used to encode and decode remote execution messages.
+
+    Returns:
+        RemoteExecutionJsonCodec: The current codec.
+    '''
+    return _codec
+
+def set_codec(codec):
+    '''
+    Set the codec used to encode and decode remote execution messages.
+
+    Args:
+        codec (RemoteExecutionJsonCodec): The codec to use (any object with compatible `dumps` and `loads` methods), or None to use the default codec.
+    '''
+    global _codec
+    _codec = codec or get_default_codec()
+
+def add_trace_hook(hook):
+    '''
+    Add a hook to be notified of every span and event (see `trace_span` and `trace_event`).
+    Spans are only created while at least one hook is installed.
+
+    Args:
+        hook (RemoteExecutionTraceHook): The hook to add.
+    '''
+    global _trace_hooks
+    _trace_hooks = _trace_hooks + (hook,)
+
+def remove_trace_hook(hook):
+    '''
+    Remove a hook that was added by `add_trace_hook`.
+
+    Args:
+        hook (RemoteExecutionTraceHook): The hook to remove.
+    '''
+    global _trace_hooks
+    _trace_hooks = tuple(h for h in _trace_hooks if h is not hook)
+
+def get_current_span():
+    '''
+    Get the span of the operation that is currently running in this context.
+
+    Returns:
+        RemoteExecutionSpan: The current span, or None if there is none (or no trace hooks are installed).
+    '''
+    return _current_span.get()
+
+@_contextlib.contextmanager
+def trace_span(name, **tags):
+    '''
+    Context manager that times the code it wraps as a span, reporting it to the trace hooks.
+    The span is a child of the current span (which propagates through `contextvars`), and includes the current `trace_tags`.
+
+    Args:
+        name (string): The name of the operation.
+        **tags: Details of the operation.
+
+    Returns:
+        RemoteExecutionSpan: The span (yielded), or a span that ignores its tags if no trace hooks are installed.
+    '''
+    hooks = _trace_hooks
+    if not hooks:
+        yield _null_span
+        return
+    parent = _current_span.get()
+    context_tags = _current_tags.get()
+    if context_tags:
+        tags = dict(context_tags, **tags)
+    span = RemoteExecutionSpan(name, parent.span_id if parent else None, tags)
+    token = _current_span.set(span)
+    for hook in hooks:
+        hook.span_started(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = repr(e)
+        raise
+    finally:
+        span.end_time = _time.perf_counter()
+        _current_span.reset(token)
+        for hook in hooks:
+            hook.span_finished(span)
+
+@_contextlib.contextmanager
+def trace_tags(**tags):
+    '''
+    Context manager that adds tags to every span started within it (eg, to record which wrapper method a command came from).
+
+    Args:
+        **tags: The tags to add.
+    '''
+    context_tags = _current_tags.get()
+    token = _current_tags.set(dict(context_tags, **tags) if context_tags else tags)
+    try:
+        yield
+    finally:
+        _current_tags.reset(token)
+
+def trace_event(name, **tags):
+    '''
+    Report something that happened at a single point in time to the trace hooks.
+
+    Args:
+        name (string): The name of the event.
+        **tags: Details of the event.
+    '''
+    hooks = _trace_hooks
+    if not hooks:
+        return
+    parent = _current_span.get()
+    context_tags = _current_tags.get()
+    if context_tags:
+        tags = dict(context_tags, **tags)
+    timestamp = _time.perf_counter()
+    for hook in hooks:
+        hook.event(name, timestamp, parent.span_id if parent else None, tags)
+
+def _get_max_concurrent_handshakes(config):
+    '''
+    Utility function to get how many command connections can be opened at the same time, based on how many command ports they can listen on.
+
+    Args:
+        config (RemoteExecutionConfig): Configuration controlling the connection settings.
+
+    Returns:
+        int: The number of command ports in the pool, 1 for a fixed command port, or None if every connection gets its own ephemeral port.
+    '''
+    if config.command_port_pool:
+        return len(list(config.command_port_pool))
+    return 1 if config.command_endpoint[1] else None
+
+def _remote_node_dict(node_id, node_data):
+    '''
+    Utility function to build the dict representing a remote node, as returned by `remote_nodes`.
+
+    Args:
+        node_id (str): The ID of the remote node.
+        node_data (dict): The data representing the node (from its "pong" reponse).
+
+    Returns:
+        dict: A copy of the node data, including its node ID.
+    '''
+    remote_node_data = dict(node_data)
+    remote_node_data['node_id'] = node_id
+    return remote_node_data
+
+def _prometheus_label(value):
+    '''
+    Utility function to escape a value for use as a Prometheus label value.
+    '''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _create_broadcast_socket(config):
+    '''
+    Utility function to create a UDP socket that has joined the multicast group used for broadcast messaging.
+
+    Args:
+        config (RemoteExecutionConfig): Configuration controlling the connection settings.
+
+    Returns:
+        socket: The bound UDP socket.
+    '''
+    broadcast_socket = _socket.socket(_socket.AF_INET, _socket.SOCK_DGRAM, _socket.IPPROTO_UDP) # UDP/IP socket
+    broadcast_socket.setsockopt(_socket.SOL_SOCKET, _socket.SO_REUSEADDR, 1)
+    broadcast_socket.bind((config.multicast_bind_address, config.multicast_group_endpoint[1]))
+    broadcast_socket.setsockopt(_socket.IPPROTO_IP, _socket.IP_MULTICAST_LOOP, 1)
+    broadcast_socket.setsockopt(_socket.IPPROTO_IP, _socket.IP_MULTICAST_TTL, config.multicast_ttl)
+    broadcast_socket.setsockopt(_socket.IPPROTO_IP, _socket.IP_ADD_MEMBERSHIP, _socket.inet_aton(config.multicast_group_endpoint[0]) + _socket.inet_aton('0.0.0.0'))
+    return broadcast_socket
 
 def _time_now(now=None):
     '''
@@ -597,6 +3212,27 @@ def _time_now(now=None):
     '''
     return _time.time() if now is None else now
 
+# Message encoding
+_codec = get_default_codec()
+
+# Node selection
+_NODE_POLICY_TYPES = {
+    NODE_POLICY_LEAST_IN_FLIGHT: LeastInFlightNodePolicy,
+    NODE_POLICY_EWMA_LATENCY: EwmaLatencyNodePolicy,
+    NODE_POLICY_ROUND_ROBIN: RoundRobinNodePolicy,
+    NODE_POLICY_STICKY: StickyNodePolicy,
+    }
+
+# Node discovery
+_EMPTY_NODE_SNAPSHOT = RemoteExecutionNodeSnapshot(0, {})
+
+# Tracing
+_trace_hooks = ()
+_span_ids = _itertools.count(1)
+_null_span = _RemoteExecutionNullSpan()
+_current_span = _contextvars.ContextVar('remote_execution_span', default=None)
+_current_tags = _contextvars.ContextVar('remote_execution_trace_tags', default=None)
+
 # Log handling
 _logger = _logging.getLogger(__name__)
 _log_handler = _logging.StreamHandler()
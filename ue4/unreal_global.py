@@ -6,10 +6,17 @@ from __future__ import annotations
 
 import os
 import sys
+import ast
+import json
+import tempfile
 import subprocess
 from subprocess import CompletedProcess, Popen
 import time
-from typing import Any, Union, Sequence, Callable, cast, Optional, Iterator
+import socket
+import threading
+import weakref
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Union, Sequence, Callable, cast, Optional, Iterator, TYPE_CHECKING
 from contextlib import contextmanager
 from dataclasses import dataclass, field, InitVar
 from pathlib import Path
@@ -17,15 +24,32 @@ from yaml import CLoader, load, dump, CDumper
 from box import Box
 from enum import Enum, auto
 
-from .remote_execution import RemoteExecution, RemoteExecutionConfig
+from .remote_execution import (
+    RemoteExecution,
+    RemoteExecutionConfig,
+    DEFAULT_FAN_OUT_WORKERS,
+    DEFAULT_STREAM_BUFFERED_LINES,
+    MODE_EXEC_FILE,
+    MODE_EVAL_STATEMENT,
+    trace_span,
+    trace_tags,
+)
 from importlib_resources import files
-from .utils import close_all_app, is_any_running, logging
+from .utils import is_any_running, logging, process_registry
+
+if TYPE_CHECKING:
+    from .import_manifest import ImportManifest
+    from .process_sampler import ProcessSampler
 
 # Error Class
 class Unreal4ConfigError(ValueError):
     pass
 
 
+class EditorStartupError(RuntimeError):
+    pass
+
+
 # Enum
 # Struct
 global_remote = RemoteExecution()
@@ -61,6 +85,20 @@ class UnrealRemoteResponse:
         self.output = [UnrealRemoteOutput(**o) for o in output]
 
 
+@dataclass
+class UnrealRemoteNodeResponse:
+    """Response from one editor of a fan-out remote request"""
+
+    node_id: str
+    response: Optional[UnrealRemoteResponse] = None
+    error: str = field(default_factory=str)
+    latency: float = field(default=0.0)
+
+    @property
+    def success(self) -> bool:
+        return bool(self.response and self.response.success)
+
+
 @dataclass
 class UnrealRemoteInfo:
     user: str
@@ -96,6 +134,88 @@ class AssetImportProperties:
     lod_number: int = field(default=0)
 
 
+@dataclass
+class AssetImportResult:
+    """Report for one asset of a batched import"""
+
+    fbx_file_path: str
+    game_path: str
+    success: bool = field(default=False)
+    imported_object_paths: list[str] = field(default_factory=list)
+    error: str = field(default_factory=str)
+    skipped: bool = field(default=False)
+
+
+# The editor side of Unreal4.import_assets. It imports the assets described by a list of specs (see
+# Unreal4._import_spec) with one import_asset_tasks call per chunk, and reports each asset as a JSON line
+# after IMPORT_REPORT_MARKER, or into a file when the report path is set (a cmdlet's output isn't captured).
+IMPORT_REPORT_MARKER = "ue4_import_report:"
+_IMPORT_ASSETS_SCRIPT = '''
+import json
+import unreal
+
+
+def _import_options(spec):
+    options = unreal.FbxImportUI()
+    options.auto_compute_lod_distances = spec["auto_compute_lod_distances"]
+    options.lod_number = spec["lod_number"]
+    options.import_as_skeletal = spec["skeletal_mesh"]
+    options.import_animations = spec["animation"]
+    options.import_materials = spec["import_materials"]
+    options.import_textures = spec["import_textures"]
+    options.import_mesh = spec["import_mesh"]
+    options.static_mesh_import_data.generate_lightmap_u_vs = spec["generate_lightmap_uv"]
+    options.lod_distance0 = spec["lod_distance0"]
+    if spec["skeletal_mesh"]:
+        options.mesh_type_to_import = unreal.FBXImportType.FBXIT_SKELETAL_MESH
+        options.skeletal_mesh_import_data.import_mesh_lo_ds = spec["lods"]
+    else:
+        options.mesh_type_to_import = unreal.FBXImportType.FBXIT_STATIC_MESH
+        options.static_mesh_import_data.import_mesh_lo_ds = spec["lods"]
+    if spec["animation"]:
+        skeleton_asset = unreal.load_asset(spec["skeleton_game_path"])
+        if not skeleton_asset:
+            raise RuntimeError("Unreal could not find a skeleton here: " + spec["skeleton_game_path"])
+        options.set_editor_property("skeleton", skeleton_asset)
+        options.set_editor_property("original_import_type", unreal.FBXImportType.FBXIT_ANIMATION)
+        options.set_editor_property("mesh_type_to_import", unreal.FBXImportType.FBXIT_ANIMATION)
+        options.anim_sequence_import_data.set_editor_property("preserve_local_transform", True)
+    return options
+
+
+def _import_assets(specs, chunk_size, report_path):
+    report = []
+    for start in range(0, len(specs), chunk_size):
+        tasks = []
+        for spec in specs[start : start + chunk_size]:
+            entry = {"success": False, "imported_object_paths": [], "error": ""}
+            report.append(entry)
+            try:
+                task = unreal.AssetImportTask()
+                task.filename = spec["fbx_file_path"]
+                task.destination_path = spec["game_path"]
+                task.automated = spec["automated"]
+                task.replace_existing = spec["replace_existing"]
+                task.options = _import_options(spec)
+            except Exception as e:
+                entry["error"] = str(e)
+                continue
+            tasks.append((task, entry))
+        if tasks:
+            unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([task for task, _ in tasks])
+        for task, entry in tasks:
+            entry["imported_object_paths"] = [str(path) for path in task.get_editor_property("imported_object_paths")]
+            entry["success"] = bool(entry["imported_object_paths"])
+            if not entry["success"]:
+                entry["error"] = "Nothing was imported from " + task.filename
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f)
+    else:
+        print(IMPORT_REPORT_MARKER + json.dumps(report))
+'''
+
+
 # CoreClass
 
 
@@ -154,6 +274,214 @@ class Unreal4Config:
         return remote_config
 
 
+# The line the editor logs once the engine has initialized, which is how EditorHandle knows an editor is ready
+# when remote execution can't discover it
+EDITOR_READY_LOG_MARKER = "Engine is initialized"
+EDITOR_READY_POLL_INTERVAL = 0.1
+
+
+class EditorHandle:
+    """
+    An editor process launched by Unreal4.run_editor. It can be used like the Popen it wraps, and its ``ready`` future
+    resolves with the editor's UnrealRemoteInfo as soon as the editor is discovered by remote execution, so work can be
+    sent to it the moment it can run (rather than after a guessed sleep).
+
+    The editor's node is the first node discovered by remote_exec after the launch on this machine for the launched
+    project. Editors of one project launched at the same time are given their nodes in launch order, so they may swap
+    (EditorPool checks each node's process ID). When remote execution isn't running, the handle falls back to waiting
+    for EDITOR_READY_LOG_MARKER in the editor's log, and ``ready`` resolves with None. That fallback is skipped while
+    another editor launched for the same log is running, as the editors then can't be told apart by their logs (the
+    one that starts second writes "<Project>_2.log"). If the editor exits first, ``ready`` fails with EditorStartupError.
+
+    ``timings`` has the seconds from the launch to each startup phase that has been reached: "process_started",
+    "engine_initialized" (when seen in the log) and "node_discovered".
+    """
+
+    # the launches of each log file, to tell when its editors overlap (log files are shared by every RemoteExecution)
+    _log_lock = threading.Lock()
+    _log_handles: dict[str, weakref.WeakSet[EditorHandle]] = {}
+
+    def __init__(
+        self,
+        process: Popen,
+        project_path: str,
+        log_path: str,
+        remote_exec: RemoteExecution,
+        known_node_ids: set[str],
+        launch_started: float,
+    ):
+        """
+        :param object process: The editor process.
+        :param str project_path: The project the editor was launched with.
+        :param str log_path: The editor's log file.
+        :param object remote_exec: The remote execution session that discovers the editor.
+        :param set known_node_ids: The IDs of the nodes discovered before the launch, which can't be the editor's.
+        :param float launch_started: The time.perf_counter() of the launch.
+        """
+        self.process = process
+        self.project_path = project_path
+        self.log_path = log_path
+        self.remote_exec = remote_exec
+        self.launched_at = time.time()
+        self.ready: Future = Future()
+        self.timings: dict[str, float] = {}
+        self._launch_started = launch_started
+        self._known_node_ids = known_node_ids
+        self._log_ambiguous = False
+        self._record_timing("process_started")
+
+        log_key = _normalize_path(log_path)
+        with self._log_lock:
+            handles = self._log_handles.setdefault(log_key, weakref.WeakSet())
+            for handle in handles:
+                if handle.process.poll() is None:
+                    handle._log_ambiguous = self._log_ambiguous = True
+            handles.add(self)
+        if remote_exec.is_running:
+            discovery = _EditorDiscovery.get(remote_exec)
+            discovery.add(self)
+            self.ready.add_done_callback(lambda _: discovery.remove(self))
+        threading.Thread(target=self._watch, name=f"EditorHandle-{process.pid}", daemon=True).start()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.process, name)
+
+    @property
+    def startup_seconds(self) -> Optional[float]:
+        return self.timings.get("node_discovered", self.timings.get("engine_initialized"))
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> Optional[UnrealRemoteInfo]:
+        """
+        :param float timeout: The maximum seconds to wait, or None to wait forever.
+        :return UnrealRemoteInfo: The editor's node (None if it was found ready from its log).
+        :raises EditorStartupError: If the editor exited before it was ready.
+        :raises TimeoutError: If the editor wasn't ready in time.
+        """
+        return self.ready.result(timeout)
+
+    def matches(self, node: dict) -> bool:
+        """
+        :param dict node: A discovered node.
+        :return bool: True if the node could be this editor.
+        """
+        if node["node_id"] in self._known_node_ids:
+            return False
+        if node.get("machine", "").casefold() != socket.gethostname().casefold():
+            return False
+        project_root = node.get("project_root", "")
+        if not project_root:
+            return node.get("project_name") == Path(self.project_path).stem
+        return _normalize_path(project_root) == _normalize_path(os.path.dirname(self.project_path))
+
+    def _record_timing(self, phase: str):
+        self.timings.setdefault(phase, time.perf_counter() - self._launch_started)
+
+    def _node_discovered(self, node: dict):
+        self._record_timing("node_discovered")
+        self._set_ready(UnrealRemoteInfo(**node))
+
+    def _watch(self):
+        # the last run's log is only skipped while it is still there (the editor moves it aside and starts a new one)
+        try:
+            stat = os.stat(self.log_path)
+            log_file_id, log_offset = (stat.st_dev, stat.st_ino), stat.st_size
+        except OSError:
+            log_file_id, log_offset = None, 0
+        log_tail = b""
+        marker = EDITOR_READY_LOG_MARKER.encode("utf-8")
+        while not self.ready.done():
+            if "engine_initialized" not in self.timings:
+                try:
+                    stat = os.stat(self.log_path)
+                    if (stat.st_dev, stat.st_ino) != log_file_id or stat.st_size < log_offset:
+                        log_file_id, log_offset, log_tail = (stat.st_dev, stat.st_ino), 0, b""
+                    with open(self.log_path, "rb") as f:
+                        f.seek(log_offset)
+                        data = log_tail + f.read()
+                    log_offset += len(data) - len(log_tail)
+                    log_tail = data[-len(marker) :]
+                    if marker in data:
+                        self._record_timing("engine_initialized")
+                        if not self.remote_exec.is_running and not self._log_ambiguous:
+                            self._set_ready(None)
+                except OSError:
+                    pass
+            returncode = self.process.poll()
+            if returncode is not None:
+                self._set_ready(
+                    exception=EditorStartupError(
+                        f"The editor (pid {self.process.pid}) exited with {returncode} before it was ready"
+                    )
+                )
+            time.sleep(EDITOR_READY_POLL_INTERVAL)
+
+    def _set_ready(self, result: Optional[UnrealRemoteInfo] = None, exception: Exception = None):
+        # the discovery callback and the watch thread may race to resolve the future
+        try:
+            if exception:
+                self.ready.set_exception(exception)
+            else:
+                self.ready.set_result(result)
+        except InvalidStateError:
+            pass
+
+
+class _EditorDiscovery:
+    """
+    The editor launches waiting to be discovered by one RemoteExecution, and the nodes they have been given.
+    """
+
+    _instances: weakref.WeakKeyDictionary[RemoteExecution, _EditorDiscovery] = weakref.WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, remote_exec: RemoteExecution):
+        self._lock = threading.Lock()
+        self._pending: list[EditorHandle] = []
+        self._claimed_node_ids: set[str] = set()
+        remote_exec.add_node_added_callback(self._node_added)
+        remote_exec.add_node_lost_callback(self._node_lost)
+
+    @classmethod
+    def get(cls, remote_exec: RemoteExecution) -> _EditorDiscovery:
+        with cls._instances_lock:
+            discovery = cls._instances.get(remote_exec)
+            if discovery is None:
+                discovery = cls._instances[remote_exec] = cls(remote_exec)
+            return discovery
+
+    def add(self, handle: EditorHandle):
+        with self._lock:
+            self._pending.append(handle)
+        # nodes discovered between the launch and now
+        for node in handle.remote_exec.node_snapshot:
+            self._node_added(node)
+
+    def remove(self, handle: EditorHandle):
+        with self._lock:
+            if handle in self._pending:
+                self._pending.remove(handle)
+
+    def _node_added(self, node: dict):
+        with self._lock:
+            if node["node_id"] in self._claimed_node_ids:
+                return
+            # the earliest launch waiting for a node like this one gets it
+            handle = next((h for h in self._pending if h.matches(node)), None)
+            if not handle:
+                return
+            self._claimed_node_ids.add(node["node_id"])
+            self._pending.remove(handle)
+        handle._node_discovered(node)
+
+    def _node_lost(self, node: dict):
+        with self._lock:
+            self._claimed_node_ids.discard(node["node_id"])
+
+
+def _normalize_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path)).replace("\\", "/").rstrip("/")
+
+
 class Unreal4:
     # Global Remote Exec Instance
 
@@ -166,8 +494,14 @@ class Unreal4:
 
     # private
 
-    def __init__(self, config: Unreal4Config = None):
+    def __init__(self, config: Unreal4Config = None, process_sampler: ProcessSampler = None):
+        """
+        :param object config: The editor and project to use, or None to load them from the config file.
+        :param object process_sampler: A ProcessSampler to track every editor launched by run_editor, if any.
+        """
         self._config = config
+        self.process_sampler = process_sampler
+        self.editor: Optional[EditorHandle] = None
 
     @property
     def config(self):
@@ -177,13 +511,25 @@ class Unreal4:
 
     # public
     @contextmanager
-    def open(self, wait_before_close: int = 1) -> Iterator[Unreal4]:
+    def open(
+        self, wait_before_close: float = 1, ready_timeout: Optional[float] = None
+    ) -> Iterator[Unreal4]:
+        """
+        Run the editor for the duration of the context (as ``self.editor``), closing the editors launched before it first.
+
+        :param float wait_before_close: The maximum seconds to let the editor exit by itself at the end, before it is closed.
+        :param float ready_timeout: The maximum seconds to wait for the editor to be ready before entering the context, or None not to wait.
+        """
         self.close_all_editor()
+        self.editor = None
         try:
-            self.run_editor()
+            self.editor = self.run_editor()
+            if ready_timeout is not None:
+                self.editor.wait_until_ready(ready_timeout)
             yield self
         finally:
-            time.sleep(wait_before_close)
+            if self.editor is not None:
+                process_registry.wait_for_exit([self.editor.pid], timeout=wait_before_close)
             self.close_all_editor()
 
     ## getter
@@ -199,13 +545,30 @@ class Unreal4:
     ) -> list[UnrealRemoteInfo]:
         return [UnrealRemoteInfo(**n) for n in remote_exec.remote_nodes]
 
+    @staticmethod
+    def wait_for_running_unreal_remote(
+        timeout: Optional[float] = None,
+        predicate: Optional[Callable[[UnrealRemoteInfo], bool]] = None,
+        remote_exec: RemoteExecution = global_remote,
+    ) -> Optional[UnrealRemoteInfo]:
+        node = remote_exec.wait_for_node(
+            (lambda n: predicate(UnrealRemoteInfo(**n))) if predicate else None,
+            timeout,
+        )
+        return UnrealRemoteInfo(**node) if node else None
+
     @staticmethod
     def is_any_unreal_running() -> bool:
         return is_any_running("UE4.+")
 
     @staticmethod
-    def close_all_editor():
-        close_all_app("UE4.+")
+    def close_all_editor(timeout: float = 10):
+        """
+        Close every editor launched by run_editor (and their children), leaving any other editors on the machine alone.
+
+        :param float timeout: The seconds to let the editors exit by themselves, before they are killed.
+        """
+        process_registry.terminate(timeout=timeout)
 
     def run_editor(
         self,
@@ -217,9 +580,20 @@ class Unreal4:
         run_process_kws: dict[str, Any] = {},
         custom_editor_path: str = "",
         custom_project_path: str = "",
-        as_cmd: bool = False
-    ) -> Union[Popen, CompletedProcess, Any]:
+        as_cmd: bool = False,
+        remote_exec: RemoteExecution = global_remote,
+    ) -> Union[EditorHandle, CompletedProcess, Any]:
+        """
+        Launch the editor.
+
+        A launched editor (rather than a commandlet, or a process run to completion, eg, by subprocess.run) is returned
+        as an EditorHandle, whose ``ready`` future resolves once remote_exec discovers the editor.
+
+        :param object remote_exec: The remote execution session that discovers the editor.
+        """
+        launch_started = time.perf_counter()
         argv.append('-ExecCmds="{}"'.format(";".join(consolevariables)))
+        log_file = None
         if log:
             try:
                 log_file = Path(cast(str, log))
@@ -241,11 +615,27 @@ class Unreal4:
         if as_cmd:
             editor_path = editor_path.replace("UE4Editor", "UE4Editor-Cmd")
         logging.info(f"Exec {editor_path} {project_path} {argv}")
-        return run_process_callable(
+        known_node_ids = {node["node_id"] for node in remote_exec.node_snapshot}
+        process = run_process_callable(
             [editor_path, project_path, *argv],
             *run_process_argv,
             **run_process_kws,
         )
+        # a process that has already finished (eg, from subprocess.run) has no pid to follow
+        if not getattr(process, "pid", None):
+            return process
+        process_registry.register(process.pid)
+        if self.process_sampler:
+            self.process_sampler.track(process.pid, f"{Path(editor_path).stem}:{process.pid}")
+        if as_cmd or any(str(arg).startswith("-run=") for arg in argv):
+            # a commandlet never appears in discovery, so it would only take the node of a later editor launch
+            return process
+        if not (log_file and log_file.exists()):
+            # the editor's default log
+            log_file = Path(project_path).parent / "Saved" / "Logs" / f"{Path(project_path).stem}.log"
+        return EditorHandle(
+            process, project_path, str(log_file), remote_exec, known_node_ids, launch_started
+        )
 
     def run_render(
         self,
@@ -306,13 +696,7 @@ class Unreal4:
         log: Union[bool, str] = False,
         timeout: int = None,
     ) -> CompletedProcess:
-        use_cmd = True
-        cmd = ["-run=pythonscript", f"-script={python_file}"]
-
-        if fully_initialize:
-            use_cmd = False
-            cmd = [f'-ExecutePythonScript="{python_file}"']
-
+        cmd, use_cmd = Unreal4.python_cmdlet_argv(python_file, fully_initialize)
         return cast(
             CompletedProcess,
             self.run_editor(
@@ -330,47 +714,263 @@ class Unreal4:
             ),
         )
 
+    @staticmethod
+    def python_cmdlet_argv(
+        python_file: str, fully_initialize: bool = False
+    ) -> tuple[list[str], bool]:
+        """
+        Get the editor arguments that run a python script (or command) as run_python_cmdlet does.
+
+        :param str python_file: The python script file (or command) to run.
+        :param bool fully_initialize: True to run the script in a fully initialized editor, rather than the pythonscript commandlet.
+        :return tuple: The arguments, and whether they should be run with UE4Editor-Cmd.
+        """
+        if fully_initialize:
+            return [f'-ExecutePythonScript="{python_file}"'], False
+        return ["-run=pythonscript", f"-script={python_file}"], True
+
     @staticmethod
     def run_python_remote(
         commands: str,
         remote_exec: RemoteExecution = global_remote,
         failed_connection_attempts: int = 0,
         max_failed_connection_attempts: int = 50,
+        policy: Optional[str] = None,
+        key: Optional[str] = None,
+        invalidate_paths: Optional[Sequence[str]] = None,
     ) -> UnrealRemoteResponse:
         """
         This function finds the open unreal editor with remote connection enabled, and sends it python commands.
+        When several editors are open, the editor is picked by the node selection policy, using live per-editor load.
+        The command connection is kept open by ``remote_exec.session`` and reused by later calls,
+        so only the first command sent to an editor pays for the connection handshake.
 
         :param object remote_exec: A RemoteExecution instance.
         :param str commands: A formatted string of python commands that will be run by the engine.
         :param int failed_connection_attempts: A counter that keeps track of how many times an editor connection attempt
         was made.
+        :param str policy: The node selection policy (one of the remote_execution NODE_POLICY_ constants),
+        or None to use ``remote_exec.session.node_policy`` (least in-flight by default).
+        :param str key: The key used by the sticky policy, so related commands go to the same editor.
+        :param list invalidate_paths: The asset or directory paths the commands change (eg, by importing, renaming,
+        deleting or saving), whose results cached by run_python_remote_cached are dropped. Pass ["/"] if anything may change.
         """
-        # wait a tenth of a second before attempting to connect
-        time.sleep(0.1)
-        try:
-            # try to connect to an editor
-            for node in remote_exec.remote_nodes:
-                remote_exec.open_command_connection(node.get("node_id"))
-
-            # if a connection is made
-            if remote_exec.has_command_connection():
-                # run the import commands and save the response in the global unreal_response variable
-                return UnrealRemoteResponse(
-                    **remote_exec.run_command(commands, unattended=False)
+        start_time = time.perf_counter()
+        with trace_span("Unreal4.run_python_remote") as span:
+            node_id = Unreal4._get_remote_node_id(
+                remote_exec,
+                failed_connection_attempts,
+                max_failed_connection_attempts,
+                policy,
+                key,
+            )
+            if not node_id:
+                span.set_tag("error", "Failed To Connect To Unreal")
+                return UnrealRemoteResponse("", "Failed To Connect To Unreal")
+            node_time = time.perf_counter()
+            try:
+                response = UnrealRemoteResponse(
+                    **remote_exec.session.run_command(node_id, commands, unattended=False)
                 )
+            finally:
+                # a failed write may still have changed something, so invalidate either way
+                if invalidate_paths is not None:
+                    remote_exec.session.invalidate_cache(invalidate_paths, node_id)
+        remote_exec.metrics.record(node_id, "node_wait_seconds", node_time - start_time)
+        remote_exec.metrics.record(
+            node_id, "python_remote_seconds", time.perf_counter() - start_time
+        )
+        return response
 
-            # otherwise make an other attempt to connect to the engine
-            else:
-                if failed_connection_attempts < max_failed_connection_attempts:
-                    return Unreal4.run_python_remote(
-                        commands, remote_exec, failed_connection_attempts + 1
-                    )
-                else:
-                    remote_exec.stop()
-        # shutdown the connection
-        finally:
-            remote_exec.stop()
-        return UnrealRemoteResponse("", "Failed To Connect To Unreal")
+    @staticmethod
+    def run_python_remote_cached(
+        commands: str,
+        paths: Optional[Sequence[str]] = None,
+        ttl: Optional[float] = None,
+        remote_exec: RemoteExecution = global_remote,
+        exec_mode: str = MODE_EXEC_FILE,
+        cache_failures: bool = False,
+        policy: Optional[str] = None,
+        key: Optional[str] = None,
+    ) -> UnrealRemoteResponse:
+        """
+        This function sends read-only python commands to the open unreal editor like run_python_remote, but answers
+        repeated commands from ``remote_exec.result_cache`` without leaving the process, until the cached response expires
+        or a write to one of its paths invalidates it (see the invalidate_paths of run_python_remote).
+
+        :param str commands: A formatted string of python commands that will be run by the engine. They must not change anything.
+        :param list paths: The asset or directory paths the response depends on, or None if it may depend on anything.
+        :param float ttl: The number of seconds to cache the response for, or None to use the cache's default.
+        :param object remote_exec: A RemoteExecution instance.
+        :param str exec_mode: The execution mode (one of the remote_execution MODE_ constants).
+        :param bool cache_failures: True to also cache a failed response (eg, when failing means the asset doesn't exist).
+        :param str policy: The node selection policy, or None to use ``remote_exec.session.node_policy``.
+        :param str key: The key used by the sticky policy.
+        :return UnrealRemoteResponse: The (possibly cached) response.
+        """
+        node_id = Unreal4._get_remote_node_id(remote_exec, policy=policy, key=key)
+        if not node_id:
+            return UnrealRemoteResponse("", "Failed To Connect To Unreal")
+        return UnrealRemoteResponse(
+            **remote_exec.session.run_cached_command(
+                node_id,
+                commands,
+                paths,
+                ttl,
+                unattended=False,
+                exec_mode=exec_mode,
+                cache_failures=cache_failures,
+            )
+        )
+
+    @staticmethod
+    def invalidate_remote_cache(
+        paths: Optional[Sequence[str]] = None, remote_exec: RemoteExecution = global_remote
+    ) -> int:
+        """
+        Drop the responses cached by run_python_remote_cached that depend on any of the given paths, for every project.
+        Use this after changing assets outside of run_python_remote (eg, from a cmdlet or by hand).
+
+        :param list paths: The asset or directory paths that changed, or None to drop every cached response.
+        :param object remote_exec: A RemoteExecution instance.
+        :return int: The number of cached responses that were dropped.
+        """
+        return remote_exec.session.invalidate_cache(paths)
+
+    @staticmethod
+    def remote_cache_stats(remote_exec: RemoteExecution = global_remote) -> dict:
+        """
+        Get the hit and miss counts of the responses cached by run_python_remote_cached.
+
+        :param object remote_exec: A RemoteExecution instance.
+        :return dict: The hits, misses, hit rate, expirations, evictions, invalidations and number of cached responses.
+        """
+        return remote_exec.result_cache.stats()
+
+    @staticmethod
+    def run_python_remote_streaming(
+        commands: str,
+        on_output: Callable[[UnrealRemoteOutput], Any],
+        remote_exec: RemoteExecution = global_remote,
+        max_buffered_lines: int = DEFAULT_STREAM_BUFFERED_LINES,
+        policy: Optional[str] = None,
+        key: Optional[str] = None,
+    ) -> UnrealRemoteResponse:
+        """
+        This function sends python commands to the open unreal editor like run_python_remote, but calls on_output
+        with each line of print and unreal.log output as it happens, instead of returning it all once the commands finish.
+        Only max_buffered_lines lines are held at once, so a huge log doesn't need to fit in memory.
+        Raising from on_output stops reading the output (eg, on the first error line), but the commands keep running in the editor.
+
+        :param str commands: A formatted string of python commands that will be run by the engine.
+        :param on_output: Called with an UnrealRemoteOutput for each line of output.
+        :param object remote_exec: A RemoteExecution instance.
+        :param int max_buffered_lines: The maximum number of output lines waiting for on_output, before the editor is made to wait.
+        :param str policy: The node selection policy, or None to use ``remote_exec.session.node_policy``.
+        :param str key: The key used by the sticky policy.
+        :return UnrealRemoteResponse: The response once the commands have finished (its output only holds lines that were not streamed).
+        """
+        node_id = Unreal4._get_remote_node_id(remote_exec, policy=policy, key=key)
+        if not node_id:
+            return UnrealRemoteResponse("", "Failed To Connect To Unreal")
+        with remote_exec.session.stream_command(
+            node_id, commands, unattended=False, max_buffered_lines=max_buffered_lines
+        ) as stream:
+            for entry in stream:
+                on_output(UnrealRemoteOutput(**entry))
+            return UnrealRemoteResponse(**stream.result())
+
+    @staticmethod
+    def remote_stats(remote_exec: RemoteExecution = global_remote) -> dict:
+        """
+        Get the timings and counts recorded for the remote commands sent through remote_exec, per editor node id
+        (the "*" entry combines every editor). Timings are in seconds and summarized by count, mean, min, max and quantiles.
+
+        :param object remote_exec: A RemoteExecution instance.
+        :return dict: The stats for each editor node id.
+        """
+        return remote_exec.stats()
+
+    @staticmethod
+    def run_python_remote_batch(
+        commands: Sequence[str],
+        remote_exec: RemoteExecution = global_remote,
+        batch_size: int = 100,
+        policy: Optional[str] = None,
+        key: Optional[str] = None,
+    ) -> list[UnrealRemoteResponse]:
+        """
+        This function sends many independent python commands to the open unreal editor, packing up to batch_size
+        of them into each round trip. Every command still gets its own success, result and output.
+        A command that is a single expression returns its repr as the result.
+        The editor is picked once by the node selection policy, and every batch is sent to it,
+        so later commands can use names defined by earlier ones.
+
+        :param list commands: The python commands that will be run by the engine, in order.
+        :param object remote_exec: A RemoteExecution instance.
+        :param int batch_size: The maximum number of commands sent in one round trip.
+        :param str policy: The node selection policy, or None to use ``remote_exec.session.node_policy``.
+        :param str key: The key used by the sticky policy.
+        :return list: An UnrealRemoteResponse for each command.
+        """
+        node_id = Unreal4._get_remote_node_id(remote_exec, policy=policy, key=key)
+        if not node_id:
+            return [
+                UnrealRemoteResponse("", "Failed To Connect To Unreal", command)
+                for command in commands
+            ]
+        responses = []
+        for i in range(0, len(commands), max(1, batch_size)):
+            responses.extend(
+                UnrealRemoteResponse(**data)
+                for data in remote_exec.session.run_batch(
+                    node_id, commands[i : i + batch_size], unattended=False
+                )
+            )
+        return responses
+
+    @staticmethod
+    def _get_remote_node_id(
+        remote_exec: RemoteExecution,
+        failed_connection_attempts: int = 0,
+        max_failed_connection_attempts: int = 50,
+        policy: Optional[str] = None,
+        key: Optional[str] = None,
+    ) -> Optional[str]:
+        # wait for an editor to be discovered, for up to a tenth of a second per remaining attempt
+        if not remote_exec.wait_for_node(
+            timeout=max(0, max_failed_connection_attempts - failed_connection_attempts) * 0.1
+        ):
+            return None
+        return remote_exec.session.select_node(policy, key)
+
+    @staticmethod
+    def run_python_remote_all(
+        commands: Union[str, dict[str, str]],
+        remote_exec: RemoteExecution = global_remote,
+        max_workers: int = DEFAULT_FAN_OUT_WORKERS,
+    ) -> dict[str, UnrealRemoteNodeResponse]:
+        """
+        This function sends python commands to every open unreal editor at once.
+        A failure on one editor is reported in its response and does not stop the others.
+
+        :param commands: The python commands to run on every editor, or a dict of node_id to the commands to run on that editor.
+        :param object remote_exec: A RemoteExecution instance.
+        :param int max_workers: The maximum number of editors to send commands to at the same time.
+        :return dict: An UnrealRemoteNodeResponse for each node_id.
+        """
+        results = remote_exec.session.run_command_on_nodes(
+            commands, unattended=False, max_workers=max_workers
+        )
+        return {
+            node_id: UnrealRemoteNodeResponse(
+                node_id,
+                response=UnrealRemoteResponse(**result.data) if result.data else None,
+                error=str(result.error or ""),
+                latency=result.latency,
+            )
+            for node_id, result in results.items()
+        }
 
     def import_asset(
         self,
@@ -378,13 +978,18 @@ class Unreal4:
         properties: AssetImportProperties,
         as_remote: bool = False,
         remote_exec: RemoteExecution = global_remote,
+        manifest: Optional[ImportManifest] = None,
     ) -> bool:
         """
         This function imports an asset to unreal based on the asset data in the provided dictionary.
 
         :param dict asset_data: A dictionary of import parameters.
         :param object properties: The property group that contains variables that maintain the addon's correct state.
+        :param object manifest: An ImportManifest; the import is skipped if the source and options are unchanged
+        since the import it last recorded, and a successful import is recorded (and saved).
         """
+        if manifest and not manifest.needs_import(asset_data, properties):
+            return True
         # start a connection to the engine that lets you send python strings
         import_command = "\n".join(
             [
@@ -434,21 +1039,183 @@ class Unreal4:
         )
 
         # send over the python code as a string
-        if as_remote:
-            unreal_response = Unreal4.run_python_remote(
-                import_command,
-                remote_exec,
+        with trace_span(
+            "Unreal4.import_asset",
+            fbx_file_path=asset_data.fbx_file_path,
+            game_path=asset_data.game_path,
+            as_remote=as_remote,
+        ), trace_tags(source="Unreal4.import_asset"):
+            if as_remote:
+                unreal_response = Unreal4.run_python_remote(
+                    import_command,
+                    remote_exec,
+                    invalidate_paths=[asset_data.game_path],
+                )
+
+                # if there is an error report it
+                success = True
+                if unreal_response:
+                    if unreal_response.result != "None":
+                        print(unreal_response.result)
+                        success = False
+            else:
+                p = self.run_python_cmdlet(import_command)
+                Unreal4.invalidate_remote_cache([asset_data.game_path], remote_exec)
+                success = not bool(p.returncode)
+        if success and manifest:
+            manifest.record(asset_data, properties)
+            manifest.save()
+        return success
+
+    def import_assets(
+        self,
+        assets: Sequence[tuple[AssetImportData, AssetImportProperties]],
+        chunk_size: int = 50,
+        as_remote: bool = False,
+        remote_exec: RemoteExecution = global_remote,
+        manifest: Optional[ImportManifest] = None,
+    ) -> list[AssetImportResult]:
+        """
+        This function imports many assets to unreal, passing up to chunk_size import tasks to each
+        import_asset_tasks call. Remotely, each chunk is one round trip; otherwise every chunk is imported
+        by a single cmdlet run, so the editor is only launched once.
+
+        :param list assets: The asset data and import properties of each asset to import.
+        :param int chunk_size: The maximum number of assets imported by one import_asset_tasks call.
+        :param bool as_remote: True to import in the open editor, False to launch a cmdlet.
+        :param object remote_exec: A RemoteExecution instance.
+        :param object manifest: An ImportManifest; assets whose source and options are unchanged since the import it
+        last recorded are skipped (reported as skipped successes), and successful imports are recorded (and saved).
+        :return list: An AssetImportResult for each asset, in order.
+        """
+        if manifest:
+            # matched by index, as the same AssetImportData may be imported more than once (eg, with other properties)
+            changed = manifest.changed_indices(assets)
+            results = dict(
+                zip(
+                    changed,
+                    self.import_assets([assets[i] for i in changed], chunk_size, as_remote, remote_exec)
+                    if changed
+                    else [],
+                )
             )
+            report = []
+            for i, (asset_data, properties) in enumerate(assets):
+                if i in results:
+                    result = results[i]
+                    if result.success:
+                        manifest.record(asset_data, properties, result.imported_object_paths)
+                else:
+                    result = AssetImportResult(
+                        asset_data.fbx_file_path,
+                        asset_data.game_path,
+                        True,
+                        manifest.imported_object_paths(asset_data.fbx_file_path),
+                        skipped=True,
+                    )
+                report.append(result)
+            manifest.save()
+            return report
+        chunk_size = max(1, chunk_size)
+        specs = [Unreal4._import_spec(*asset) for asset in assets]
+        game_paths = [asset_data.game_path for asset_data, _ in assets]
+        with trace_span(
+            "Unreal4.import_assets", assets=len(specs), as_remote=as_remote
+        ), trace_tags(source="Unreal4.import_assets"):
+            if as_remote:
+                report = []
+                for i in range(0, len(specs), chunk_size):
+                    report.extend(
+                        Unreal4._import_assets_remote(
+                            specs[i : i + chunk_size],
+                            game_paths[i : i + chunk_size],
+                            remote_exec,
+                        )
+                    )
+            else:
+                report = self._import_assets_cmdlet(specs, chunk_size)
+                Unreal4.invalidate_remote_cache(game_paths, remote_exec)
+        return [
+            AssetImportResult(
+                asset_data.fbx_file_path, asset_data.game_path, **entry
+            )
+            for (asset_data, _), entry in zip(assets, report)
+        ]
 
-            # if there is an error report it
-            if unreal_response:
-                if unreal_response.result != "None":
-                    print(unreal_response.result)
-                    return False
-            return True
-        else:
-            p = self.run_python_cmdlet(import_command)
-            return not bool(p.returncode)
+    @staticmethod
+    def _import_spec(
+        asset_data: AssetImportData, properties: AssetImportProperties
+    ) -> dict[str, Any]:
+        return {
+            "fbx_file_path": asset_data.fbx_file_path,
+            "game_path": asset_data.game_path,
+            "skeleton_game_path": asset_data.skeleton_game_path,
+            "skeletal_mesh": bool(asset_data.skeletal_mesh),
+            "animation": bool(asset_data.animation),
+            "import_mesh": bool(asset_data.import_mesh),
+            "lods": bool(asset_data.lods),
+            "automated": not properties.advanced_ui_import,
+            "replace_existing": properties.replace_existing,
+            "auto_compute_lod_distances": properties.auto_compute_lod_distances,
+            "import_materials": properties.import_materials,
+            "import_textures": properties.import_textures,
+            "generate_lightmap_uv": properties.generate_lightmap_uv,
+            "lod_distance0": float(properties.lod_distance0),
+            "lod_number": int(properties.lod_number),
+        }
+
+    @staticmethod
+    def _import_assets_script(
+        specs: list[dict[str, Any]], chunk_size: int, report_path: str = ""
+    ) -> str:
+        return "\n".join(
+            [
+                _IMPORT_ASSETS_SCRIPT,
+                f"IMPORT_REPORT_MARKER = {IMPORT_REPORT_MARKER!r}",
+                f"_import_assets({specs!r}, {chunk_size}, {report_path!r})",
+            ]
+        )
+
+    @staticmethod
+    def _import_assets_remote(
+        specs: list[dict[str, Any]],
+        game_paths: list[str],
+        remote_exec: RemoteExecution,
+    ) -> list[dict[str, Any]]:
+        unreal_response = Unreal4.run_python_remote(
+            Unreal4._import_assets_script(specs, len(specs)),
+            remote_exec,
+            invalidate_paths=game_paths,
+        )
+        for output in unreal_response.output:
+            if output.output.startswith(IMPORT_REPORT_MARKER):
+                return json.loads(output.output[len(IMPORT_REPORT_MARKER) :])
+        # the whole chunk failed (eg, no editor could be reached)
+        error = unreal_response.result or "No import report was received"
+        return [
+            {"success": False, "imported_object_paths": [], "error": error}
+            for _ in specs
+        ]
+
+    def _import_assets_cmdlet(
+        self, specs: list[dict[str, Any]], chunk_size: int
+    ) -> list[dict[str, Any]]:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            script_path = Path(temp_dir, "import_assets.py").as_posix()
+            report_path = Path(temp_dir, "import_report.json").as_posix()
+            Path(script_path).write_text(
+                Unreal4._import_assets_script(specs, chunk_size, report_path),
+                encoding="utf-8",
+            )
+            p = self.run_python_cmdlet(script_path)
+            try:
+                return json.loads(Path(report_path).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                error = f"The import cmdlet did not write a report (exit code {p.returncode})"
+                return [
+                    {"success": False, "imported_object_paths": [], "error": error}
+                    for _ in specs
+                ]
 
     def asset_exists_remote(
         self, asset_path: str, as_remote: bool=False, remote_exec: RemoteExecution = global_remote
@@ -470,26 +1237,88 @@ class Unreal4:
                 f'\traise RuntimeError("Asset not found")',
             ]
         )
-        unreal_response = Unreal4.run_python_remote(
-            command,
-            remote_exec,
-        )
-        if as_remote:
-            unreal_response = Unreal4.run_python_remote(
-                command,
-                remote_exec,
-            )
+        with trace_span(
+            "Unreal4.asset_exists_remote", asset_path=asset_path, as_remote=as_remote
+        ), trace_tags(source="Unreal4.asset_exists_remote"):
+            if as_remote:
+                # a missing asset is an answer too, so cache failed responses as well
+                unreal_response = Unreal4.run_python_remote_cached(
+                    command,
+                    [asset_path],
+                    remote_exec=remote_exec,
+                    cache_failures=True,
+                )
 
-            # if there is an error report it
-            if unreal_response:
-                if unreal_response.result != "None":
-                    print(unreal_response.result)
-                    return False
-            return True
-        else:
-            p = self.run_python_cmdlet(command)
-            return not bool(p.returncode)
-        return bool(unreal_response.success)
+                # if there is an error report it
+                if unreal_response:
+                    if unreal_response.result != "None":
+                        print(unreal_response.result)
+                        return False
+                return True
+            else:
+                p = self.run_python_cmdlet(command)
+                return not bool(p.returncode)
+
+    @staticmethod
+    def assets_exist(
+        asset_paths: Sequence[str],
+        remote_exec: RemoteExecution = global_remote,
+        chunk_size: int = 5000,
+        policy: Optional[str] = None,
+        key: Optional[str] = None,
+    ) -> dict[str, bool]:
+        """
+        This function checks whether many assets exist in unreal, sending up to chunk_size paths to the open editor per round trip.
+        The editor looks each path up in the asset registry (after it has finished scanning for assets), so no asset is loaded. Answers are cached like
+        run_python_remote_cached, so repeated checks of the same paths don't leave the process.
+
+        :param list asset_paths: The game paths to the unreal assets (eg "/Game/Props/Chair" or "/Game/Props/Chair.Chair").
+        :param object remote_exec: A RemoteExecution instance.
+        :param int chunk_size: The maximum number of paths checked in one round trip.
+        :param str policy: The node selection policy, or None to use ``remote_exec.session.node_policy``.
+        :param str key: The key used by the sticky policy.
+        :return dict: Whether or not each asset path exists.
+        :raises RuntimeError: If the editor could not be reached, or failed to check the paths.
+        """
+        unique_paths = list(dict.fromkeys(asset_paths))
+        exists = {}
+        chunk_size = max(1, chunk_size)
+        with trace_span("Unreal4.assets_exist", paths=len(unique_paths)), trace_tags(
+            source="Unreal4.assets_exist"
+        ):
+            for i in range(0, len(unique_paths), chunk_size):
+                chunk = unique_paths[i : i + chunk_size]
+                object_paths = [Unreal4._asset_object_path(path) for path in chunk]
+                # a single expression, so the editor returns one "0"/"1" flag per path as the result. A freshly started
+                # editor is still scanning for assets, so the scan is finished first (or unscanned assets would be
+                # reported, and cached, as missing)
+                command = (
+                    "(lambda registry, paths: ("
+                    "registry.search_all_assets(True) if registry.is_loading_assets() else None, "
+                    '"".join("1" if registry.get_asset_by_object_path(path).is_valid() else "0" for path in paths)'
+                    ")[1])"
+                    f"(unreal.AssetRegistryHelpers.get_asset_registry(), {object_paths!r})"
+                )
+                response = Unreal4.run_python_remote_cached(
+                    command,
+                    chunk,
+                    remote_exec=remote_exec,
+                    exec_mode=MODE_EVAL_STATEMENT,
+                    policy=policy,
+                    key=key,
+                )
+                if not response.success:
+                    raise RuntimeError(f"Failed to check whether assets exist: {response.result}")
+                flags = ast.literal_eval(response.result)
+                exists.update((path, flag == "1") for path, flag in zip(chunk, flags))
+        return {path: exists[path] for path in asset_paths}
+
+    @staticmethod
+    def _asset_object_path(asset_path: str) -> str:
+        # the asset registry looks assets up by object path ("/Game/Props/Chair.Chair"), not package path
+        asset_path = asset_path.rstrip("/")
+        name = asset_path.rsplit("/", 1)[-1]
+        return asset_path if "." in name else f"{asset_path}.{name}"
 
     PythonExecModes = {
         PythonExecMode.REMOTE: run_python_remote,
@@ -1,4 +1,6 @@
+import functools
 from .unreal_global import Unreal4, UnrealRemoteResponse
+from .remote_execution import trace_tags, MODE_EVAL_STATEMENT
 from typing import Callable, Sequence, Tuple, Union
 from .typings.stubs.unreal426 import unreal
 # try:
@@ -8,10 +10,35 @@ from .typings.stubs.unreal426 import unreal
 
 # AssetRegistry = unreal.AssetRegistryHelpers.get_asset_registry()
 
+# The editor selection can change without any write going through the wrapper, so it is only cached briefly
+SELECTION_CACHE_TTL = 1.0
+
 class AbstractWrapper:
     source_class = "unreal"
     return_as_string = False
 
+
+def trace_source(cls):
+    """
+    Class decorator that tags every remote command sent by a public wrapper classmethod with its source
+    (eg "EditorUtilLibrary.rename_asset"), so the command can be traced back to the wrapper that produced it.
+    """
+    for name, attr in list(vars(cls).items()):
+        if isinstance(attr, classmethod) and not name.startswith("_"):
+            setattr(cls, name, classmethod(_with_source(f"{cls.__name__}.{name}", attr.__func__)))
+    return cls
+
+
+def _with_source(source: str, func: Callable) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with trace_tags(source=source):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@trace_source
 class EditorUtilLibrary:
     """
     SourceClass:
@@ -36,7 +63,7 @@ class EditorUtilLibrary:
         command = f"{cls.source_class}.rename_asset( {asset}, {new_name})"
         if asString:
             return command
-        return Unreal4.run_python_remote(command).result
+        return Unreal4.run_python_remote(command, invalidate_paths=["/"]).result
 
     @classmethod
     def get_selection_set(
@@ -63,7 +90,7 @@ class EditorUtilLibrary:
         command = f"{cls.source_class}.get_selected_assets()"
         if asString:
             return command
-        return Unreal4.run_python_remote(command).result
+        return Unreal4.run_python_remote_cached(command, ttl=SELECTION_CACHE_TTL).result
 
     @classmethod
     def get_selected_asset_data(
@@ -72,7 +99,7 @@ class EditorUtilLibrary:
         command = f"{cls.source_class}.get_selected_asset_data()"
         if asString:
             return command
-        return Unreal4.run_python_remote(command).result
+        return Unreal4.run_python_remote_cached(command, ttl=SELECTION_CACHE_TTL).result
 
     @classmethod
     def get_actor_reference(
@@ -83,6 +110,7 @@ class EditorUtilLibrary:
             return command
         return Unreal4.run_python_remote(command).result
 
+@trace_source
 class SequenceTools:
     """
     SequenceTools = unreal.SequencerTools
@@ -106,6 +134,7 @@ class SequenceTools:
             return command
         return Unreal4.run_python_remote(command).result
 
+@trace_source
 class EditorLevelLibrary:
     r"""
     Utility class to do most of the common functionalities in the World Editor.
@@ -550,6 +579,262 @@ class EditorLevelLibrary:
     #     """
     #     return None
 
+@trace_source
+class EditorAssetLibrary:
+    r"""
+    Utility class to do most of the common functionalities with the ContentBrowser.
+    Queries are answered from the result cache of Unreal4.run_python_remote_cached when repeated,
+    and writes invalidate the cached results for the paths they change.
+
+    **C++ Source:**
+
+    - **Plugin**: EditorScriptingUtilities
+    - **Module**: EditorScriptingUtilities
+    - **File**: EditorAssetLibrary.h
+
+    """
+    source_class = "unreal.EditorAssetLibrary"
+    return_as_string = False
+
+    @classmethod
+    def _query(cls, command: str, paths: Sequence[str]) -> str:
+        return Unreal4.run_python_remote_cached(
+            command, paths, exec_mode=MODE_EVAL_STATEMENT
+        ).result
+
+    @classmethod
+    def _write(cls, command: str, paths: Sequence[str]) -> str:
+        return Unreal4.run_python_remote(command, invalidate_paths=paths).result
+
+    @classmethod
+    def does_asset_exist(cls, asset_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.does_asset_exist(asset_path) -> bool
+        Check if the asset exists in the Content Browser.
+
+        Args:
+            asset_path (str): Asset Path of the asset that we want to verify.
+
+        Returns:
+            bool: True if it does exist and it is valid.
+        """
+        command = f"{cls.source_class}.does_asset_exist({asset_path!r})"
+        if asString:
+            return command
+        return cls._query(command, [asset_path])
+
+    @classmethod
+    def do_assets_exist(cls, asset_paths: Sequence[str], asString: bool = return_as_string) -> str:
+        r"""
+        X.do_assets_exist(asset_paths) -> bool
+        Check if the assets exist in the Content Browser.
+
+        Args:
+            asset_paths (Array(str)): Asset Path of the assets that we want to verify.
+
+        Returns:
+            bool: True if they all exist and are valid.
+        """
+        command = f"{cls.source_class}.do_assets_exist({list(asset_paths)!r})"
+        if asString:
+            return command
+        return cls._query(command, asset_paths)
+
+    @classmethod
+    def does_directory_exist(cls, directory_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.does_directory_exist(directory_path) -> bool
+        Verify if the directory exists on disk.
+
+        Args:
+            directory_path (str): Directory path that we want to verify.
+
+        Returns:
+            bool: True if the directory exists.
+        """
+        command = f"{cls.source_class}.does_directory_exist({directory_path!r})"
+        if asString:
+            return command
+        return cls._query(command, [directory_path])
+
+    @classmethod
+    def list_assets(cls, directory_path: str, recursive: bool = True, include_folder: bool = False, asString: bool = return_as_string) -> str:
+        r"""
+        X.list_assets(directory_path, recursive=True, include_folder=False) -> Array(str)
+        Return the list of all the assets found in the DirectoryPath.
+
+        Args:
+            directory_path (str): Directory path of the asset we want the list from.
+            recursive (bool): The search will be recursive and will look in sub folders.
+            include_folder (bool): The result will include folders name.
+
+        Returns:
+            Array(str): The list of asset found.
+        """
+        command = f"{cls.source_class}.list_assets({directory_path!r}, {recursive}, {include_folder})"
+        if asString:
+            return command
+        return cls._query(command, [directory_path])
+
+    @classmethod
+    def find_asset_data(cls, asset_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.find_asset_data(asset_path) -> AssetData
+        Return AssetData for the AssetPath.
+
+        Args:
+            asset_path (str): Asset Path we are trying to find.
+
+        Returns:
+            AssetData: The AssetData found.
+        """
+        command = f"{cls.source_class}.find_asset_data({asset_path!r})"
+        if asString:
+            return command
+        return cls._query(command, [asset_path])
+
+    @classmethod
+    def rename_asset(cls, source_asset_path: str, destination_asset_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.rename_asset(source_asset_path, destination_asset_path) -> bool
+        Rename an asset (Similar to Move). Will try to checkout the file.
+
+        Args:
+            source_asset_path (str): Asset Path of the asset that we want to move.
+            destination_asset_path (str): Asset Path of the moved asset.
+
+        Returns:
+            bool: True if the operation succeeds.
+        """
+        command = f"{cls.source_class}.rename_asset({source_asset_path!r}, {destination_asset_path!r})"
+        if asString:
+            return command
+        return cls._write(command, [source_asset_path, destination_asset_path])
+
+    @classmethod
+    def rename_directory(cls, source_directory_path: str, destination_directory_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.rename_directory(source_directory_path, destination_directory_path) -> bool
+        Rename an asset directory (Similar to Move). Will try to checkout the files.
+
+        Args:
+            source_directory_path (str): Directory of the assets that we want to rename.
+            destination_directory_path (str): Directory of the renamed assets.
+
+        Returns:
+            bool: True if the operation succeeds.
+        """
+        command = f"{cls.source_class}.rename_directory({source_directory_path!r}, {destination_directory_path!r})"
+        if asString:
+            return command
+        return cls._write(command, [source_directory_path, destination_directory_path])
+
+    @classmethod
+    def duplicate_asset(cls, source_asset_path: str, destination_asset_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.duplicate_asset(source_asset_path, destination_asset_path) -> Object
+        Duplicate an asset from the Content Browser. Will try to checkout the file.
+
+        Args:
+            source_asset_path (str): Asset Path of the asset that we want to copy from.
+            destination_asset_path (str): Asset Path of the duplicated asset.
+
+        Returns:
+            Object: The duplicated object if the operation succeeds.
+        """
+        command = f"{cls.source_class}.duplicate_asset({source_asset_path!r}, {destination_asset_path!r})"
+        if asString:
+            return command
+        return cls._write(command, [destination_asset_path])
+
+    @classmethod
+    def delete_asset(cls, asset_path_to_delete: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.delete_asset(asset_path_to_delete) -> bool
+        Delete the package the assets live in. All objects that live in the package will be deleted.
+
+        Args:
+            asset_path_to_delete (str): Asset Path of the asset that we want to delete.
+
+        Returns:
+            bool: True if the operation succeeds.
+        """
+        command = f"{cls.source_class}.delete_asset({asset_path_to_delete!r})"
+        if asString:
+            return command
+        return cls._write(command, [asset_path_to_delete])
+
+    @classmethod
+    def delete_directory(cls, directory_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.delete_directory(directory_path) -> bool
+        Delete the directory on disk, including all assets in the directory and all its sub folders.
+
+        Args:
+            directory_path (str): Directory path that you want to delete.
+
+        Returns:
+            bool: True if the operation succeeds.
+        """
+        command = f"{cls.source_class}.delete_directory({directory_path!r})"
+        if asString:
+            return command
+        return cls._write(command, [directory_path])
+
+    @classmethod
+    def make_directory(cls, directory_path: str, asString: bool = return_as_string) -> str:
+        r"""
+        X.make_directory(directory_path) -> bool
+        Create the directory on disk and in the Content Browser.
+
+        Args:
+            directory_path (str): Directory path that you want to create.
+
+        Returns:
+            bool: True if the operation succeeds.
+        """
+        command = f"{cls.source_class}.make_directory({directory_path!r})"
+        if asString:
+            return command
+        return cls._write(command, [directory_path])
+
+    @classmethod
+    def save_asset(cls, asset_to_save: str, only_if_is_dirty: bool = True, asString: bool = return_as_string) -> str:
+        r"""
+        X.save_asset(asset_to_save, only_if_is_dirty=True) -> bool
+        Save the packages the assets live in. Will try to checkout the file first.
+
+        Args:
+            asset_to_save (str): Asset Path of the asset that we want to save.
+            only_if_is_dirty (bool): Only checkout/save the asset if it's dirty.
+
+        Returns:
+            bool: True if the operation succeeds.
+        """
+        command = f"{cls.source_class}.save_asset({asset_to_save!r}, {only_if_is_dirty})"
+        if asString:
+            return command
+        return cls._write(command, [asset_to_save])
+
+    @classmethod
+    def save_directory(cls, directory_path: str, only_if_is_dirty: bool = True, recursive: bool = True, asString: bool = return_as_string) -> str:
+        r"""
+        X.save_directory(directory_path, only_if_is_dirty=True, recursive=True) -> bool
+        Save the packages the assets live in inside the directory. Will try to checkout the files first.
+
+        Args:
+            directory_path (str): Directory that will be checked out and saved.
+            only_if_is_dirty (bool): Only checkout asset that are dirty.
+            recursive (bool): The save will be recursive and will look in sub folders.
+
+        Returns:
+            bool: True if the operation succeeds.
+        """
+        command = f"{cls.source_class}.save_directory({directory_path!r}, {only_if_is_dirty}, {recursive})"
+        if asString:
+            return command
+        return cls._write(command, [directory_path])
+
 """
 AssetTools = unreal.AssetToolsHelpers.get_asset_tools()
     rename_referencing_soft_object_paths(packages_to_check, asset_redirector_map)
@@ -1,16 +1,153 @@
 import psutil
 import re
+import getpass
 import logging
+import threading
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
 
 logging.basicConfig(level=logging.DEBUG)
 
-def close_all_app(app_name: str):
-    for p in psutil.process_iter():
-        if re.match(app_name, p.name()):
+_name_matcher = lru_cache(maxsize=None)(re.compile)
+
+def _current_username() -> str:
+    try:
+        return psutil.Process().username()
+    except psutil.Error:
+        return getpass.getuser()
+
+def iter_matching_processes(app_name: str, all_users: bool = False) -> Iterator[psutil.Process]:
+    # only the name (and owner) of each process is read, which matters on machines with thousands of processes
+    match = _name_matcher(app_name).match
+    username = None if all_users else _current_username()
+    for p in psutil.process_iter(attrs=["name", "username"]):
+        if p.info["name"] and match(p.info["name"]) and (all_users or p.info["username"] == username):
+            yield p
+
+def close_all_app(app_name: str, timeout: float = 10, all_users: bool = False):
+    terminate_processes(iter_matching_processes(app_name, all_users), timeout)
+
+def is_any_running(app_name: str, all_users: bool = True) -> bool:
+    return next(iter_matching_processes(app_name, all_users), None) is not None
+
+def terminate_processes(processes: Iterable[psutil.Process], timeout: float = 10) -> list[psutil.Process]:
+    """
+    Ask processes to exit, and kill the ones that haven't after timeout seconds.
+
+    :param list processes: The processes.
+    :param float timeout: The seconds to wait for the processes to exit by themselves.
+    :return list: The processes that couldn't be stopped.
+    """
+    processes = list(processes)
+    for p in processes:
+        try:
+            p.terminate()
+        except psutil.Error:
+            pass
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    for p in alive:
+        try:
             p.kill()
+        except psutil.Error:
+            pass
+    _, alive = psutil.wait_procs(alive, timeout=timeout)
+    return alive
+
+def process_tree(pid: int) -> list[psutil.Process]:
+    """
+    :return list: The children of the process (deepest last) and then the process, or nothing if it has exited.
+    """
+    try:
+        root = psutil.Process(pid)
+        return root.children(recursive=True) + [root]
+    except psutil.Error:
+        return []
+
+def kill_process_tree(pid: int, timeout: float = 10) -> None:
+    processes = process_tree(pid)
+    for p in processes:
+        try:
+            p.kill()
+        except psutil.Error:
+            pass
+    psutil.wait_procs(processes, timeout=timeout)
+
+class ProcessRegistry:
+    """
+    The processes launched by this package (see Unreal4.run_editor), so they can be waited for and closed
+    without scanning every process on the machine, or touching processes started by anyone else.
+    A psutil.Process remembers its creation time, so a recycled pid is never mistaken for a tracked process.
+    """
+
+    def __init__(self):
+        self._processes: dict[int, psutil.Process] = {}
+        self._lock = threading.Lock()
+
+    def register(self, pid: int) -> Optional[psutil.Process]:
+        """
+        :param int pid: The ID of a launched process.
+        :return object: The tracked process, or None if it has already exited.
+        """
+        try:
+            process = psutil.Process(pid)
+        except psutil.Error:
+            return None
+        with self._lock:
+            self._processes[pid] = process
+        return process
+
+    def unregister(self, pid: int):
+        with self._lock:
+            self._processes.pop(pid, None)
+
+    def processes(self, pids: Optional[Iterable[int]] = None) -> list[psutil.Process]:
+        """
+        :param list pids: The IDs of the tracked processes to get, or None for all of them.
+        :return list: The tracked processes that are still running (exited ones stop being tracked).
+        """
+        with self._lock:
+            for pid, process in list(self._processes.items()):
+                try:
+                    exited = not process.is_running() or process.status() == psutil.STATUS_ZOMBIE
+                except psutil.Error:
+                    exited = True  # it exited between the two checks
+                if exited:
+                    del self._processes[pid]
+            if pids is None:
+                return list(self._processes.values())
+            return [self._processes[pid] for pid in pids if pid in self._processes]
+
+    def is_any_running(self) -> bool:
+        return bool(self.processes())
+
+    def wait_for_exit(self, pids: Optional[Iterable[int]] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for tracked processes to exit by themselves.
+
+        :param list pids: The IDs of the tracked processes to wait for, or None for all of them.
+        :param float timeout: The maximum seconds to wait, or None to wait forever.
+        :return bool: True if every process exited in time.
+        """
+        _, alive = psutil.wait_procs(self.processes(pids), timeout=timeout)
+        return not alive
+
+    def terminate(self, pids: Optional[Iterable[int]] = None, timeout: float = 10) -> bool:
+        """
+        Ask tracked processes and their children to exit, and kill any that haven't after timeout seconds.
+
+        :param list pids: The IDs of the tracked processes to stop, or None for all of them.
+        :param float timeout: The seconds to wait for the processes to exit by themselves.
+        :return bool: True if every process was stopped.
+        """
+        processes = []
+        for process in self.processes(pids):
+            try:
+                processes += process.children(recursive=True)
+            except psutil.Error:
+                pass
+            processes.append(process)
+        alive = terminate_processes(processes, timeout)
+        self.processes()
+        return not alive
 
-def is_any_running(app_name: str) -> bool:
-    for p in psutil.process_iter():
-        if re.match(app_name, p.name()):
-            return True
-    return False
\ No newline at end of file
+process_registry = ProcessRegistry()